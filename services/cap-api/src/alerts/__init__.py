@@ -3,6 +3,7 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from flask_migrate import Migrate
 import os
+from rss.cap.rss import FEED_CACHE
 
 from alerts.config import Config, DevConfig, api_configs
 
@@ -15,6 +16,7 @@ def create_app(configuration: Config = CONFIG):
     app.config.from_object(configuration)
 
     db.init_app(app)
+    FEED_CACHE.maxsize = configuration.FEED_CACHE_SIZE
 
     from alerts.alerts import api as api_blueprint
     app.register_blueprint(api_blueprint, url_prefix="/api/v1")
@@ -2,6 +2,10 @@ import os.path
 
 from flask import current_app, request, jsonify, Response
 from flask_httpauth import HTTPBasicAuth
+from rss.cap.codec import InvalidAlertError, alert_from_json, encode_alert, reference_ids
+from rss.cap.polygon import GeoPoint, states_containing
+from rss.cap.regions import REGIONS, nearest_region
+from rss.cap.states import STATES_CODES
 
 from alerts import CONFIG, db
 from alerts.alerts import api
@@ -17,23 +21,48 @@ def verify_password(user: str, password: str) -> bool:
     return user == CONFIG.API_USER and password == CONFIG.API_PASSWORD
 
 
+def cap_file_response(alert: Alert, filename: str) -> Response:
+    """ Returns a response with the cap file of the alert.
+
+        The digest of the file is its ETag, so clients that send it in
+        If-None-Match get a 304 response if the file did not change.
+    """
+    feed = alert.to_cap_feed()
+    response = Response(feed.data, mimetype="text/xml")
+    response.headers.set("Content-Disposition", "attachment", filename=filename)
+    response.set_etag(feed.digest)
+    return response.make_conditional(request)
+
+
+def json_response(alert: Alert, status: int = 200) -> Response:
+    """ Returns a response with the alert and its references encoded as JSON.
+    """
+    data = encode_alert(alert.to_cap_alert(), nested_refs=True)
+    return Response(data, status=status, mimetype="application/json")
+
+
 @api.route("/alerts/", methods=["POST"])
 @auth.login_required
 def add_new_alert():
     """ Add new alert to the database.
     """
-    id_ = request.json["id"]
+    try:
+        cap_alert = alert_from_json(request.json)
+    except InvalidAlertError as err:
+        return errors.bad_request(str(err))
+
+    id_ = cap_alert.id
     if Alert.get_by_identifier(id_) is not None:
         return errors.bad_request(f"Alert with identifier {id_} already exists")
 
-    alert = Alert.from_json(request.json)
+    alert = Alert.from_cap_alert(cap_alert, reference_ids(request.json))
     save_path = request.args.get("save_path", "")
 
     if save_path and os.path.isdir(save_path):
         alert.save_to_file(save_path, current_app.logger)
 
     db.session.commit()
-    return jsonify(alert.to_json()), 201
+    return json_response(alert, 201)
 
 
 @api.route("/alerts/")
@@ -79,10 +108,31 @@ def get_alert(identifier):
     """
     alert = Alert.get_by_identifier(identifier)
     if alert is not None:
-        return jsonify(alert.to_json())
+        return json_response(alert)
     return errors.not_found(f"Alert with identifier {identifier} could not be found")
 
 
+@api.route("/locate/")
+def locate():
+    """ Returns the states whose alert area contains a point and the
+        region closest to it.
+
+        The point is passed with the lat and lon url parameters.
+    """
+    lat = request.args.get("lat", type=float)
+    lon = request.args.get("lon", type=float)
+    if lat is None or lon is None:
+        return errors.bad_request("The lat and lon parameters must be numbers")
+
+    point = GeoPoint(lon=lon, lat=lat)
+    region = nearest_region(point)
+    return jsonify({
+        "states": [STATES_CODES[st] for st in states_containing(point)],
+        "region": region,
+        "region_name": REGIONS[region],
+    })
+
+
 @api.route("/cap/latest")
 def latest_cap_file():
     """ Get the latest alert as a cap file.
@@ -92,12 +142,7 @@ def latest_cap_file():
     """
     alert = Alert.get_by_identifier("latest")
     if alert is not None:
-        file_contents = alert.to_cap_file()
-        response = Response(file_contents, mimetype="text/xml")
-        response.headers.set(
-            "Content-Disposition", "attachment", filename="sasmex.cap"
-        )
-        return response
+        return cap_file_response(alert, "sasmex.cap")
     return errors.not_found(f"No alerts were found")
 
 
@@ -110,12 +155,7 @@ def get_cap_file(identifier):
     """
     alert = Alert.get_by_identifier(identifier)
     if alert is not None:
-        file_contents = alert.to_cap_file()
         if identifier == "latest":
             identifier = "sasmex"
-        response = Response(file_contents, mimetype="text/xml")
-        response.headers.set(
-            "Content-Disposition", "attachment", filename=f"{identifier}.cap"
-        )
-        return response
+        return cap_file_response(alert, f"{identifier}.cap")
     return errors.not_found(f"Alert with identifier {identifier} could not be found")
@@ -4,11 +4,17 @@ import os
 from typing import Any, List, Literal, Optional
 
 from rss.cap.alert import Alert as CapAlert
-from rss.cap.rss import create_feed
-from rss.cap.regions import REGION_CODES
+from rss.cap.codec import alert_from_json, alert_to_json, reference_ids
+from rss.cap.rss import PublishedFeeds, RSSFeed, create_feed, write_feed_to_file
+from rss.cap.regions import REGION_INDEX, normalize_region_name
 from sqlalchemy import func
+from sqlalchemy.exc import NoResultFound
+from sqlalchemy.orm import selectinload
 
-from alerts import db
+from alerts import CONFIG, db
+
+# Digest of the last feed saved to each path by save_to_file
+PUBLISHED_FEEDS = PublishedFeeds()
 
 
 class Alert(db.Model):
@@ -28,14 +34,21 @@ class Alert(db.Model):
 
     @staticmethod
     def get_references(identifiers: list[str]) -> list["Alert"]:
-        """ Get the alerts referenced by the alert with given id.
+        """ Get the alerts referenced by the alert with given id, in the
+            same order as the identifiers. They are fetched with a single query.
+
+            :raises sqlalchemy.exc.NoResultFound: If an alert does not exist.
         """
-        alert_refs = []
-        for id_ in identifiers:
-            alert = db.session.execute(
-                db.select(Alert).filter_by(identifier=id_)).scalar_one()
-            alert_refs.append(alert)
-        return alert_refs
+        if not identifiers:
+            return []
+        alerts = db.session.execute(
+            db.select(Alert).filter(Alert.identifier.in_(identifiers))
+        ).scalars().all()
+        by_identifier = {alert.identifier: alert for alert in alerts}
+        missing = [id_ for id_ in identifiers if id_ not in by_identifier]
+        if missing:
+            raise NoResultFound(f"Alerts not found: {', '.join(missing)}")
+        return [by_identifier[id_] for id_ in identifiers]
 
     @staticmethod
     def get_by_identifier(identifier: str) -> Optional["Alert"]:
@@ -52,57 +65,103 @@ class Alert(db.Model):
     @staticmethod
     def from_json(json: dict[str, Any]) -> "Alert":
         """ Construct an Alert from a json object
+
+            :raises rss.cap.codec.InvalidAlertError: If the json is not a valid alert.
+        """
+        return Alert.from_cap_alert(alert_from_json(json), reference_ids(json))
+
+    @staticmethod
+    def from_cap_alert(cap_alert: CapAlert, ref_ids: list[str]) -> "Alert":
+        """ Construct an Alert from an alert of the rss package and the
+            identifiers of the alerts it references.
         """
-        references = Alert.get_references(json["references"])
-        states = [State(state_id=s) for s in json["states"]]
         alert = Alert(
-            time=datetime.datetime.fromisoformat(json["time"]),
-            states=states,
-            region=json["region"],
-            is_event=json["is_event"],
-            identifier=json["id"],
-            references=references
+            time=cap_alert.time,
+            states=[State(state_id=s) for s in cap_alert.states],
+            region=cap_alert.region,
+            is_event=cap_alert.is_event,
+            identifier=cap_alert.id,
+            references=Alert.get_references(ref_ids)
         )
         db.session.add(alert)
         return alert
 
-    def to_cap_file(self) -> str:
-        """ Returns the contents of a cap file representing this alert."""
-        cap_alert = self.to_cap_alert()
-        feed = create_feed(cap_alert)
-        return feed.content
+    def to_cap_feed(self) -> RSSFeed:
+        """ Returns the feed of this alert. Its digest can be used as an ETag.
+        """
+        return create_feed(
+            self.to_cap_alert(),
+            cache=True,
+            deterministic=CONFIG.FEED_DETERMINISTIC,
+            max_refs=CONFIG.FEED_MAX_REFERENCES or None,
+            outline=CONFIG.FEED_OUTLINE,
+        )
+
+    def to_cap_file(self) -> bytes:
+        """ Returns the contents of a cap file representing this alert
+            encoded as UTF-8.
+        """
+        return self.to_cap_feed().data
 
     def to_cap_alert(self) -> CapAlert:
-        refs = [ref.to_cap_alert() for ref in self.references]
-        if len(refs) == 0:
-            refs = None
-        return CapAlert(
-            time=self.time,
-            states=[s.state_id for s in self.states],
-            region=self.region,
-            id=self.identifier,
-            is_event=self.is_event,
-            refs=refs
+        """ Returns the alert of the rss package with all of its references.
+
+            The references, the references of the references and so on are
+            loaded with a single recursive query, and their states with one
+            more, instead of one lazy load per alert.
+        """
+        tree = db.select(Alert.id).filter(Alert.parent_id == self.id) \
+            .cte("references", recursive=True)
+        tree = tree.union_all(
+            db.select(Alert.id).filter(Alert.parent_id == tree.c.id)
         )
+        descendants = db.session.execute(
+            db.select(Alert)
+            .filter(Alert.id.in_(db.select(tree.c.id)))
+            .options(selectinload(Alert.states))
+            .order_by(Alert.id)
+        ).scalars().all()
+
+        children = {}  # type: dict[int, list[Alert]]
+        for alert in descendants:
+            children.setdefault(alert.parent_id, []).append(alert)
+
+        # Convert the references before the alerts that refer to them,
+        # without recursion, so long chains do not hit the recursion limit
+        converted = {}  # type: dict[int, CapAlert]
+        stack = [(self, False)]
+        while stack:
+            alert, refs_done = stack.pop()
+            refs = children.get(alert.id, [])
+            if not refs_done:
+                stack.append((alert, True))
+                stack.extend((ref, False) for ref in refs)
+                continue
+            converted[alert.id] = CapAlert(
+                time=alert.time,
+                states=[s.state_id for s in alert.states],
+                region=alert.region,
+                id=alert.identifier,
+                is_event=alert.is_event,
+                refs=[converted[ref.id] for ref in refs] or None,
+            )
+        return converted[self.id]
 
     def to_json(self) -> dict[str, Any]:
-        return {
-            "time": self.time.isoformat(timespec="seconds"),
-            "states": [s.state_id for s in self.states],
-            "region": self.region,
-            "is_event": self.is_event,
-            "id": self.identifier,
-            "references": [ref.to_json() for ref in self.references],
-        }
+        return alert_to_json(self.to_cap_alert(), nested_refs=True)
 
     def save_to_file(self, path: str, logger: logging.Logger) -> None:
-        cap_alert = self.to_cap_alert()
-        feed = create_feed(cap_alert)
+        feed = self.to_cap_feed()
         save_path = os.path.join(path, f"sasmex.xml")
         try:
-            with open(save_path, "w") as fp:
-                fp.write(feed.content)
-            logger.info(f"Saved cap file to {path}")
+            written = write_feed_to_file(
+                save_path, feed, CONFIG.FEED_COMPRESSION,
+                durability=CONFIG.FEED_DURABILITY, published=PUBLISHED_FEEDS
+            )
+            if written:
+                logger.info(f"Saved cap file to {path}")
+            else:
+                logger.info(f"Cap file in {path} did not change, it was not saved")
         except IOError as e:
             logger.debug(f"Failed to save cap file {path}")
             logger.debug(e)
@@ -131,12 +190,10 @@ def get_region_codes(region: str) -> set[int]:
         :return: A set with the region codes.
         :raises ValueError: If the region is not found.
     """
-    for reg, codes in REGION_CODES.items():
-        reg_lower = "".join(reg.lower().split())
-        if reg_lower == region:
-            return codes
-
-    raise ValueError(f"Invalid region {region}")
+    try:
+        return REGION_INDEX[normalize_region_name(region)]
+    except KeyError:
+        raise ValueError(f"Invalid region {region}")
 
 
 def query_alerts(
@@ -1,9 +1,13 @@
+import time
+
+import click
 from flask import Response
 
 from alerts import CONFIG, create_app, db
 from alerts.errors import errors
 from alerts.alerts.models import Alert
 from alerts.utils.fake import generate_fake_alerts
+from alerts.utils.regenerate_caps import regenerate_cap_files
 from alerts.utils.wait_for_db import wait_for_postgres
 
 
@@ -62,3 +66,15 @@ def seed_db():
     """ Add multiple alerts to the database.
     """
     generate_fake_alerts()
+
+
+@app.cli.command("regenerate-caps")
+@click.argument("path")
+@click.option("--workers", type=int, default=None,
+              help="Number of processes. Defaults to the number of CPUs.")
+def regenerate_caps(path: str, workers: int):
+    """ Write the cap file of every alert in the database to PATH.
+    """
+    start = time.time()
+    count = regenerate_cap_files(path, workers)
+    print(f"Wrote {count} cap files to {path} in {time.time() - start:.2f} seconds")
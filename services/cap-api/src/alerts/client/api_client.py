@@ -3,6 +3,7 @@ from typing import Literal, Optional
 
 import requests
 from rss.cap.alert import Alert
+from rss.cap.codec import encode_alert
 from rss.cap.states import STATES_CODES
 
 from alerts import CONFIG
@@ -21,24 +22,14 @@ class APIClient:
 
     def post_alert(self, alert: Alert, save_path: str = "") -> requests.Response:
         """ Post a new alert. """
-        references = []
-        if alert.refs is not None:
-            references = [ref.id for ref in alert.refs]
-
         url = f"{self.base_url}/alerts/"
         if save_path:
             url += f"?save_path={save_path}"
 
         res = requests.post(
             url,
-            json={
-                "time": alert.time.isoformat(timespec="seconds"),
-                "states": alert.states,
-                "region": alert.region,
-                "is_event": alert.is_event,
-                "id": alert.id,
-                "references": references,
-            },
+            data=encode_alert(alert),
+            headers={"Content-Type": "application/json"},
             auth=self.credentials
         )
         return res
@@ -82,6 +73,10 @@ class APIClient:
         """ Returns a response with the contents of the solicited cap file as string"""
         return requests.get(f"{self.base_url}/alerts/{identifier}/cap?save=false")
 
+    def locate(self, lat: float, lon: float) -> requests.Response:
+        """ Get the states that contain a point and the nearest region. """
+        return requests.get(f"{self.base_url}/locate/", params={"lat": lat, "lon": lon})
+
     def get_last_alert(self) -> requests.Response:
         """ Fetch the last published alert. """
         return requests.get(f"{self.base_url}/alerts/latest/")
@@ -39,6 +39,23 @@ class Config:
     API_URL = get_api_url()
     API_USER = "triton"
     API_PASSWORD = "dog"
+    # Maximum number of rendered cap files kept in memory
+    FEED_CACHE_SIZE = int(os.environ.get("FEED_CACHE_SIZE", 128))
+    # Compressed copies written next to sasmex.xml. Comma separated, can be gzip and brotli
+    FEED_COMPRESSION = tuple(
+        m for m in os.environ.get("FEED_COMPRESSION", "gzip").split(",") if m
+    )
+    # What is flushed to disk when sasmex.xml is published: none, fdatasync or fsync
+    FEED_DURABILITY = os.environ.get("FEED_DURABILITY", "none")
+    # If 1, the updated date of the cap files is the time of the alert instead
+    # of the current time, so an alert always has the same file and ETag
+    FEED_DETERMINISTIC = os.environ.get("FEED_DETERMINISTIC", "0") == "1"
+    # Maximum number of references written to a cap file, the last ones are
+    # kept. 0 writes all of them
+    FEED_MAX_REFERENCES = int(os.environ.get("FEED_MAX_REFERENCES", 0))
+    # If 1, the area of a cap file is the merged outline of its states, one
+    # polygon per group of overlapping states, instead of one polygon per state
+    FEED_OUTLINE = os.environ.get("FEED_OUTLINE", "0") == "1"
     # Flask and sql stuff
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     DEBUG = True
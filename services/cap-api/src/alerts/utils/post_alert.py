@@ -2,6 +2,7 @@ import datetime
 from typing import Optional
 
 from rss.cap.alert import Alert
+from rss.cap.codec import decode_alert
 from rss.cap.states import STATES_CODES
 
 from alerts.client.api_client import APIClient
@@ -21,7 +22,7 @@ def get_references(
         alert_json = res.json()
         if len(alert_json["references"] > 0):
             get_references(client, alert_json["references"], refs)
-        refs.append(Alert.from_json(res.json()))
+        refs.append(decode_alert(res.content))
 
 
 def post_alert(
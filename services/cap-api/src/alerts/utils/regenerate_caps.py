@@ -0,0 +1,44 @@
+import os
+from typing import Iterator, Optional
+
+from rss.cap.alert import Alert as CapAlert
+from rss.cap.rss import create_feeds
+from rss.utils.atomic_write import write_atomic
+
+from alerts import CONFIG, db
+from alerts.alerts.models import Alert
+
+
+def stored_alerts() -> Iterator[CapAlert]:
+    """ Yields every alert stored in the database, oldest first.
+    """
+    query = db.select(Alert).order_by(Alert.time)
+    for alert in db.session.execute(query).scalars():
+        yield alert.to_cap_alert()
+
+
+def regenerate_cap_files(path: str, workers: Optional[int] = None) -> int:
+    """ Render the cap file of every alert in the database and write it
+        to the given directory. Files are named after the alert identifier.
+
+        Each file is replaced atomically, an interrupted run never leaves a
+        truncated file.
+
+        :param path: The directory where the files will be written.
+        :param workers: Number of processes used to render the files.
+        :return: The number of files written.
+    """
+    os.makedirs(path, exist_ok=True)
+    count = 0
+    feeds = create_feeds(
+        stored_alerts(),
+        workers=workers,
+        deterministic=CONFIG.FEED_DETERMINISTIC,
+        max_refs=CONFIG.FEED_MAX_REFERENCES or None,
+        outline=CONFIG.FEED_OUTLINE,
+    )
+    for identifier, content in feeds:
+        write_atomic(
+            os.path.join(path, f"{identifier}.cap"), content, durability=CONFIG.FEED_DURABILITY)
+        count += 1
+    return count
@@ -355,3 +355,18 @@ class TestAlertFilters:
             "next": None,
             "count": 1
         }
+
+    @pytest.mark.usefixtures("wait_for_api")
+    def test_locate(self):
+        res = client.locate(lat=17.16214, lon=-100.63043)
+        assert res.ok
+        assert res.json() == {
+            "states": [41],
+            "region": 41203,
+            "region_name": "Atoyac Gro",
+        }
+
+    @pytest.mark.usefixtures("wait_for_api")
+    def test_locate_invalid_point(self):
+        res = requests.get(f"{client.base_url}/locate/", params={"lat": "north"})
+        assert res.status_code == 400
@@ -1,9 +1,14 @@
+import gzip
+import logging
 from datetime import datetime
 import pytest
 
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import NoResultFound
 from rss.cap.alert import Alert as CapAlert
 
-from alerts import db
+from alerts import CONFIG, db
 from alerts.alerts.models import Alert, State, get_region_codes, query_alerts
 
 
@@ -126,6 +131,70 @@ class TestConvertAlert:
         )
         assert cap_alert == expected
 
+    @staticmethod
+    def add_update_chain(length: int, region: int = 12205) -> Alert:
+        """ Add a chain of alerts where each alert references the previous
+            one. Returns the last alert.
+        """
+        previous = None
+        for ii in range(length):
+            alert = Alert(
+                time=datetime(2023, 5, 17, 10, ii // 60, ii % 60),
+                states=[State(state_id=40 + ii % 10)],
+                region=region,
+                is_event=False,
+                identifier=f"CHAIN{ii}",
+                references=[previous] if previous is not None else [],
+            )
+            db.session.add(alert)
+            previous = alert
+        db.session.commit()
+        return previous
+
+    @pytest.mark.usefixtures("sqlite_session")
+    def test_to_cap_alert_with_long_chain(self):
+        last = self.add_update_chain(200)
+        db.session.expire_all()
+
+        queries = []
+        listener = lambda *args: queries.append(args[2])
+        event.listen(db.engine, "before_cursor_execute", listener)
+        try:
+            cap_alert = last.to_cap_alert()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", listener)
+        # The alert, its states, the references and their states
+        assert len(queries) <= 4
+
+        depth = 0
+        while cap_alert.refs is not None:
+            assert len(cap_alert.refs) == 1
+            assert cap_alert.id == f"CHAIN{199 - depth}"
+            assert cap_alert.states == (40 + (199 - depth) % 10,)
+            cap_alert = cap_alert.refs[0]
+            depth += 1
+        assert depth == 199
+
+    @pytest.mark.usefixtures("sqlite_session")
+    def test_cap_file_of_long_chain_is_cached(self):
+        from rss.cap.rss import FEED_CACHE
+
+        FEED_CACHE.clear()
+        last = self.add_update_chain(1000, region=41219)
+        feed = last.to_cap_feed()
+        # The alert of the rss package is built again for the second download
+        assert last.to_cap_feed() is feed
+        assert FEED_CACHE.hits == 1
+        FEED_CACHE.clear()
+
+    @pytest.mark.usefixtures("sqlite_session")
+    def test_get_references_keeps_order(self):
+        add_alerts_to_db()
+        refs = Alert.get_references(["ALERT3", "ALERT1", "ALERT2"])
+        assert [ref.identifier for ref in refs] == ["ALERT3", "ALERT1", "ALERT2"]
+        with pytest.raises(NoResultFound):
+            Alert.get_references(["ALERT1", "ALERT9"])
+
 
 def add_alerts_to_db() -> list[Alert]:
     alert1 = Alert(
@@ -324,3 +393,69 @@ class TestGetRegionCodes:
     def test_raises_error_if_region_is_not_found(self):
         with pytest.raises(ValueError):
             get_region_codes("Cancun")
+
+
+class TestSaveToFile:
+
+    @pytest.mark.usefixtures("sqlite_session")
+    def test_saves_feed_and_compressed_copy(self, tmp_path):
+        alert = add_alerts_to_db()[0]
+        alert.save_to_file(str(tmp_path), logging.getLogger(__name__))
+
+        with open(tmp_path / "sasmex.xml") as fp:
+            content = fp.read()
+        assert "CIRESALERT1" in content
+        with gzip.open(tmp_path / "sasmex.xml.gz", "rt") as fp:
+            assert fp.read() == content
+
+    @pytest.mark.usefixtures("sqlite_session")
+    def test_unchanged_feed_is_not_saved_again(self, tmp_path):
+        alert = add_alerts_to_db()[0]
+        logger = logging.getLogger(__name__)
+        alert.save_to_file(str(tmp_path), logger)
+        (tmp_path / "sasmex.xml").write_text("modified")
+
+        alert.save_to_file(str(tmp_path), logger)
+        assert (tmp_path / "sasmex.xml").read_text() == "modified"
+
+
+class TestCapFile:
+
+    @pytest.mark.usefixtures("sqlite_session")
+    def test_cap_file_is_utf8_bytes(self):
+        alert = add_alerts_to_db()[0]
+        content = alert.to_cap_file()
+        assert isinstance(content, bytes)
+        assert content.startswith(b'<?xml version="1.0" encoding="UTF-8"?>')
+        assert b"<identifier>CIRESALERT1</identifier>" in content
+
+    @pytest.mark.usefixtures("sqlite_session")
+    def test_cap_file_is_deterministic(self, monkeypatch):
+        monkeypatch.setattr(CONFIG, "FEED_DETERMINISTIC", True)
+        alert = add_alerts_to_db()[0]
+        feed = alert.to_cap_feed()
+        assert feed.updated_date == alert.time.isoformat()
+        assert alert.to_cap_file() == feed.data
+
+    @pytest.mark.usefixtures("sqlite_session")
+    def test_cap_file_is_updated_when_published_by_default(self):
+        alert = add_alerts_to_db()[0]
+        feed = alert.to_cap_feed()
+        assert feed.updated_date != alert.time.isoformat()
+        assert alert.to_cap_file() == feed.data
+
+    @pytest.mark.usefixtures("sqlite_session")
+    def test_cap_file_etag(self):
+        add_alerts_to_db()
+        client = current_app.test_client()
+        res = client.get("/api/v1/alerts/ALERT1/cap/")
+        assert res.status_code == 200
+        etag = res.headers["ETag"]
+        assert etag == f'"{Alert.get_by_identifier("ALERT1").to_cap_feed().digest}"'
+
+        res = client.get("/api/v1/alerts/ALERT1/cap/", headers={"If-None-Match": etag})
+        assert res.status_code == 304
+        assert res.data == b""
+
+        res = client.get("/api/v1/alerts/ALERT2/cap/", headers={"If-None-Match": etag})
+        assert res.status_code == 200
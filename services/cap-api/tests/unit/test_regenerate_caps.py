@@ -0,0 +1,139 @@
+from datetime import datetime
+import os
+
+from bs4 import BeautifulSoup
+import pytest
+
+from alerts import CONFIG, db
+from alerts.alerts.models import Alert, State
+from alerts.utils import regenerate_caps
+from alerts.utils.regenerate_caps import regenerate_cap_files
+
+
+class TestRegenerateCapFiles:
+
+    @pytest.mark.usefixtures("sqlite_session")
+    def test_writes_a_file_per_alert(self, tmp_path):
+        alert1 = Alert(
+            time=datetime(2023, 5, 17, 13, 20, 5),
+            states=[State(state_id=40)],
+            region=41219,
+            identifier="ALERT1",
+            is_event=False,
+        )
+        alert2 = Alert(
+            time=datetime(2023, 5, 17, 13, 20, 15),
+            states=[State(state_id=41)],
+            region=41220,
+            identifier="ALERT2",
+            is_event=False,
+            references=[alert1]
+        )
+        db.session.add_all([alert1, alert2])
+        db.session.commit()
+
+        count = regenerate_cap_files(str(tmp_path), workers=1)
+        assert count == 2
+        assert sorted(os.listdir(tmp_path)) == ["ALERT1.cap", "ALERT2.cap"]
+
+        with open(tmp_path / "ALERT2.cap") as fp:
+            data = BeautifulSoup(fp.read(), "xml")
+        alert = data.feed.entry.alert
+        assert alert.msgType.string == "Update"
+        assert "CIRES_ALERT1" in alert.references.string
+
+    @pytest.mark.usefixtures("sqlite_session")
+    def test_files_are_replaced_atomically(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(CONFIG, "FEED_DURABILITY", "fsync")
+        calls = []
+        write_atomic = regenerate_caps.write_atomic
+
+        def spy(path, data, durability="none"):
+            calls.append((path, durability))
+            write_atomic(path, data, durability)
+
+        monkeypatch.setattr(regenerate_caps, "write_atomic", spy)
+        (tmp_path / "ALERT1.cap").write_bytes(b"old file")
+        db.session.add(Alert(
+            time=datetime(2023, 5, 17, 13, 20, 5),
+            states=[State(state_id=40)],
+            region=41219,
+            identifier="ALERT1",
+            is_event=False,
+        ))
+        db.session.commit()
+
+        regenerate_cap_files(str(tmp_path), workers=1)
+
+        assert calls == [(str(tmp_path / "ALERT1.cap"), "fsync")]
+        assert os.listdir(tmp_path) == ["ALERT1.cap"]
+        assert (tmp_path / "ALERT1.cap").read_bytes() != b"old file"
+
+    @pytest.mark.usefixtures("sqlite_session")
+    def test_references_are_limited(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(CONFIG, "FEED_MAX_REFERENCES", 1)
+        references = [
+            Alert(
+                time=datetime(2023, 5, 17, 13, 20, 5 + ii),
+                states=[State(state_id=40 + ii)],
+                region=41219,
+                identifier=f"ALERT{ii}",
+                is_event=False,
+            )
+            for ii in range(2)
+        ]
+        alert = Alert(
+            time=datetime(2023, 5, 17, 13, 20, 15),
+            states=[State(state_id=42)],
+            region=41219,
+            identifier="ALERT2",
+            is_event=False,
+            references=references,
+        )
+        db.session.add(alert)
+        db.session.commit()
+
+        regenerate_cap_files(str(tmp_path), workers=1)
+
+        with open(tmp_path / "ALERT2.cap") as fp:
+            data = BeautifulSoup(fp.read(), "xml")
+        references = data.feed.entry.alert.references.string.split()
+        assert len(references) == 1
+        assert "CIRES_ALERT1" in references[0]
+
+    @pytest.mark.parametrize("outline,max_refs", [(False, 0), (True, 0), (True, 1)])
+    @pytest.mark.usefixtures("sqlite_session")
+    def test_files_are_the_ones_served(self, tmp_path, monkeypatch, outline, max_refs):
+        monkeypatch.setattr(CONFIG, "FEED_DETERMINISTIC", True)
+        monkeypatch.setattr(CONFIG, "FEED_OUTLINE", outline)
+        monkeypatch.setattr(CONFIG, "FEED_MAX_REFERENCES", max_refs)
+        alert1 = Alert(
+            time=datetime(2023, 5, 17, 13, 20, 5),
+            states=[State(state_id=40), State(state_id=41)],
+            region=41219,
+            identifier="ALERT1",
+            is_event=False,
+        )
+        alert2 = Alert(
+            time=datetime(2023, 5, 17, 13, 20, 10),
+            states=[State(state_id=42)],
+            region=41219,
+            identifier="ALERT2",
+            is_event=False,
+        )
+        alert3 = Alert(
+            time=datetime(2023, 5, 17, 13, 20, 15),
+            states=[State(state_id=43)],
+            region=41219,
+            identifier="ALERT3",
+            is_event=False,
+            references=[alert1, alert2],
+        )
+        db.session.add(alert3)
+        db.session.commit()
+
+        regenerate_cap_files(str(tmp_path), workers=1)
+
+        for alert in (alert1, alert2, alert3):
+            with open(tmp_path / f"{alert.identifier}.cap", "rb") as fp:
+                assert fp.read() == alert.to_cap_file()
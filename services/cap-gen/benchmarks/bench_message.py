@@ -0,0 +1,64 @@
+""" Compare the time to parse the messages of the alerts server with
+    capgen.message.parse_message and with the strptime parser that
+    MessageProcessor used before it.
+
+    Usage:
+        python benchmarks/bench_message.py [--messages 100000] [--repeat 5]
+"""
+import argparse
+import datetime
+import random
+import time
+from typing import Callable
+
+from capgen.message import parse_message, parse_messages
+from capgen.services import MessageProcessor
+
+
+def messages(count: int) -> list[bytes]:
+    rng = random.Random(0)
+    start = datetime.datetime(2023, 1, 1)
+    msgs = []
+    for _ in range(count):
+        date = start + datetime.timedelta(seconds=rng.randrange(0, 365 * 24 * 3600))
+        states = "/".join(str(rng.randrange(1, 33)) for _ in range(rng.randrange(1, 4)))
+        msgs.append(f"84,3,{rng.randrange(0, 2)},{states},{rng.randrange(40000, 42000)},"
+                    f"{date:%Y/%m/%d,%H:%M:%S},{rng.random() * 1e5:.10f}\r\n".encode())
+    return msgs
+
+
+def strptime_parse(msg: bytes):
+    text = msg.decode().strip()
+    if text.startswith("84,3"):
+        return MessageProcessor._parse_message(text)
+
+
+def best_time(func: Callable[[], object], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(count: int, repeat: int) -> None:
+    msgs = messages(count)
+    results = {
+        "strptime": best_time(lambda: [strptime_parse(msg) for msg in msgs], repeat),
+        "parse_message": best_time(lambda: [parse_message(msg) for msg in msgs], repeat),
+        "parse_messages": best_time(lambda: parse_messages(msgs), repeat),
+    }
+    baseline = results["strptime"]
+    print(f"messages: {count}")
+    for name, elapsed in results.items():
+        print(f"{name:>15}: {elapsed / count * 1e6:.2f} us/msg  "
+              f"{count / elapsed:,.0f} msg/s  x{baseline / elapsed:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.messages, args.repeat)
@@ -0,0 +1,85 @@
+""" Measure the latency from a message received by the client to its cap
+    file on disk, the CPU used by the idle pipeline and how long it takes
+    to shut it down.
+
+    The pipeline is MessageProcessor -> AlertDispatcher -> FeedWriter, fed
+    through the queue that AlertsClient fills. FeedPoster is not started,
+    it only adds the time of the HTTP request.
+
+    Usage:
+        python benchmarks/bench_pipeline.py [--alerts 200] [--interval 0.01] [--idle 2]
+"""
+import argparse
+import datetime
+import queue
+import statistics
+import tempfile
+import time
+
+from rss.cap.alert import Alert
+
+from capgen.services import AlertDispatcher, FeedWriter, MessageProcessor
+
+
+class TimedFeedWriter(FeedWriter):
+    """ Records when the cap file of each alert is written. """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.written = queue.Queue()
+
+    def write_alert(self, alert: Alert) -> None:
+        super().write_alert(alert)
+        self.written.put(time.perf_counter())
+
+
+def message(ii: int) -> bytes:
+    # Every alert is one second after the previous one, so it is not an update
+    date = datetime.datetime(2023, 3, 13, 16, 7, 5) + datetime.timedelta(seconds=ii)
+    return f"84,3,1,40,41203,{date:%Y/%m/%d,%H:%M:%S},46237.1234567890\r\n".encode()
+
+
+def main(n_alerts: int, interval: float, idle: float) -> None:
+    received = queue.Queue()
+    processor = MessageProcessor(received)
+    processor.new_alert_time = 0
+    dispatcher = AlertDispatcher(processor.alerts)
+
+    with tempfile.TemporaryDirectory() as directory:
+        writer = TimedFeedWriter(dispatcher.to_write, rolling_feed_size=0)
+        writer.save_path = directory
+        for service in (processor, dispatcher, writer):
+            service.start()
+
+        latencies = []
+        for ii in range(n_alerts):
+            start = time.perf_counter()
+            received.put(message(ii))
+            latencies.append(writer.written.get() - start)
+            time.sleep(interval)
+
+        cpu = time.process_time()
+        time.sleep(idle)
+        cpu = time.process_time() - cpu
+
+        start = time.perf_counter()
+        for service in (processor, dispatcher, writer):
+            service.shutdown()
+        shutdown = time.perf_counter() - start
+
+    latencies = sorted(lat * 1000 for lat in latencies)
+    print(f"alerts: {n_alerts}")
+    print(f"latency ms: mean {statistics.mean(latencies):.3f}  "
+          f"p50 {latencies[len(latencies) // 2]:.3f}  "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.3f}  max {latencies[-1]:.3f}")
+    print(f"idle cpu: {cpu * 1000:.1f} ms in {idle:.1f} s ({cpu / idle:.2%})")
+    print(f"shutdown: {shutdown * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--alerts", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.01)
+    parser.add_argument("--idle", type=float, default=2.)
+    args = parser.parse_args()
+    main(args.alerts, args.interval, args.idle)
@@ -0,0 +1,112 @@
+""" Compare the threaded and the asyncio runtimes of main() under bursts of
+    alerts: latency from the server to the cap file on disk, number of
+    threads and time to shut down once the server closes the connection.
+
+    Usage:
+        python benchmarks/bench_runtimes.py [--bursts 20] [--burst-size 10] [--interval 0.05]
+"""
+import argparse
+import datetime
+import socket
+import statistics
+import tempfile
+import threading
+import time
+
+from rss.cap.alert import Alert
+
+from capgen import CONFIG
+from capgen.main import main
+from capgen.services import FeedWriter
+
+WRITTEN = {}  # type: dict[str, float]
+_write_alert = FeedWriter.write_alert
+
+
+def timed_write_alert(self, alert: Alert) -> None:
+    _write_alert(self, alert)
+    WRITTEN[alert.id] = time.perf_counter()
+
+
+def message(ii: int) -> tuple[str, bytes]:
+    # Each alert is an hour after the previous one, so it is not an update
+    date = datetime.datetime(2023, 3, 13, 16, 7, 5) + datetime.timedelta(hours=ii)
+    msg = f"84,3,1,40,41203,{date:%Y/%m/%d,%H:%M:%S},46237.1234567890\r\n".encode()
+    return date.strftime("%Y%m%d%H%M%S"), msg
+
+
+def serve(listener: socket.socket, bursts: int, burst_size: int, interval: float,
+          sent: dict[str, float], closed: list[float]) -> None:
+    connection, _ = listener.accept()
+    ii = 0
+    for _ in range(bursts):
+        messages = [message(ii + jj) for jj in range(burst_size)]
+        ii += burst_size
+        now = time.perf_counter()
+        for alert_id, _ in messages:
+            sent[alert_id] = now
+        connection.sendall(b"".join(msg for _, msg in messages))
+        time.sleep(interval)
+
+    while len(WRITTEN) < ii:
+        time.sleep(0.01)
+    closed.append(time.perf_counter())
+    connection.close()
+
+
+def run(runtime: str, bursts: int, burst_size: int, interval: float) -> None:
+    WRITTEN.clear()
+    sent = {}  # type: dict[str, float]
+    closed = []  # type: list[float]
+    listener = socket.create_server(("127.0.0.1", 0))
+    server = threading.Thread(
+        target=serve,
+        args=(listener, bursts, burst_size, interval, sent, closed),
+    )
+    server.start()
+
+    threads = []
+    done = threading.Event()
+
+    def count_threads():
+        while not done.wait(0.01):
+            threads.append(threading.active_count())
+
+    counter = threading.Thread(target=count_threads)
+    counter.start()
+    main(
+        address=listener.getsockname(),
+        heart_beats=1,
+        api_url="",
+        exit_error=False,
+        runtime=runtime,
+    )
+    ended = time.perf_counter()
+    done.set()
+    counter.join()
+    server.join()
+    listener.close()
+
+    latencies = sorted((WRITTEN[alert_id] - sent[alert_id]) * 1000 for alert_id in sent)
+    # The benchmark, the server and the thread counter are not part of the runtime
+    print(f"{runtime:<8} latency ms: p50 {latencies[len(latencies) // 2]:6.2f}  "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1]:6.2f}  "
+          f"max {latencies[-1]:6.2f}  stdev {statistics.stdev(latencies):6.2f}  "
+          f"extra threads {max(threads) - 3}  shutdown {(ended - closed[0]) * 1000:7.1f} ms")
+
+
+def bench(bursts: int, burst_size: int, interval: float) -> None:
+    FeedWriter.write_alert = timed_write_alert
+    with tempfile.TemporaryDirectory() as directory:
+        CONFIG.SAVE_PATH = directory
+        for runtime in ("threads", "asyncio"):
+            run(runtime, bursts, burst_size, interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bursts", type=int, default=20)
+    parser.add_argument("--burst-size", type=int, default=10)
+    parser.add_argument("--interval", type=float, default=0.05)
+    args = parser.parse_args()
+    bench(args.bursts, args.burst_size, args.interval)
@@ -0,0 +1,286 @@
+""" Runtime of the cap generator that runs in an asyncio event loop.
+
+    The stages are the same as in the threaded runtime of capgen.main: the
+    messages of the alerts server are converted to alerts by a
+    MessageProcessor and dispatched to a FeedWriter and a FeedPoster. The
+    stages are tasks of the event loop connected by asyncio queues, and the
+    connection to the server is an asyncio stream whose heartbeats are
+    scheduled with loop timers.
+
+    Writing files and posting to the API block, so they run in executors of
+    one thread each. Alerts are written and posted in the order they arrive,
+    an update is never posted before the alerts it references.
+
+    The whole runtime uses three threads: the event loop, the writer and the
+    poster.
+"""
+import asyncio
+import concurrent.futures
+import logging
+import signal
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from rss.cap.alert import Alert
+
+from capgen import CONFIG
+from capgen.metrics import METRICS, ReceivedMessage, log_summary
+from capgen.services import SHUTDOWN, FeedPoster, FeedWriter, MessageProcessor
+
+MSG_END = b"\r\n"
+ALIVE_MSG = b"ALIVE" + MSG_END
+
+# Seconds between attempts to connect to the server, and between calls to
+# a custom stop function
+RETRY_WAIT = 0.5
+STOP_CHECK = 0.1
+
+
+class AsyncRuntime:
+    """ Receives alerts from the alerts server, writes their cap files and
+        posts them to the API.
+
+        The runtime stops when the stop function returns True, when shutdown
+        is called, on SIGINT or SIGTERM (if it runs in the main thread) or when
+        the connection is lost and reconnect is False. The alerts that were
+        received before it stopped are still written and posted.
+    """
+
+    def __init__(
+            self,
+            address: tuple[str, int],
+            reconnect: bool = False,
+            timeout: Optional[float] = None,
+            heartbeats: float = 30.,
+            api_url: str = CONFIG.API_URL,
+            stop: Optional[Callable[[], bool]] = None,
+            logger: Optional[logging.Logger] = None,
+            metrics_log_interval: float = 0.,
+    ):
+        """
+            :param address: Address of the alerts server.
+            :param reconnect: Whether to connect again when the connection is lost.
+            :param timeout: Seconds without receiving a message after which
+                the connection is considered lost. No timeout by default.
+            :param heartbeats: Seconds between alive messages sent to the server.
+            :param api_url: Url of the API. If empty, alerts are not posted.
+            :param stop: Function that returns True to stop the runtime.
+            :param logger: Logger.
+            :param metrics_log_interval: Seconds between summaries of the
+                latency metrics in the log. 0 disables them.
+        """
+        self.address = address
+        self.reconnect = reconnect
+        self.timeout = timeout
+        self.heartbeats = heartbeats
+        self._stop = stop
+        self._logger = logger
+        self.metrics_log_interval = metrics_log_interval
+
+        self.message_processor = MessageProcessor(logger=logger)
+        self.feed_writer = FeedWriter(logger=logger)
+        self.feed_poster = None  # type: Optional[FeedPoster]
+        if api_url:
+            self.feed_poster = FeedPoster(api_url=api_url, logger=logger)
+
+        self._loop = None  # type: Optional[asyncio.AbstractEventLoop]
+        self._stopping = None  # type: Optional[asyncio.Event]
+        self._stream = None  # type: Optional[asyncio.StreamWriter]
+        self._heartbeat = None  # type: Optional[asyncio.Handle]
+        self._stop_timer = None  # type: Optional[asyncio.Handle]
+        self._metrics_timer = None  # type: Optional[asyncio.Handle]
+        self._connection_lost = False
+
+    def run(self) -> bool:
+        """ Run until the runtime stops.
+
+            :return: True if it stopped because of an error: the connection
+                was lost or a stage failed.
+        """
+        return asyncio.run(self.run_async())
+
+    def shutdown(self) -> None:
+        """ Stop the runtime. Can be called from any thread.
+        """
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._request_stop)
+
+    async def run_async(self) -> bool:
+        """ Run in the current event loop until the runtime stops.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        self._connection_lost = False
+        signals = self._add_signal_handlers()
+        if self._stop is not None:
+            self._stop_timer = self._loop.call_later(STOP_CHECK, self._check_stop)
+        if self._logger and self.metrics_log_interval > 0:
+            self._metrics_timer = self._loop.call_later(
+                self.metrics_log_interval, self._log_metrics)
+
+        received = asyncio.Queue()  # type: asyncio.Queue[bytes]
+        alerts = asyncio.Queue()  # type: asyncio.Queue[Alert]
+        to_write = asyncio.Queue()  # type: asyncio.Queue[Alert]
+        to_post = asyncio.Queue()  # type: asyncio.Queue[Alert]
+        outputs = [to_write]
+        if self.feed_poster is not None:
+            outputs.append(to_post)
+
+        writer_executor = concurrent.futures.ThreadPoolExecutor(1, "capgen-writer")
+        poster_executor = concurrent.futures.ThreadPoolExecutor(1, "capgen-poster")
+        error = False
+        try:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(self._receive(received))
+                group.create_task(self._process(received, alerts))
+                group.create_task(self._dispatch(alerts, outputs))
+                group.create_task(
+                    self._run_in_executor(to_write, writer_executor, self.feed_writer.write_alert))
+                if self.feed_poster is not None:
+                    group.create_task(
+                        self._run_in_executor(to_post, poster_executor, self.feed_poster.post_alert))
+        except* Exception as errors:
+            error = True
+            if self._logger:
+                for err in errors.exceptions:
+                    self._logger.error(f"{self.__class__.__name__}: stage failed: {err!r}")
+        finally:
+            if self._stop_timer is not None:
+                self._stop_timer.cancel()
+            if self._metrics_timer is not None:
+                self._metrics_timer.cancel()
+            for sig in signals:
+                self._loop.remove_signal_handler(sig)
+            writer_executor.shutdown()
+            poster_executor.shutdown()
+        return error or self._connection_lost
+
+    def _add_signal_handlers(self) -> list[int]:
+        if threading.current_thread() is not threading.main_thread():
+            return []
+        signals = []
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                self._loop.add_signal_handler(sig, self._request_stop)
+            except (NotImplementedError, RuntimeError):
+                continue
+            signals.append(sig)
+        return signals
+
+    def _check_stop(self) -> None:
+        if self._stop():
+            self._request_stop()
+        elif not self._stopping.is_set():
+            self._stop_timer = self._loop.call_later(STOP_CHECK, self._check_stop)
+
+    def _log_metrics(self) -> None:
+        log_summary(self._logger)
+        self._metrics_timer = self._loop.call_later(self.metrics_log_interval, self._log_metrics)
+
+    def _request_stop(self) -> None:
+        if self._stopping.is_set():
+            return
+        if self._logger:
+            self._logger.info(f"{self.__class__.__name__}: shutting down")
+        self._stopping.set()
+        # Closing the stream ends the read that is waiting for a message
+        if self._stream is not None:
+            self._stream.close()
+
+    async def _receive(self, received: asyncio.Queue) -> None:
+        """ Put the messages of the server in the queue until the runtime stops.
+        """
+        try:
+            while not self._stopping.is_set():
+                reader = await self._connect()
+                if reader is None:
+                    break
+                await self._read_messages(reader, received)
+                if not self.reconnect and not self._stopping.is_set():
+                    self._connection_lost = True
+                    break
+        finally:
+            await received.put(SHUTDOWN)
+
+    async def _connect(self) -> Optional[asyncio.StreamReader]:
+        """ Connect to the server, retrying until it succeeds or the runtime stops.
+        """
+        while not self._stopping.is_set():
+            try:
+                reader, self._stream = await asyncio.open_connection(*self.address)
+            except OSError:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), RETRY_WAIT)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            if self._logger:
+                self._logger.info(f"{self.__class__.__name__}: connected to {self.address}")
+            return reader
+        return None
+
+    async def _read_messages(self, reader: asyncio.StreamReader, received: asyncio.Queue) -> None:
+        self._heartbeat = self._loop.call_soon(self._send_alive, self._stream)
+        try:
+            while True:
+                try:
+                    msg = await asyncio.wait_for(reader.readuntil(MSG_END), self.timeout)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                        asyncio.TimeoutError, OSError) as err:
+                    if self._logger and not self._stopping.is_set():
+                        self._logger.error(
+                            f"{self.__class__.__name__}: connection lost: {err!r}")
+                    return
+                await received.put(ReceivedMessage(msg))
+        finally:
+            self._heartbeat.cancel()
+            self._stream.close()
+            try:
+                await self._stream.wait_closed()
+            except OSError:
+                pass
+            self._stream = None
+
+    def _send_alive(self, stream: asyncio.StreamWriter) -> None:
+        """ Send an alive message to the server and schedule the next one.
+        """
+        if stream.is_closing():
+            return
+        stream.write(ALIVE_MSG)
+        self._heartbeat = self._loop.call_later(self.heartbeats, self._send_alive, stream)
+
+    async def _process(self, received: asyncio.Queue, alerts: asyncio.Queue) -> None:
+        while True:
+            msg = await received.get()
+            if msg is SHUTDOWN:
+                break
+            alert = self.message_processor.process(msg)
+            if alert is not None:
+                await alerts.put(alert)
+        await alerts.put(SHUTDOWN)
+
+    @staticmethod
+    async def _dispatch(alerts: asyncio.Queue, outputs: list[asyncio.Queue]) -> None:
+        while True:
+            alert = await alerts.get()
+            start = time.monotonic()
+            for output in outputs:
+                # Alerts are immutable, all stages can share the same alert
+                await output.put(alert)
+            if alert is SHUTDOWN:
+                break
+            METRICS.record("dispatch", alert, start)
+
+    @staticmethod
+    async def _run_in_executor(
+            alerts: asyncio.Queue,
+            executor: concurrent.futures.Executor,
+            handle: Callable[[Alert], Any],
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            alert = await alerts.get()
+            if alert is SHUTDOWN:
+                break
+            await loop.run_in_executor(executor, handle, alert)
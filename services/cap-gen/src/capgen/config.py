@@ -26,6 +26,30 @@ class Config:
     SAVE_PATH = os.path.abspath(os.path.join(base_path, "..", "..", "feeds/"))
     POST_API_PATH = os.environ.get("POST_API_PATH", "")
 
+    # Feed with the last alerts. Set the size to 0 to disable it
+    ROLLING_FEED_FILE_NAME = "test_rolling.xml"
+    ROLLING_FEED_SIZE = int(os.environ.get("ROLLING_FEED_SIZE", 10))
+
+    # Validation of the feeds against the CAP 1.1 schema: "every", "sample" or "off".
+    # In sample mode one out of each CAP_VALIDATION_SAMPLE_RATE feeds is validated
+    CAP_VALIDATION = os.environ.get("CAP_VALIDATION", "off")
+    CAP_VALIDATION_SAMPLE_RATE = int(os.environ.get("CAP_VALIDATION_SAMPLE_RATE", 100))
+
+    # If 1, the updated date of the feeds is the time of the alert instead of
+    # the current time. The same alert then always produces the same file
+    DETERMINISTIC_FEEDS = os.environ.get("DETERMINISTIC_FEEDS", "0") == "1"
+
+    # How the services run: "threads", one thread per service, or "asyncio",
+    # an event loop with executors for writing files and posting alerts
+    RUNTIME = os.environ.get("CAPGEN_RUNTIME", "threads")
+
+    # Latency metrics of the alerts. They are served at
+    # http://METRICS_HOST:METRICS_PORT/metrics if the port is not 0, and
+    # summarized in the log every METRICS_LOG_INTERVAL seconds if it is not 0
+    METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+    METRICS_PORT = int(os.environ.get("METRICS_PORT", 0))
+    METRICS_LOG_INTERVAL = float(os.environ.get("METRICS_LOG_INTERVAL", 300))
+
     @staticmethod
     def init_app(app):
         pass
@@ -53,6 +77,7 @@ class ProdConfig(Config):
     UPDATE_FILE_NAME = "sasmex"
     EVENT_FILE_NAME = "sasmex_evento"
     EVENT_UPDATE_FILE_NAME = "sasmex_evento"
+    ROLLING_FEED_FILE_NAME = "sasmex_rolling.xml"
 
     IP = get_env_variable("CLIENT_IP")
     PORT = get_env_variable("CLIENT_PORT", int)
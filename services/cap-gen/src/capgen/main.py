@@ -1,10 +1,13 @@
 import logging
+from rss.cap.rss import FEED_VALIDATOR
 from socketlib.utils.watch_dog import WatchDog
 from socketlib.utils.logger import get_module_logger
 import sys
-from typing import Callable, Optional
+from typing import Callable, Literal, Optional
 
 from capgen import CONFIG
+from capgen.async_runtime import AsyncRuntime
+from capgen.metrics import MetricsReporter, MetricsServer, log_summary
 from capgen.services import (
     AlertsClient,
     AlertDispatcher,
@@ -23,12 +26,86 @@ def main(
         use_watchdog: bool = False,
         stop: Optional[Callable[[], bool]] = None,
         logger: Optional[logging.Logger] = None,
-        exit_error: bool = True
+        exit_error: bool = True,
+        runtime: Literal["threads", "asyncio"] = CONFIG.RUNTIME,
 ) -> None:
+    """ Run the cap generator.
+
+        With the "threads" runtime each service runs in its own thread and
+        the watchdog can be used. With the "asyncio" runtime the services run
+        in an event loop, see capgen.async_runtime. The watchdog is not used.
+    """
+    if runtime not in ("threads", "asyncio"):
+        raise ValueError(f"Invalid runtime {runtime}")
+
     if logger is not None:
         logger.info(f"RSS CAP generator")
-        logger.info(f"AlertsClient will attempt to connect to {address}")
+        logger.info(f"AlertsClient will attempt to connect to {address} ({runtime} runtime)")
+
+    # Invalid feeds are logged by the feed writer, they are still published
+    FEED_VALIDATOR.configure(
+        CONFIG.CAP_VALIDATION, CONFIG.CAP_VALIDATION_SAMPLE_RATE, strict=False
+    )
+
+    metrics_server = None
+    if CONFIG.METRICS_PORT:
+        metrics_server = MetricsServer(CONFIG.METRICS_PORT, CONFIG.METRICS_HOST)
+        metrics_server.start()
+        if logger:
+            host, port = metrics_server.address
+            logger.info(f"Serving latency metrics at http://{host}:{port}/metrics")
+
+    try:
+        if runtime == "asyncio":
+            error = AsyncRuntime(
+                address=address,
+                reconnect=reconnect,
+                timeout=timeout,
+                heartbeats=heart_beats,
+                api_url=api_url,
+                stop=stop,
+                logger=logger,
+                metrics_log_interval=CONFIG.METRICS_LOG_INTERVAL,
+            ).run()
+        else:
+            error = _run_threads(
+                address, reconnect, timeout, heart_beats, api_url, use_watchdog, stop, logger)
+    finally:
+        if metrics_server is not None:
+            metrics_server.shutdown()
+
+    if logger:
+        log_summary(logger)
+
+    if logger and FEED_VALIDATOR.mode != "off":
+        stats = FEED_VALIDATOR.stats()
+        logger.info(
+            f"CAP validation: {stats.validated} feeds validated, {stats.failed} invalid, "
+            f"mean time {stats.mean_time * 1000:.2f} ms, max time {stats.max_time * 1000:.2f} ms"
+        )
+
+    if error and exit_error:
+        if logger:
+            logger.info("An error occurred, exiting...")
+        sys.exit(1)
+
+    if logger:
+        logger.info("Graceful shutdown")
 
+
+def _run_threads(
+        address: tuple[str, int],
+        reconnect: bool,
+        timeout: Optional[float],
+        heart_beats: float,
+        api_url: str,
+        use_watchdog: bool,
+        stop: Optional[Callable[[], bool]],
+        logger: Optional[logging.Logger],
+) -> bool:
+    """ Run each service in its own thread. Returns True if it ended because
+        of an error.
+    """
     client = AlertsClient(
         address=address,
         reconnect=reconnect,
@@ -61,6 +138,11 @@ def main(
 
         watchdog = WatchDog(threads)
 
+    reporter = None
+    if logger and CONFIG.METRICS_LOG_INTERVAL > 0:
+        reporter = MetricsReporter(logger, CONFIG.METRICS_LOG_INTERVAL)
+        reporter.start()
+
     error = True
     with client:
         client.connect()
@@ -88,19 +170,20 @@ def main(
             if watchdog:
                 watchdog.shutdown()
         finally:
+            # Each service handles what is already queued before it ends, so
+            # the alerts that were received are still written and posted
             client.shutdown()
+            message_processor.shutdown()
             alert_dispatcher.shutdown()
             feed_writer.shutdown()
 
             if feed_poster is not None:
                 feed_poster.shutdown()
 
-    if error and exit_error:
-        if logger:
-            logger.info("An error occurred, exiting...")
-        sys.exit(1)
+            if reporter is not None:
+                reporter.shutdown()
 
-    logger.info("Graceful shutdown")
+    return error
 
 
 if __name__ == "__main__":
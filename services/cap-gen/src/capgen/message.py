@@ -0,0 +1,88 @@
+""" Parser of the messages of the alerts server.
+
+    Alert msg format:
+
+    84,3,Event/Alert,City1/City2/.../CityN,Station,yyyy/mm/dd,hh:mm:ss,hourMsg\r\n
+
+    A single regular expression checks the layout of the message: every
+    number only has digits, and the date and time are zero padded. The day,
+    month, hour, minute and second are then sliced from their fixed positions
+    and their ranges are checked, so an invalid message returns None without
+    raising an exception. The messages of a day share their date, so its
+    validation is cached.
+
+    The parser is stricter than splitting the decoded message and calling
+    int and strptime on the pieces, which accept signs, spaces and dates that
+    are not zero padded.
+"""
+import datetime
+import functools
+import re
+from typing import Iterable, NamedTuple, Optional
+
+MSG_CODE = b"84,3,"
+
+_MESSAGE = re.compile(
+    rb"\s*84,3,(\d+),(\d+(?:/\d+)*),(\d+),(\d{4}/\d\d/\d\d),(\d\d:\d\d:\d\d)(?:,.*|\s*)",
+    re.DOTALL,
+)
+# Days of each month in a non leap year
+_MONTH_DAYS = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+class AlertMessage(NamedTuple):
+    states: list[int]
+    region: int
+    date: datetime.datetime
+    is_event: bool
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_date(date: bytes) -> Optional[tuple[int, int, int]]:
+    """ The year, month and day of a yyyy/mm/dd date, or None if it is not valid. """
+    year = int(date[:4])
+    month = int(date[5:7])
+    day = int(date[8:])
+    if year == 0 or not 1 <= month <= 12:
+        return None
+    max_day = _MONTH_DAYS[month]
+    if month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0):
+        max_day = 29
+    if not 1 <= day <= max_day:
+        return None
+    return year, month, day
+
+
+def parse_message(msg: bytes) -> Optional[AlertMessage]:
+    """ Parse a message of the alerts server.
+
+        :param msg: The message, with or without its line ending.
+        :return: The states, region, date and whether it is an event, or
+            None if the message does not have the alert code or is invalid.
+    """
+    match = _MESSAGE.fullmatch(msg)
+    if match is None:
+        return None
+    # The hour of the message is not used
+    alert_type, cities, region, date, hour = match.groups()
+    ymd = _parse_date(date)
+    hours = int(hour[:2])
+    minutes = int(hour[3:5])
+    seconds = int(hour[6:])
+    if ymd is None or hours > 23 or minutes > 59 or seconds > 59:
+        return None
+    return AlertMessage(
+        [int(city) for city in cities.split(b"/")],
+        int(region),
+        datetime.datetime(*ymd, hours, minutes, seconds),
+        int(alert_type) == 0,
+    )
+
+
+def parse_messages(msgs: Iterable[bytes]) -> list[Optional[AlertMessage]]:
+    """ Parse a batch of messages of the alerts server.
+
+        :return: The parsed message, or None, for each message in order.
+    """
+    parse = parse_message
+    return [parse(msg) for msg in msgs]
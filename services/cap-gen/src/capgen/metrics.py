@@ -0,0 +1,282 @@
+""" Latency metrics of the alerts that go through the cap generator.
+
+    Each message is stamped with the time.monotonic() time it was received
+    (see ReceivedMessage), and the alert created from it carries that time
+    in Alert.received. Every stage records in METRICS:
+
+        - stage_seconds: the time the stage spent handling the alert.
+        - since_received_seconds: the time from the reception of the message
+          until the stage was done with the alert. For the "write" and "post"
+          stages it is the end to end latency of the alert.
+
+    The upstream delay is the time between the date of the message and its
+    reception. The date of the message is the local time of the sender, so
+    it is only meaningful if both clocks are synchronized and in the same
+    time zone.
+
+    The metrics are served in the Prometheus text format by MetricsServer
+    and summarized in the log by log_summary.
+"""
+import bisect
+import datetime
+import http.server
+import logging
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from rss.cap.alert import Alert
+
+# Upper bounds of the buckets of the histograms, in seconds
+BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1., 2.5, 5., 10., 30., 60.
+)
+
+STAGES = ("process", "dispatch", "write", "post")
+
+
+class ReceivedMessage(bytes):
+    """ A message with the time.monotonic() time when it was received.
+    """
+    received: float
+
+    def __new__(cls, data: bytes, received: Optional[float] = None):
+        msg = super().__new__(cls, data)
+        msg.received = time.monotonic() if received is None else received
+        return msg
+
+
+class HistogramSnapshot(NamedTuple):
+    count: int
+    total: float
+    max: float
+    # Number of observations in each bucket, the last one has the
+    # observations greater than the last bound
+    counts: tuple[int, ...]
+
+    def quantile(self, q: float) -> float:
+        """ Returns an upper bound of the quantile: the bound of the bucket
+            that contains it, or the maximum if it is in the last bucket.
+        """
+        if self.count == 0:
+            return 0.
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class Histogram:
+    """ Counts observations in the buckets of BUCKETS. Thread safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(BUCKETS) + 1)
+        self._count = 0
+        self._total = 0.
+        self._max = 0.
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(BUCKETS, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._total += value
+            self._max = max(self._max, value)
+
+    def snapshot(self) -> HistogramSnapshot:
+        with self._lock:
+            return HistogramSnapshot(self._count, self._total, self._max, tuple(self._counts))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = [0] * (len(BUCKETS) + 1)
+            self._count = 0
+            self._total = 0.
+            self._max = 0.
+
+
+class PipelineMetrics:
+    """ The latency histograms of the stages of the pipeline.
+    """
+
+    def __init__(self):
+        self.stage_seconds = {stage: Histogram() for stage in STAGES}
+        self.since_received_seconds = {stage: Histogram() for stage in STAGES}
+        self.upstream_delay_seconds = Histogram()
+
+    def record(self, stage: str, alert: Alert, start: float) -> None:
+        """ Record that a stage is done with an alert.
+
+            :param stage: The name of the stage, one of STAGES.
+            :param alert: The alert.
+            :param start: The time.monotonic() time when the stage got the alert.
+        """
+        end = time.monotonic()
+        self.stage_seconds[stage].observe(end - start)
+        if alert.received is not None:
+            self.since_received_seconds[stage].observe(end - alert.received)
+
+    def record_upstream_delay(self, alert: Alert) -> None:
+        """ Record the time between the date of an alert and the reception of
+            its message.
+        """
+        if alert.received is None:
+            return
+        elapsed = time.monotonic() - alert.received
+        received = datetime.datetime.now() - datetime.timedelta(seconds=elapsed)
+        self.upstream_delay_seconds.observe((received - alert.time).total_seconds())
+
+    def histograms(self) -> dict[str, dict[str, Histogram]]:
+        """ Maps the name of each metric to its histogram for each stage. The
+            upstream delay has a single histogram, with an empty stage.
+        """
+        return {
+            "stage_seconds": self.stage_seconds,
+            "since_received_seconds": self.since_received_seconds,
+            "upstream_delay_seconds": {"": self.upstream_delay_seconds},
+        }
+
+    def reset(self) -> None:
+        for histograms in self.histograms().values():
+            for histogram in histograms.values():
+                histogram.reset()
+
+    def to_prometheus(self) -> str:
+        """ Returns the metrics in the Prometheus text format.
+        """
+        help_texts = {
+            "stage_seconds": "Time each stage spent handling an alert",
+            "since_received_seconds": "Time from the reception of a message until "
+                                      "each stage was done with its alert",
+            "upstream_delay_seconds": "Time from the date of a message until its reception",
+        }
+        lines = []
+        for name, histograms in self.histograms().items():
+            metric = f"capgen_{name}"
+            lines.append(f"# HELP {metric} {help_texts[name]}")
+            lines.append(f"# TYPE {metric} histogram")
+            for stage, histogram in histograms.items():
+                snapshot = histogram.snapshot()
+                label = f'stage="{stage}",' if stage else ""
+                cumulative = 0
+                for bound, count in zip(BUCKETS, snapshot.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{{label}le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{{label}le="+Inf"}} {snapshot.count}')
+                label = f'{{stage="{stage}"}}' if stage else ""
+                lines.append(f"{metric}_sum{label} {snapshot.total}")
+                lines.append(f"{metric}_count{label} {snapshot.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> list[str]:
+        """ Returns a line with the count, median, 99th percentile and maximum
+            in milliseconds of each histogram that has observations.
+        """
+        lines = []
+        for name, histograms in self.histograms().items():
+            for stage, histogram in histograms.items():
+                snapshot = histogram.snapshot()
+                if snapshot.count == 0:
+                    continue
+                label = f"{name}[{stage}]" if stage else name
+                lines.append(
+                    f"{label}: count {snapshot.count}, "
+                    f"p50 <= {snapshot.quantile(0.5) * 1000:.1f} ms, "
+                    f"p99 <= {snapshot.quantile(0.99) * 1000:.1f} ms, "
+                    f"max {snapshot.max * 1000:.1f} ms"
+                )
+        return lines
+
+
+# Metrics of the alerts of this process
+METRICS = PipelineMetrics()
+
+
+def log_summary(logger: logging.Logger, metrics: PipelineMetrics = METRICS) -> None:
+    """ Log the summary of the metrics, if any alert was recorded.
+    """
+    lines = metrics.summary()
+    if lines:
+        logger.info("Alert latency: " + "; ".join(lines))
+
+
+class MetricsReporter:
+    """ Logs the summary of the metrics every certain time, in a thread.
+    """
+
+    def __init__(
+            self,
+            logger: logging.Logger,
+            interval: float,
+            metrics: PipelineMetrics = METRICS,
+    ):
+        self._logger = logger
+        self.interval = interval
+        self._metrics = metrics
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._report, daemon=True)
+
+    def _report(self) -> None:
+        while not self._stop.wait(self.interval):
+            log_summary(self._logger, self._metrics)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+
+    metrics = METRICS  # type: PipelineMetrics
+
+    def do_GET(self) -> None:
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = self.metrics.to_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        # Scrapes are not logged
+        pass
+
+
+class MetricsServer:
+    """ Serves the metrics in the Prometheus text format at /metrics, in a thread.
+
+        The server only listens on the local host by default.
+    """
+
+    def __init__(
+            self,
+            port: int,
+            host: str = "127.0.0.1",
+            metrics: PipelineMetrics = METRICS,
+    ):
+        handler = type("MetricsHandler", (_MetricsHandler,), {"metrics": metrics})
+        self._server = http.server.ThreadingHTTPServer((host, port), handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def address(self) -> tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
@@ -3,4 +3,5 @@ from .alert_dispatcher import AlertDispatcher
 from .api_client import APIClient
 from .feed_poster import FeedPoster
 from .feed_writer import FeedWriter
+from .handoff import SHUTDOWN, HandoffService
 from .msg_processor import MessageProcessor
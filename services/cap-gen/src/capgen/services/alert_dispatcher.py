@@ -1,15 +1,15 @@
-import copy
 import logging
 import queue
+import time
 from typing import Callable, Optional
 
-from socketlib.basic.queues import get_from_queue
-from socketlib.services import AbstractService
-
 from rss.cap.alert import Alert
 
+from capgen.metrics import METRICS
+from capgen.services.handoff import HandoffService
+
 
-class AlertDispatcher(AbstractService):
+class AlertDispatcher(HandoffService):
     """ Send alerts to other services such as FeedWriter and FeedPoster.
     """
     def __init__(
@@ -25,7 +25,6 @@ class AlertDispatcher(AbstractService):
         )
         self._to_write = queue.Queue()
         self._to_post = queue.Queue()
-        self.wait = 0.1
 
     @property
     def to_write(self) -> queue.Queue[Alert]:
@@ -39,12 +38,12 @@ class AlertDispatcher(AbstractService):
     def alerts(self) -> queue.Queue[Alert]:
         return self._in
 
-    def _handle_message(self):
-        while not self._stop():
-            self._dispatch_alerts()
+    def _outputs(self) -> list[queue.Queue]:
+        return [self._to_write, self._to_post]
 
-    def _dispatch_alerts(self) -> None:
-        alert = get_from_queue(self.alerts, self.wait)
-        if alert is not None:
-            self.to_write.put(alert)
-            self.to_post.put(copy.deepcopy(alert))
\ No newline at end of file
+    def _handle_item(self, alert: Alert) -> None:
+        start = time.monotonic()
+        # Alerts are immutable, both services can share the same alert
+        self.to_write.put(alert)
+        self.to_post.put(alert)
+        METRICS.record("dispatch", alert, start)
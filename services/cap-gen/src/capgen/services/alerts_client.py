@@ -1,8 +1,22 @@
 import logging
+import queue
 import time
 from socketlib import Client
 from socketlib.basic.send import send_msg
-from typing import Callable, Optional
+from typing import Any, Callable, Optional
+
+from capgen.metrics import ReceivedMessage
+
+
+class ReceivedQueue(queue.Queue):
+    """ Queue that stamps the messages put in it with the time they were
+        received, see capgen.metrics.
+    """
+
+    def _put(self, item: Any) -> None:
+        if type(item) is bytes:
+            item = ReceivedMessage(item)
+        super()._put(item)
 
 
 class AlertsClient(Client):
@@ -21,6 +35,7 @@ class AlertsClient(Client):
     ):
         super().__init__(
             address=address,
+            received=ReceivedQueue(),
             reconnect=reconnect,
             timeout=timeout,
             stop_receive=stop_receive,
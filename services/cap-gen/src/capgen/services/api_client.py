@@ -3,6 +3,7 @@ from typing import Literal, Optional
 
 import requests
 from rss.cap.alert import Alert
+from rss.cap.codec import encode_alert
 from rss.cap.states import STATES_CODES
 
 from capgen import CONFIG
@@ -17,24 +18,14 @@ class APIClient:
 
     def post_alert(self, alert: Alert, save_path: str = "") -> requests.Response:
         """ Post a new alert. """
-        references = []
-        if alert.refs is not None:
-            references = [ref.id for ref in alert.refs]
-
         url = f"{self.base_url}/alerts/"
         if save_path:
             url += f"?save_path={save_path}"
 
         res = requests.post(
             url,
-            json={
-                "time": alert.time.isoformat(timespec="seconds"),
-                "states": alert.states,
-                "region": alert.region,
-                "is_event": alert.is_event,
-                "id": alert.id,
-                "references": references,
-            },
+            data=encode_alert(alert),
+            headers={"Content-Type": "application/json"},
             auth=self.credentials
         )
         return res
@@ -1,19 +1,25 @@
+import hashlib
 import logging
 import queue
+import time
 from typing import Callable, Optional
 
 import requests
 from rss.cap.alert import Alert
-from socketlib.basic.queues import get_from_queue
-from socketlib.services import AbstractService
+from rss.cap.codec import encode_alert
+from rss.cap.rss import PublishedFeeds
 
 from capgen import CONFIG
+from capgen.metrics import METRICS
 from capgen.services.api_client import APIClient
+from capgen.services.handoff import HandoffService
 
 
-class FeedPoster(AbstractService):
+class FeedPoster(HandoffService):
     """ Class to post the cap feeds to our API so, they can be saved
         in the database.
+
+        An alert that was already posted successfully is not posted again.
     """
     def __init__(
             self,
@@ -27,8 +33,9 @@ class FeedPoster(AbstractService):
             stop=stop,
             logger=logger
         )
-        self.wait = 0.1
         self._client = APIClient(api_url)
+        # Digest of the last document posted for each alert id
+        self._posted = PublishedFeeds()
 
     @property
     def client(self) -> APIClient:
@@ -38,25 +45,37 @@ class FeedPoster(AbstractService):
     def alerts(self) -> queue.Queue[Alert]:
         return self._in
 
-    def _handle_message(self):
-        while not self._stop():
-            self._post_alerts()
-
-    def _post_alerts(self):
-        alert = get_from_queue(self.alerts, self.wait)
-        if alert is not None:
-            try:
-                res = self.client.post_alert(alert, CONFIG.POST_API_PATH)
-            except requests.ConnectionError:
-                if self._logger:
-                    self._logger.info(
-                        f"Post alert connection error. "
-                        f"Failed to post alert to {self.client.base_url}")
-                return
-
-            if res.ok and self._logger:
-                self._logger.info("Posted new alert to API")
-            elif self._logger:
+    def _outputs(self) -> list[queue.Queue]:
+        # Nothing is put in the output queue
+        return []
+
+    def _handle_item(self, alert: Alert) -> None:
+        self.post_alert(alert)
+
+    def post_alert(self, alert: Alert) -> None:
+        """ Post an alert to the API, unless it was already posted.
+        """
+        start = time.monotonic()
+        digest = hashlib.sha256(encode_alert(alert)).hexdigest()
+        if self._posted.is_unchanged(alert.id, digest):
+            if self._logger:
+                self._logger.info(f"Alert {alert.id} was already posted")
+            return
+        try:
+            res = self.client.post_alert(alert, CONFIG.POST_API_PATH)
+        except requests.ConnectionError:
+            if self._logger:
                 self._logger.info(
-                    f"Failed to post alert to {self.client.base_url} "
-                    f"Status code: {res.status_code}")
+                    f"Post alert connection error. "
+                    f"Failed to post alert to {self.client.base_url}")
+            return
+
+        if res.ok:
+            self._posted.update(alert.id, digest)
+            METRICS.record("post", alert, start)
+            if self._logger:
+                self._logger.info("Posted new alert to API")
+        elif self._logger:
+            self._logger.info(
+                f"Failed to post alert to {self.client.base_url} "
+                f"Status code: {res.status_code}")
@@ -1,24 +1,36 @@
 import logging
 import os
 import queue
+import time
 from typing import Callable, Optional
 
 from rss.cap.alert import Alert
-from rss.cap.rss import create_feed, write_feed_to_file
-from socketlib.basic.queues import get_from_queue
-from socketlib.services import AbstractService
+from rss.cap.rss import PublishedFeeds, RollingFeed, create_feed, write_feed_to_file
 
 from capgen import CONFIG
+from capgen.metrics import METRICS
+from capgen.services.handoff import HandoffService
 
 
-class FeedWriter(AbstractService):
-    """ Receives Alert objects and writes a cap file. """
+class FeedWriter(HandoffService):
+    """ Receives Alert objects and writes a cap file.
+
+        Optionally, it also keeps a rolling feed with the last alerts
+        which is rewritten every time a new alert arrives.
+
+        Files are not written again if their contents did not change. With
+        deterministic feeds, an alert that is received twice is written once.
+        Otherwise, the cap file of an alert has the current time, so it is
+        always written.
+    """
 
     def __init__(
             self,
             alerts: Optional[queue.Queue[Alert]] = None,
             stop: Optional[Callable[[], bool]] = None,
-            logger: Optional[logging.Logger] = None
+            logger: Optional[logging.Logger] = None,
+            rolling_feed_size: int = CONFIG.ROLLING_FEED_SIZE,
+            deterministic: bool = CONFIG.DETERMINISTIC_FEEDS,
     ):
         super().__init__(
             in_queue=alerts,
@@ -26,31 +38,75 @@ class FeedWriter(AbstractService):
             logger=logger
         )
         self.save_path = CONFIG.SAVE_PATH
-        self.wait = 0.2
+        self._deterministic = deterministic
+        # Digest of the rolling feed, and of the cap file of each alert id
+        # when feeds are deterministic
+        self._published = PublishedFeeds()
+        self._written_alerts = PublishedFeeds()
+
+        self._rolling_feed = None
+        if rolling_feed_size > 0:
+            self._rolling_feed = RollingFeed(
+                size=rolling_feed_size,
+                deterministic=deterministic,
+                filename=CONFIG.ROLLING_FEED_FILE_NAME,
+            )
+
+    @property
+    def rolling_feed(self) -> Optional[RollingFeed]:
+        return self._rolling_feed
 
     @property
     def alerts(self) -> queue.Queue[Alert]:
         return self._in
 
-    def _handle_message(self):
-        """ Get new Alerts and write a cap file.
-        """
-        while not self._stop():
-            alert = get_from_queue(self.alerts, self.wait)
-            if alert is not None:
-                self._write_alert(alert)
+    def _outputs(self) -> list[queue.Queue]:
+        # Nothing is put in the output queue
+        return []
 
-    def _write_alert(self, alert: Alert) -> None:
+    def _handle_item(self, alert: Alert) -> None:
+        self.write_alert(alert)
+
+    def write_alert(self, alert: Alert) -> None:
+        """ Write the cap file of an alert and update the rolling feed.
+        """
         if alert is not None:
+            start = time.monotonic()
             filename = get_cap_file_name(alert)
-            feed = create_feed(alert, is_test=False)
+            feed = create_feed(alert, is_test=False, deterministic=self._deterministic)
+            if feed.validation_errors and self._logger:
+                self._logger.error(
+                    f"Feed of alert {alert.id} is not valid CAP 1.1: {feed.validation_errors}")
 
             feed_path = os.path.join(self.save_path, f"{filename}_{feed.updated_date}.cap")
+            if self._deterministic:
+                if self._written_alerts.is_unchanged(alert.id, feed.digest):
+                    # The alert was already written
+                    if self._logger:
+                        self._logger.info(
+                            f"Cap file {feed_path} did not change, it was not written")
+                    return
             write_feed_to_file(feed_path, feed)
+            if self._deterministic:
+                self._written_alerts.update(alert.id, feed.digest)
 
             if self._logger:
                 self._logger.info(f"Cap file written to {feed_path}")
 
+            if self._rolling_feed is not None:
+                self._write_rolling_feed(alert, feed.updated_date)
+            METRICS.record("write", alert, start)
+
+    def _write_rolling_feed(self, alert: Alert, updated_date: str) -> None:
+        self._rolling_feed.add(alert, updated_date)
+        feed_path = os.path.join(self.save_path, CONFIG.ROLLING_FEED_FILE_NAME)
+        if not write_feed_to_file(feed_path, self._rolling_feed, published=self._published):
+            return
+
+        if self._logger:
+            self._logger.info(
+                f"Rolling feed with {len(self._rolling_feed)} alerts written to {feed_path}")
+
 
 def get_cap_file_name(alert: Alert) -> str:
     if alert.is_event and alert.refs is not None:
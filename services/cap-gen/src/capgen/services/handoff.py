@@ -0,0 +1,58 @@
+import abc
+import queue
+from typing import Any
+
+from socketlib.services import AbstractService
+
+# Put in the input queue of a service to shut it down. A service that shuts
+# down puts it in its output queues, so the whole pipeline ends in order
+SHUTDOWN = object()
+
+
+class HandoffService(AbstractService):
+    """ A service that blocks on its input queue until an item arrives,
+        instead of polling it with a timeout. An idle service does not wake
+        up, and an item is handled as soon as it is put in the queue.
+
+        The service ends when it gets SHUTDOWN, after handling the items that
+        were queued before it. A custom stop function is checked after each
+        item, once the queue is empty; it cannot wake up a service that is
+        waiting, shutdown does.
+
+        An item that raises an exception is logged and dropped, the service
+        keeps handling the next items and the services that follow keep
+        running.
+
+        To add a new service implement the _handle_item method.
+    """
+
+    @abc.abstractmethod
+    def _handle_item(self, item: Any) -> None:
+        """ Handle an item of the input queue. """
+        raise NotImplementedError
+
+    def _outputs(self) -> list[queue.Queue]:
+        """ The queues that get SHUTDOWN when the service ends. """
+        return [self._out]
+
+    def _handle_message(self) -> None:
+        while True:
+            item = self._in.get()
+            if item is SHUTDOWN:
+                break
+            try:
+                self._handle_item(item)
+            except Exception:
+                if self._logger is not None:
+                    self._logger.exception(
+                        f"{self.__class__.__name__}: failed to handle {item!r}")
+            if self._stop() and self._in.empty():
+                break
+        for output in self._outputs():
+            output.put(SHUTDOWN)
+
+    def shutdown(self) -> None:
+        """ Handle the items that are already queued and stop the service.
+        """
+        self._in.put(SHUTDOWN)
+        super().shutdown()
@@ -1,19 +1,20 @@
-import copy
 from datetime import datetime
 import logging
 import queue
 import random
 import string
+import time
 from typing import Callable, Optional, Union
 
 from rss.cap.alert import Alert
-from socketlib.basic.queues import get_from_queue
-from socketlib.services import AbstractService
 
 from capgen import CONFIG
+from capgen.message import MSG_CODE, parse_message
+from capgen.metrics import METRICS
+from capgen.services.handoff import HandoffService
 
 
-class MessageProcessor(AbstractService):
+class MessageProcessor(HandoffService):
     """ Receives alert messages and if they are valid, converts them to an
         Alert object that can be used to create cap feeds.
 
@@ -41,7 +42,6 @@ class MessageProcessor(AbstractService):
         )
         self._updates = []  # type: list[Alert]
         self.new_alert_time = CONFIG.ALERT_TIME  # in seconds
-        self.wait = 0.1
 
     @property
     def updates(self) -> list[Alert]:
@@ -55,40 +55,52 @@ class MessageProcessor(AbstractService):
     def alerts(self) -> queue.Queue[Alert]:
         return self._out
 
-    def _handle_message(self) -> None:
-        """ Get new messages and create or update alerts.
+    def _handle_item(self, msg: bytes) -> None:
+        alert = self.process(msg)
+        if alert is not None:
+            self.alerts.put(alert)
+
+    def process(self, msg: bytes) -> Optional[Alert]:
+        """ Create or update an alert from a new message.
+
+            :return: The alert, or None if the message is not a new alert.
         """
-        while not self._stop():
-            msg = get_from_queue(self.messages, 1)
-            if msg is not None:
-                alert = self._get_alert(msg)
-                if alert is not None:
-                    self.alerts.put(alert)
-                    self.updates.append(alert)
+        start = time.monotonic()
+        alert = self._get_alert(msg)
+        if alert is not None:
+            self.updates.append(alert)
+            METRICS.record("process", alert, start)
+            METRICS.record_upstream_delay(alert)
+        return alert
 
     def _get_alert(self, msg: bytes) -> Union[Alert, None]:
         """ Get an alert from a message."""
-        msg = msg.decode().strip()
-        if msg.startswith("84,3"):
-            states, region, date, is_event = self._parse_message(msg)
-
-            self._flush_updates(date)
-            if all(self._check_state(s) for s in states):
-                if len(self.updates) == 0:
-                    refs = None
-                else:
-                    refs = copy.deepcopy(self.updates)
-                alert = Alert(
-                    time=date,
-                    states=states,
-                    region=region,
-                    id=self.alert_id(date),
-                    is_event=is_event,
-                    refs=refs
-                )
-                if self._logger:
-                    self._logger.info(f"New alert: {self._alert_str(alert)}")
-                return alert
+        parsed = parse_message(msg)
+        if parsed is None:
+            if self._logger and msg.lstrip().startswith(MSG_CODE):
+                self._logger.info(f"Invalid alert message: {msg!r}")
+            return None
+        states, region, date, is_event = parsed
+
+        self._flush_updates(date)
+        if all(self._check_state(s) for s in states):
+            if len(self.updates) == 0:
+                refs = None
+            else:
+                # Alerts are immutable, so the references are shared
+                refs = tuple(self.updates)
+            alert = Alert(
+                time=date,
+                states=states,
+                region=region,
+                id=self.alert_id(date),
+                is_event=is_event,
+                refs=refs,
+                received=getattr(msg, "received", None),
+            )
+            if self._logger:
+                self._logger.info(f"New alert: {self._alert_str(alert)}")
+            return alert
 
     def _check_state(self, state: int) -> bool:
         """ Checks that the given state is not in the queue"""
@@ -106,6 +118,9 @@ class MessageProcessor(AbstractService):
 
     @staticmethod
     def _parse_message(msg: str) -> tuple[list[int], int, datetime, bool]:
+        """ Parse a decoded message with strptime. Alerts are parsed with
+            capgen.message.parse_message, this is its reference implementation.
+        """
         pieces = msg.split(",")
         is_event = not bool(int(pieces[2]))
         cities = [int(c) for c in pieces[3].split("/")]
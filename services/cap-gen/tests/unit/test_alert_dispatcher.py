@@ -1,9 +1,10 @@
 import datetime
 import queue
+import threading
 
 from rss.cap.alert import Alert
 
-from capgen.services import AlertDispatcher
+from capgen.services import SHUTDOWN, AlertDispatcher
 
 
 class TestAlertDispatcher:
@@ -18,15 +19,54 @@ class TestAlertDispatcher:
         alerts = queue.Queue()
         alerts.put(initial_alert)
         dispatcher = AlertDispatcher(alerts)
-        dispatcher._dispatch_alerts()
+        dispatcher.start()
+        dispatcher.shutdown()
 
         assert alerts.empty()
 
         alert_write = dispatcher.to_write.get()
-        assert dispatcher.to_write.empty()
         assert alert_write == initial_alert
+        # The services that follow are shut down too
+        assert dispatcher.to_write.get_nowait() is SHUTDOWN
 
         alert_post = dispatcher.to_post.get()
-        assert dispatcher.to_post.empty()
         assert alert_post == initial_alert
-        assert alert_post is not alert_write
+        assert dispatcher.to_post.get_nowait() is SHUTDOWN
+        # Alerts are immutable, so they are shared instead of copied
+        assert alert_post is alert_write
+
+    def test_alerts_are_dispatched_without_delay(self):
+        dispatcher = AlertDispatcher()
+        dispatcher.start()
+        # The dispatcher waits on its queue, it does not poll it
+        event = threading.Event()
+        dispatcher.alerts.put(
+            Alert(time=datetime.datetime.now(), states=[40], region=41203, id="FAST"))
+        threading.Thread(target=lambda: (dispatcher.to_write.get(), event.set())).start()
+        assert event.wait(0.05)
+        dispatcher.shutdown()
+
+    def test_failed_alert_does_not_shut_down_the_pipeline(self, mocker):
+        record = mocker.patch("capgen.services.alert_dispatcher.METRICS.record")
+        record.side_effect = [ValueError("failed"), None]
+        dispatcher = AlertDispatcher()
+        dispatcher.start()
+        for alert_id in ("FAILED", "NEXT"):
+            dispatcher.alerts.put(
+                Alert(time=datetime.datetime.now(), states=[40], region=41203, id=alert_id))
+
+        assert dispatcher.to_write.get(timeout=1).id == "FAILED"
+        assert dispatcher.to_write.get(timeout=1).id == "NEXT"
+        assert dispatcher.process_thread.is_alive()
+        dispatcher.shutdown()
+        dispatcher.join()
+        assert dispatcher.to_write.get_nowait() is SHUTDOWN
+
+    def test_custom_stop_function(self):
+        dispatcher = AlertDispatcher(stop=lambda: True)
+        dispatcher.start()
+        dispatcher.alerts.put(
+            Alert(time=datetime.datetime.now(), states=[40], region=41203, id="STOP"))
+        dispatcher.join()
+        assert dispatcher.to_write.get_nowait().id == "STOP"
+        assert dispatcher.to_write.get_nowait() is SHUTDOWN
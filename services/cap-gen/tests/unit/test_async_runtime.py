@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+
+from capgen.async_runtime import AsyncRuntime
+
+MESSAGES = [
+    b"84,3,1,40,41203,2023/03/22,14:04:33,46237.1234567890\r\n",
+    # Garbage data should be ignored
+    b"15,3,40,41203,2023/03/22,14:04:33,46237.1234567890\r\n",
+    b"84,3,1,41,41203,2023/03/22,14:04:35,46237.1234567890\r\n",
+]
+
+
+class AlertServer:
+    """ Sends the messages to the first client, and optionally closes the
+        connection. Records the messages of the client.
+    """
+
+    def __init__(self, close: bool = False):
+        self.close = close
+        self.received = []
+        self.port = None
+        self._server = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def _handle(self, reader, writer) -> None:
+        writer.writelines(MESSAGES)
+        await writer.drain()
+        if self.close:
+            writer.close()
+            return
+        while True:
+            try:
+                self.received.append(await reader.readuntil(b"\r\n"))
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return
+
+    def stop(self) -> None:
+        self._server.close()
+
+
+async def wait_for(condition, timeout: float = 2.) -> None:
+    start = time.monotonic()
+    while not condition():
+        assert time.monotonic() - start < timeout
+        await asyncio.sleep(0.01)
+
+
+def cap_files(path) -> list[str]:
+    return sorted(p.name.split("_")[1] for p in path.iterdir() if p.suffix == ".cap")
+
+
+class TestAsyncRuntime:
+
+    @staticmethod
+    def runtime(server: AlertServer, tmp_path, **kwargs) -> AsyncRuntime:
+        kwargs.setdefault("api_url", "")
+        runtime = AsyncRuntime(("127.0.0.1", server.port), **kwargs)
+        runtime.feed_writer.save_path = str(tmp_path)
+        return runtime
+
+    def test_writes_alerts_and_sends_heartbeats(self, tmp_path):
+        async def scenario():
+            server = AlertServer()
+            await server.start()
+            runtime = self.runtime(server, tmp_path, heartbeats=0.05)
+            task = asyncio.create_task(runtime.run_async())
+
+            await wait_for(lambda: len(cap_files(tmp_path)) == 2 and len(server.received) >= 2)
+            runtime.shutdown()
+            error = await asyncio.wait_for(task, 2)
+            server.stop()
+            return error, server.received
+
+        error, received = asyncio.run(scenario())
+        assert not error
+        assert cap_files(tmp_path) == ["alert", "update"]
+        assert set(received) == {b"ALIVE\r\n"}
+
+    def test_lost_connection_ends_after_writing_alerts(self, tmp_path):
+        async def scenario():
+            server = AlertServer(close=True)
+            await server.start()
+            error = await asyncio.wait_for(self.runtime(server, tmp_path).run_async(), 2)
+            server.stop()
+            return error
+
+        assert asyncio.run(scenario())
+        # The alerts received before the connection was lost are written
+        assert cap_files(tmp_path) == ["alert", "update"]
+
+    def test_posts_alerts_in_order(self, tmp_path, mocker):
+        mock_post = mocker.patch("capgen.services.api_client.requests.post")
+        mock_post.return_value.ok = True
+        threads = []
+
+        def post(*args, **kwargs):
+            threads.append(threading.active_count())
+            return mock_post.return_value
+
+        mock_post.side_effect = post
+
+        async def scenario():
+            server = AlertServer(close=True)
+            await server.start()
+            await self.runtime(server, tmp_path, api_url="http://localhost:5000").run_async()
+            server.stop()
+
+        before = threading.active_count()
+        asyncio.run(scenario())
+        assert mock_post.call_count == 2
+        ids = [call.kwargs["data"] for call in mock_post.call_args_list]
+        assert b"20230322140433" in ids[0] and b"20230322140435" in ids[1]
+        # Only the writer and the poster run in other threads
+        assert max(threads) <= before + 2
+
+    def test_custom_stop_function(self, tmp_path):
+        stop = threading.Event()
+
+        async def scenario():
+            server = AlertServer()
+            await server.start()
+            runtime = self.runtime(server, tmp_path, stop=stop.is_set)
+            task = asyncio.create_task(runtime.run_async())
+            await wait_for(lambda: len(cap_files(tmp_path)) == 2)
+            stop.set()
+            error = await asyncio.wait_for(task, 1)
+            server.stop()
+            return error
+
+        assert not asyncio.run(scenario())
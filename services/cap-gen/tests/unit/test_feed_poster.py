@@ -1,4 +1,5 @@
 import datetime
+import json
 import queue
 
 from rss.cap.alert import Alert
@@ -23,7 +24,8 @@ class TestFeedPoster:
         alerts = queue.Queue()
         alerts.put(alert)
         poster = FeedPoster(alerts)
-        poster._post_alerts()
+        poster.start()
+        poster.shutdown()
 
         assert alerts.empty()
 
@@ -32,13 +34,34 @@ class TestFeedPoster:
 
         mock_post.assert_called_once_with(
             url,
-            json={
-                "time": date.isoformat(timespec="seconds"),
-                "states": [40],
-                "region": 41203,
-                "is_event": False,
-                "id": "TESTALERT",
-                "references": []
-            },
+            data=mocker.ANY,
+            headers={"Content-Type": "application/json"},
             auth=(CONFIG.API_USER, CONFIG.API_PASSWORD)
         )
+        assert json.loads(mock_post.call_args.kwargs["data"]) == {
+            "time": date.isoformat(timespec="seconds"),
+            "states": [40],
+            "region": 41203,
+            "is_event": False,
+            "id": "TESTALERT",
+            "references": []
+        }
+
+    def test_alerts_are_posted_once(self, mocker):
+        mock_post = mocker.patch("capgen.services.api_client.requests.post")
+        alert = Alert(
+            time=datetime.datetime(2023, 3, 13, 16, 7, 5),
+            states=[40],
+            region=41203,
+            id="TESTALERT",
+        )
+        poster = FeedPoster()
+
+        mock_post.return_value.ok = False
+        poster.post_alert(alert)
+        # Failed posts are retried
+        mock_post.return_value.ok = True
+        for _ in range(2):
+            poster.post_alert(alert)
+
+        assert mock_post.call_count == 2
@@ -1,9 +1,11 @@
 from datetime import datetime
 
+from bs4 import BeautifulSoup
 from rss.cap.alert import Alert
+from rss.cap.rss import FEED_VALIDATOR
 
 from capgen import CONFIG
-from capgen.services.feed_writer import get_cap_file_name
+from capgen.services.feed_writer import FeedWriter, get_cap_file_name
 
 
 class TestCapFileName:
@@ -67,3 +69,93 @@ class TestCapFileName:
             refs=references
         )
         assert get_cap_file_name(event) == CONFIG.UPDATE_FILE_NAME
+
+
+class TestRollingFeed:
+
+    @staticmethod
+    def sample_alert(second: int) -> Alert:
+        return Alert(
+            time=datetime(year=2023, month=3, day=13, hour=16, minute=7, second=second),
+            states=[40],
+            region=41203,
+            is_event=False,
+            id=f"TEST_ALERT{second}"
+        )
+
+    def test_writes_rolling_feed(self, tmp_path):
+        writer = FeedWriter(rolling_feed_size=2)
+        writer.save_path = str(tmp_path)
+        for second in range(3):
+            writer.write_alert(self.sample_alert(second))
+
+        rolling_path = tmp_path / CONFIG.ROLLING_FEED_FILE_NAME
+        data = BeautifulSoup(rolling_path.read_text(), "xml")
+        ids = [entry.id.string for entry in data.feed.find_all("entry")]
+        assert ids == ["TEST_ALERT2", "TEST_ALERT1"]
+        link = data.feed.find("link", rel="self")
+        assert link["href"].endswith("/" + CONFIG.ROLLING_FEED_FILE_NAME)
+
+        cap_files = [p for p in tmp_path.iterdir() if p.suffix == ".cap"]
+        assert len(cap_files) == 3
+
+    def test_rolling_feed_can_be_disabled(self, tmp_path):
+        writer = FeedWriter(rolling_feed_size=0)
+        writer.save_path = str(tmp_path)
+        writer.write_alert(self.sample_alert(0))
+
+        assert writer.rolling_feed is None
+        assert not (tmp_path / CONFIG.ROLLING_FEED_FILE_NAME).exists()
+
+    def test_logs_invalid_feeds(self, tmp_path, mocker):
+        mocker.patch.object(FEED_VALIDATOR, "check", return_value=["invalid status"])
+        logger = mocker.Mock()
+        writer = FeedWriter(rolling_feed_size=0, logger=logger)
+        writer.save_path = str(tmp_path)
+        writer.write_alert(self.sample_alert(0))
+
+        logger.error.assert_called_once()
+        assert "invalid status" in logger.error.call_args[0][0]
+        # Invalid feeds are still written
+        assert len(list(tmp_path.iterdir())) == 1
+
+    def test_deterministic_alert_is_written_once(self, tmp_path):
+        writer = FeedWriter(rolling_feed_size=2, deterministic=True)
+        writer.save_path = str(tmp_path)
+        for _ in range(2):
+            writer.write_alert(self.sample_alert(0))
+
+        cap_files = [p for p in tmp_path.iterdir() if p.suffix == ".cap"]
+        assert len(cap_files) == 1
+        assert cap_files[0].name.endswith("_2023-03-13T16:07:00.cap")
+        assert len(writer.rolling_feed) == 1
+
+    def test_failed_alert_does_not_stop_the_writer(self, tmp_path, mocker):
+        logger = mocker.Mock()
+        writer = FeedWriter(rolling_feed_size=0, logger=logger)
+        writer.save_path = str(tmp_path)
+        writer.start()
+        # The region does not exist, so its feed cannot be rendered
+        invalid = Alert(datetime(2023, 3, 13, 16, 7, 0), [40], 99999, id="INVALID")
+        writer.alerts.put(invalid)
+        writer.alerts.put(self.sample_alert(1))
+        writer.shutdown()
+        writer.join()
+
+        logger.exception.assert_called_once()
+        assert "INVALID" in logger.exception.call_args[0][0]
+        cap_files = [p for p in tmp_path.iterdir() if p.suffix == ".cap"]
+        assert len(cap_files) == 1
+
+    def test_alert_is_written_every_time_if_not_deterministic(self, tmp_path, mocker):
+        logger = mocker.Mock()
+        writer = FeedWriter(rolling_feed_size=2, deterministic=False, logger=logger)
+        writer.save_path = str(tmp_path)
+        for _ in range(2):
+            writer.write_alert(self.sample_alert(0))
+
+        written = [
+            call for call in logger.info.call_args_list
+            if call[0][0].startswith("Cap file written")
+        ]
+        assert len(written) == 2
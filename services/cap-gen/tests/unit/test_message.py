@@ -0,0 +1,104 @@
+import datetime
+import random
+
+import pytest
+
+from capgen.message import AlertMessage, parse_message, parse_messages
+from capgen.services import MessageProcessor
+
+
+def reference_parse(msg: bytes):
+    """ Parse a message the way MessageProcessor did before parse_message. """
+    text = msg.decode().strip()
+    if not text.startswith("84,3"):
+        return None
+    return MessageProcessor._parse_message(text)
+
+
+def random_message(rng: random.Random) -> bytes:
+    date = datetime.datetime(1970, 1, 1) + datetime.timedelta(
+        seconds=rng.randrange(0, 200 * 365 * 24 * 3600))
+    states = "/".join(str(rng.randrange(1, 100)) for _ in range(rng.randrange(1, 5)))
+    line_end = rng.choice(["\r\n", "\n", ""])
+    return (f"84,3,{rng.randrange(0, 3)},{states},{rng.randrange(0, 100000)},"
+            f"{date:%Y/%m/%d,%H:%M:%S},{rng.random() * 1e5:.10f}{line_end}").encode()
+
+
+def mutate(msg: bytes, rng: random.Random) -> bytes:
+    data = bytearray(msg)
+    for _ in range(rng.randrange(1, 4)):
+        pos = rng.randrange(0, len(data) + 1)
+        action = rng.randrange(3)
+        char = ord(rng.choice("0123456789,/: -+x"))
+        if action == 0 and pos < len(data):
+            data[pos] = char
+        elif action == 1:
+            data.insert(pos, char)
+        elif pos < len(data):
+            del data[pos]
+    return bytes(data)
+
+
+class TestParseMessage:
+
+    def test_parse_message(self):
+        msg = b"84,3,1,40/41,41203,2023/03/22,14:04:33,46237.1234567890\r\n"
+        assert parse_message(msg) == AlertMessage(
+            [40, 41], 41203, datetime.datetime(2023, 3, 22, 14, 4, 33), False)
+
+    def test_parse_event_message(self):
+        msg = b"84,3,0,40,41203,2023/03/22,14:04:33,46237.1234567890\r\n"
+        assert parse_message(msg).is_event
+
+    def test_message_without_hour(self):
+        msg = b"84,3,1,40,41203,2024/02/29,00:00:00"
+        assert parse_message(msg).date == datetime.datetime(2024, 2, 29)
+        assert parse_message(msg + b"\r\n").date == datetime.datetime(2024, 2, 29)
+
+    @pytest.mark.parametrize("msg", [
+        b"15,3,40,41203,2023/03/22,14:04:33,46237.1234567890\r\n",
+        b"84,3\r\n",
+        b"84,3,1,40,41203,2023/03/22,14:04:33x\r\n",
+        b"84,3,1,40,41203,2023/03/22\r\n",
+        b"84,3,x,40,41203,2023/03/22,14:04:33,46237.1234567890\r\n",
+        b"84,3,1,40/,41203,2023/03/22,14:04:33,46237.1234567890\r\n",
+        b"84,3,1,40,-1,2023/03/22,14:04:33,46237.1234567890\r\n",
+        b"84,3,1,40,41203,2023/3/22,14:04:33,46237.1234567890\r\n",
+        b"84,3,1,40,41203,2023-03-22,14:04:33,46237.1234567890\r\n",
+        b"84,3,1,40,41203,2023/13/22,14:04:33,46237.1234567890\r\n",
+        b"84,3,1,40,41203,2023/02/29,14:04:33,46237.1234567890\r\n",
+        b"84,3,1,40,41203,2100/02/29,14:04:33,46237.1234567890\r\n",
+        b"84,3,1,40,41203,2023/04/31,14:04:33,46237.1234567890\r\n",
+        b"84,3,1,40,41203,0000/01/01,14:04:33,46237.1234567890\r\n",
+        b"84,3,1,40,41203,2023/03/22,24:04:33,46237.1234567890\r\n",
+        b"84,3,1,40,41203,2023/03/22,14:60:33,46237.1234567890\r\n",
+        b"84,3,1,40,41203,2023/03/22,14:04:60,46237.1234567890\r\n",
+    ])
+    def test_invalid_messages(self, msg):
+        assert parse_message(msg) is None
+
+    def test_same_as_reference_parser(self):
+        rng = random.Random(84)
+        for _ in range(5000):
+            msg = random_message(rng)
+            assert parse_message(msg) == reference_parse(msg), msg
+
+    def test_accepted_messages_are_accepted_by_reference_parser(self):
+        # The parser is stricter than the reference one, but whatever it
+        # accepts is parsed the same way, and it never raises
+        rng = random.Random(3)
+        accepted = 0
+        for _ in range(20000):
+            msg = mutate(random_message(rng), rng)
+            parsed = parse_message(msg)
+            if parsed is None:
+                continue
+            accepted += 1
+            assert parsed == reference_parse(msg), msg
+        assert accepted > 0
+
+    def test_parse_messages(self):
+        rng = random.Random(1)
+        msgs = [mutate(random_message(rng), rng) for _ in range(500)]
+        assert parse_messages(msgs) == [parse_message(msg) for msg in msgs]
+        assert parse_messages([]) == []
@@ -0,0 +1,194 @@
+import datetime
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+from rss.cap.alert import Alert
+
+from capgen.metrics import (
+    BUCKETS,
+    METRICS,
+    Histogram,
+    MetricsServer,
+    PipelineMetrics,
+    ReceivedMessage,
+)
+from capgen.services import FeedPoster, MessageProcessor
+from capgen.services.alerts_client import ReceivedQueue
+
+
+@pytest.fixture
+def metrics():
+    METRICS.reset()
+    yield METRICS
+    METRICS.reset()
+
+
+class TestHistogram:
+
+    def test_observations_go_to_their_bucket(self):
+        histogram = Histogram()
+        histogram.observe(0.0005)
+        histogram.observe(0.001)
+        histogram.observe(0.3)
+        histogram.observe(120.)
+
+        snapshot = histogram.snapshot()
+        assert snapshot.count == 4
+        assert snapshot.total == pytest.approx(120.3015)
+        assert snapshot.max == 120.
+        assert len(snapshot.counts) == len(BUCKETS) + 1
+        assert snapshot.counts[0] == 2
+        assert snapshot.counts[BUCKETS.index(0.5)] == 1
+        assert snapshot.counts[-1] == 1
+
+    def test_quantiles(self):
+        histogram = Histogram()
+        for _ in range(99):
+            histogram.observe(0.002)
+        histogram.observe(7.)
+
+        snapshot = histogram.snapshot()
+        assert snapshot.quantile(0.5) == 0.0025
+        assert snapshot.quantile(0.99) == 0.0025
+        assert snapshot.quantile(1.) == 7.
+
+    def test_quantile_is_at_most_the_maximum(self):
+        histogram = Histogram()
+        histogram.observe(0.2)
+        assert histogram.snapshot().quantile(0.5) == 0.2
+
+    def test_empty_histogram(self):
+        snapshot = Histogram().snapshot()
+        assert snapshot.count == 0
+        assert snapshot.quantile(0.99) == 0.
+
+    def test_reset(self):
+        histogram = Histogram()
+        histogram.observe(1.)
+        histogram.reset()
+        assert histogram.snapshot().count == 0
+
+
+class TestPipelineMetrics:
+
+    def test_record_stage(self):
+        metrics = PipelineMetrics()
+        alert = Alert(
+            datetime.datetime.now(), [40], 41203, received=time.monotonic() - 1.
+        )
+        metrics.record("write", alert, time.monotonic() - 0.01)
+
+        stage = metrics.stage_seconds["write"].snapshot()
+        assert stage.count == 1
+        assert 0.01 <= stage.max < 1.
+        since_received = metrics.since_received_seconds["write"].snapshot()
+        assert since_received.count == 1
+        assert since_received.max >= 1.
+
+    def test_alert_without_reception_time(self):
+        metrics = PipelineMetrics()
+        alert = Alert(datetime.datetime.now(), [40], 41203)
+        metrics.record("post", alert, time.monotonic())
+        metrics.record_upstream_delay(alert)
+
+        assert metrics.stage_seconds["post"].snapshot().count == 1
+        assert metrics.since_received_seconds["post"].snapshot().count == 0
+        assert metrics.upstream_delay_seconds.snapshot().count == 0
+
+    def test_upstream_delay(self):
+        metrics = PipelineMetrics()
+        alert = Alert(
+            datetime.datetime.now() - datetime.timedelta(seconds=3),
+            [40], 41203,
+            received=time.monotonic(),
+        )
+        metrics.record_upstream_delay(alert)
+
+        snapshot = metrics.upstream_delay_seconds.snapshot()
+        assert snapshot.count == 1
+        assert 3. <= snapshot.max < 4.
+
+    def test_prometheus_format(self):
+        metrics = PipelineMetrics()
+        alert = Alert(datetime.datetime.now(), [40], 41203, received=time.monotonic())
+        metrics.record("process", alert, time.monotonic())
+
+        text = metrics.to_prometheus()
+        assert "# TYPE capgen_stage_seconds histogram" in text
+        assert 'capgen_stage_seconds_bucket{stage="process",le="0.001"} 1' in text
+        assert 'capgen_stage_seconds_bucket{stage="process",le="+Inf"} 1' in text
+        assert 'capgen_stage_seconds_count{stage="process"} 1' in text
+        assert 'capgen_stage_seconds_count{stage="post"} 0' in text
+        assert 'capgen_upstream_delay_seconds_bucket{le="+Inf"} 0' in text
+        assert text.endswith("\n")
+
+    def test_summary_only_has_recorded_histograms(self):
+        metrics = PipelineMetrics()
+        assert metrics.summary() == []
+
+        alert = Alert(datetime.datetime.now(), [40], 41203)
+        metrics.record("dispatch", alert, time.monotonic())
+        [line] = metrics.summary()
+        assert line.startswith("stage_seconds[dispatch]: count 1, p50 <= ")
+
+
+class TestMetricsServer:
+
+    def test_serves_metrics(self):
+        metrics = PipelineMetrics()
+        metrics.upstream_delay_seconds.observe(2.)
+        server = MetricsServer(0, metrics=metrics)
+        server.start()
+        try:
+            host, port = server.address
+            with urllib.request.urlopen(f"http://{host}:{port}/metrics") as res:
+                assert res.status == 200
+                assert res.headers["Content-Type"].startswith("text/plain")
+                body = res.read().decode()
+            assert "capgen_upstream_delay_seconds_count 1" in body
+
+            with pytest.raises(urllib.error.HTTPError) as err:
+                urllib.request.urlopen(f"http://{host}:{port}/other")
+            assert err.value.code == 404
+        finally:
+            server.shutdown()
+
+
+class TestAlertLatency:
+
+    def test_received_queue_stamps_messages(self):
+        messages = ReceivedQueue()
+        before = time.monotonic()
+        messages.put(b"84,3,1,40,41203,2023/03/22,14:04:33,46237.1234567890")
+
+        msg = messages.get()
+        assert isinstance(msg, ReceivedMessage)
+        assert msg == b"84,3,1,40,41203,2023/03/22,14:04:33,46237.1234567890"
+        assert before <= msg.received <= time.monotonic()
+
+    def test_alert_carries_reception_time(self, metrics):
+        processor = MessageProcessor()
+        msg = ReceivedMessage(
+            b"84,3,1,40,41203,2023/03/22,14:04:33,46237.1234567890", received=12.5)
+
+        alert = processor.process(msg)
+        assert alert.received == 12.5
+        assert metrics.stage_seconds["process"].snapshot().count == 1
+        assert metrics.since_received_seconds["process"].snapshot().count == 1
+        assert metrics.upstream_delay_seconds.snapshot().count == 1
+
+    def test_posted_alerts_are_recorded(self, mocker, metrics):
+        mocker.patch("capgen.services.api_client.requests.post")
+        alert = Alert(
+            datetime.datetime.now(), [40], 41203, id="TESTALERT",
+            received=time.monotonic(),
+        )
+        poster = FeedPoster()
+        poster.post_alert(alert)
+        # Already posted alerts are not recorded again
+        poster.post_alert(alert)
+
+        assert metrics.stage_seconds["post"].snapshot().count == 1
+        assert metrics.since_received_seconds["post"].snapshot().count == 1
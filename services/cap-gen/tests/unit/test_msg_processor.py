@@ -4,7 +4,7 @@ import time
 
 from rss.cap.alert import Alert
 
-from capgen.services import MessageProcessor
+from capgen.services import SHUTDOWN, MessageProcessor
 
 
 class TestMessageProcessor:
@@ -56,7 +56,9 @@ class TestMessageProcessor:
     def queue_to_list(queue_: queue.Queue):
         data = []
         while not queue_.empty():
-            data.append(queue_.get())
+            item = queue_.get()
+            if item is not SHUTDOWN:
+                data.append(item)
         return data
 
     def test_only_process_messages_with_correct_code(self):
@@ -66,6 +68,14 @@ class TestMessageProcessor:
 
         assert alert is None
 
+    def test_invalid_alert_messages_are_ignored(self):
+        msg = b"84,3,1,40,41203,2023/02/30,14:04:33,46237.1234567890\r\n"
+        message_processor = MessageProcessor(queue.Queue())
+        alert = message_processor._get_alert(msg)
+
+        assert alert is None
+        assert len(message_processor.updates) == 0
+
     def test_check_state_not_in_queue(self):
         message_processor = MessageProcessor(queue.Queue())
         alert = Alert(
@@ -142,7 +152,6 @@ class TestMessageProcessor:
         ])
         message_processor = MessageProcessor(data)
         message_processor.new_alert_time = 0.75
-        message_processor.wait = 0
         message_processor.start()
 
         time.sleep(1.5)
@@ -156,21 +165,35 @@ class TestMessageProcessor:
         alerts = self.queue_to_list(message_processor.alerts)
         # The last alert should be stored as an update
         assert len(message_processor.updates) == 1
-        assert message_processor.updates[0].states == [41]
+        assert message_processor.updates[0].states == (41,)
         assert len(alerts) == 2
 
         first_alert = alerts[0]
         assert first_alert.refs is None  # Means is not an update
         assert first_alert.time == datetime.datetime.strptime(date1, "%Y/%m/%d,%H:%M:%S")
-        assert first_alert.states == [40]
+        assert first_alert.states == (40,)
         assert first_alert.region == 41203
 
         second_alert = alerts[1]
         assert second_alert.refs is None  # Means is not an update
         assert second_alert.time == datetime.datetime.strptime(date2, "%Y/%m/%d,%H:%M:%S")
-        assert second_alert.states == [41]
+        assert second_alert.states == (41,)
         assert second_alert.region == 41203
 
+    def test_shutdown_handles_queued_messages(self):
+        data = self.put_in_queue([
+            f"84,3,1,{state},41203,2023/03/22,14:04:33,46237.1234567890\r\n".encode("utf-8")
+            for state in (40, 41, 42)
+        ])
+        message_processor = MessageProcessor(data)
+        message_processor.start()
+        message_processor.shutdown()
+
+        assert data.empty()
+        alerts = message_processor.alerts
+        assert [alerts.get_nowait().states for _ in range(3)] == [(40,), (41,), (42,)]
+        assert alerts.get_nowait() is SHUTDOWN
+
     def test_updates_alerts_if_new_arrives_before_alert_time(self):
         date1 = datetime.datetime.now().strftime("%Y/%m/%d,%H:%M:%S")
         data = self.put_in_queue([
@@ -178,7 +201,6 @@ class TestMessageProcessor:
         ])
         message_processor = MessageProcessor(data)
         message_processor.new_alert_time = 5
-        message_processor._wait = 0
         message_processor.start()
 
         time.sleep(1)
@@ -196,7 +218,7 @@ class TestMessageProcessor:
         alert_id = first_alert.id
         assert first_alert.refs is None  # Means is not an update
         assert first_alert.time == datetime.datetime.strptime(date1, "%Y/%m/%d,%H:%M:%S")
-        assert first_alert.states == [40]
+        assert first_alert.states == (40,)
         assert first_alert.region == 41203
 
         second_alert = alerts[1]
@@ -205,5 +227,5 @@ class TestMessageProcessor:
         assert references[0].id == alert_id
 
         assert second_alert.time == datetime.datetime.strptime(date2, "%Y/%m/%d,%H:%M:%S")
-        assert second_alert.states == [41]
+        assert second_alert.states == (41,)
         assert second_alert.region == 41203
@@ -0,0 +1,81 @@
+""" Compare the alert JSON codec with encoding and decoding alerts with
+    the json module and building the dictionaries by hand.
+
+    Usage:
+        python benchmarks/bench_codec.py [--number 20000]
+"""
+import argparse
+import datetime
+import json
+import timeit
+
+from rss.cap.alert import Alert
+from rss.cap.codec import _encode, _field_types, decode_alert, encode_alert
+
+
+def sample_alerts() -> dict[str, Alert]:
+    date = datetime.datetime(2023, 3, 13, 16, 7, 5)
+    refs = [
+        Alert(time=date, states=[40], region=42201, id="REF_ID_1"),
+        Alert(time=date, states=[41], region=42201, id="REF_ID_2"),
+    ]
+    return {
+        "alert": Alert(time=date, states=[40, 41], region=42201, id="ALERT"),
+        "update": Alert(time=date, states=[42], region=42201, id="UPDATE", refs=refs),
+    }
+
+
+def json_encode(alert: Alert) -> bytes:
+    references = []
+    if alert.refs is not None:
+        references = [ref.id for ref in alert.refs]
+    return json.dumps({
+        "time": alert.time.isoformat(timespec="seconds"),
+        "states": list(alert.states),
+        "region": alert.region,
+        "is_event": alert.is_event,
+        "id": alert.id,
+        "references": references,
+    }).encode()
+
+
+def json_decode(data: bytes) -> Alert:
+    obj = json.loads(data)
+    return Alert(
+        time=datetime.datetime.fromisoformat(obj["time"]),
+        states=obj["states"],
+        region=obj["region"],
+        is_event=obj["is_event"],
+        id=obj["id"],
+    )
+
+
+def bench(func, number: int) -> float:
+    func()
+    return timeit.timeit(func, number=number) / number * 1e6
+
+
+def main(number: int) -> None:
+    for name, alert in sample_alerts().items():
+        data = encode_alert(alert)
+        assert json.loads(data) == json.loads(json_encode(alert))
+        assert decode_alert(data) == json_decode(data)
+
+        encode_json = bench(lambda: json_encode(alert), number)
+        # Encoded alerts are cached, measure both the first and later encodings
+        encode_codec = bench(
+            lambda: _encode.__wrapped__(alert, False, _field_types(alert)).encode(), number)
+        encode_cached = bench(lambda: encode_alert(alert), number)
+        decode_json = bench(lambda: json_decode(data), number)
+        decode_codec = bench(lambda: decode_alert(data), number)
+
+        print(f"{name:<7} encode json: {encode_json:6.2f} us  "
+              f"codec: {encode_codec:6.2f} us  cached: {encode_cached:6.2f} us | "
+              f"decode json: {decode_json:6.2f} us  codec: {decode_codec:6.2f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+    main(args.number)
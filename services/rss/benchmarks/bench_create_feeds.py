@@ -0,0 +1,45 @@
+""" Measure how create_feeds scales with the number of worker processes.
+
+    Usage:
+        python benchmarks/bench_create_feeds.py [--alerts 20000]
+"""
+import argparse
+import datetime
+import os
+import time
+
+from rss.cap.alert import Alert
+from rss.cap.rss import create_feeds
+
+
+def sample_alerts(n: int) -> list[Alert]:
+    start = datetime.datetime(2020, 1, 1)
+    return [
+        Alert(
+            time=start + datetime.timedelta(hours=ii),
+            states=[40 + ii % 3],
+            region=42201,
+            id=f"ALERT{ii}",
+            is_event=ii % 5 == 0,
+        )
+        for ii in range(n)
+    ]
+
+
+def main(n_alerts: int) -> None:
+    alerts = sample_alerts(n_alerts)
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        start = time.perf_counter()
+        count = sum(1 for _ in create_feeds(alerts, workers=workers))
+        elapsed = time.perf_counter() - start
+        print(f"workers: {workers:>3}  {count} feeds in {elapsed:6.2f} s  "
+              f"({count / elapsed:8.0f} feeds/s)")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--alerts", type=int, default=20000)
+    args = parser.parse_args()
+    main(args.alerts)
@@ -0,0 +1,59 @@
+""" Compare the cost of building the document of an alert with the cost of
+    serializing it in each format.
+
+    Usage:
+        python benchmarks/bench_formats.py [--number 2000]
+"""
+import argparse
+import datetime
+import timeit
+
+from rss.cap.alert import Alert
+from rss.cap.document import alert_document, build_document
+from rss.cap.formats import SERIALIZERS, render
+
+
+def sample_alerts() -> dict[str, Alert]:
+    date = datetime.datetime(2023, 3, 13, 16, 7, 5)
+    refs = [
+        Alert(time=date, states=[40], region=42201, id="REF_ID_1"),
+        Alert(time=date, states=[41], region=42201, id="REF_ID_2"),
+    ]
+    return {
+        "alert": Alert(time=date, states=[40, 41], region=42201, id="ALERT"),
+        "update": Alert(time=date, states=[42], region=42201, id="UPDATE", refs=refs),
+        "event": Alert(time=date, states=[40], region=42201, id="EVENT", is_event=True),
+    }
+
+
+def main(number: int) -> None:
+    updated = datetime.datetime.now().isoformat()
+    for name, alert in sample_alerts().items():
+        # Warm up the templates and the polygon texts
+        render(alert, SERIALIZERS)
+        build = build_document.__wrapped__
+        latencies = {
+            "document": timeit.timeit(lambda: build(alert, False), number=number)
+        }
+        document = alert_document(alert)
+        for fmt, serializer in SERIALIZERS.items():
+            latencies[fmt] = timeit.timeit(
+                lambda: serializer(document, updated, "\t", False), number=number
+            )
+
+        # Every format from scratch, building the document once
+        def render_all():
+            build_document.cache_clear()
+            render(alert, SERIALIZERS, updated=updated)
+
+        latencies["all formats"] = timeit.timeit(render_all, number=number)
+        print(name)
+        for step, total in latencies.items():
+            print(f"    {step:<12} {total / number * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.number)
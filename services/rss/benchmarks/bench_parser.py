@@ -0,0 +1,73 @@
+""" Measure how many feed files per second parse_directory reads with each
+    number of worker processes, and the peak memory of parsing one large feed.
+
+    Usage:
+        python benchmarks/bench_parser.py [--files 5000] [--entries 10000]
+"""
+import argparse
+import datetime
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+from rss.cap.alert import Alert
+from rss.cap.parser import iter_alerts, parse_directory
+from rss.cap.rss import RollingFeed, create_feeds
+
+
+def sample_alerts(n: int) -> list[Alert]:
+    start = datetime.datetime(2020, 1, 1)
+    return [
+        Alert(
+            time=start + datetime.timedelta(hours=ii),
+            states=[40 + ii % 3, 43],
+            region=42201,
+            id=f"ALERT{ii}",
+            is_event=ii % 5 == 0,
+        )
+        for ii in range(n)
+    ]
+
+
+def write_files(directory: str, n_files: int) -> None:
+    for alert_id, data in create_feeds(sample_alerts(n_files)):
+        with open(os.path.join(directory, f"{alert_id}.cap"), "wb") as fp:
+            fp.write(data)
+
+
+def large_feed(n_entries: int) -> bytes:
+    feed = RollingFeed(size=n_entries)
+    for alert in sample_alerts(n_entries):
+        feed.add(alert)
+    return feed.data
+
+
+def main(n_files: int, n_entries: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        write_files(directory, n_files)
+        workers = 1
+        while workers <= (os.cpu_count() or 1):
+            start = time.perf_counter()
+            count = sum(len(result.alerts) for result in parse_directory(directory, workers))
+            elapsed = time.perf_counter() - start
+            print(f"workers: {workers:>3}  {count} files in {elapsed:6.2f} s  "
+                  f"({count / elapsed:8.0f} files/s)")
+            workers *= 2
+
+    data = large_feed(n_entries)
+    tracemalloc.start()
+    count = sum(1 for _ in iter_alerts(io.BytesIO(data)))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{count} entries, {len(data) / 2 ** 20:.1f} MiB feed: "
+          f"peak memory {peak / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--entries", type=int, default=10000)
+    args = parser.parse_args()
+    main(args.files, args.entries)
@@ -0,0 +1,53 @@
+""" Measure the latency of publishing a feed file with each durability policy.
+
+    Usage:
+        python benchmarks/bench_publish.py [--number 200] [--path /tmp]
+
+    Use --path to measure the file system where the feeds are published.
+"""
+import argparse
+import datetime
+import os
+import statistics
+import tempfile
+import time
+
+from rss.cap.alert import Alert
+from rss.cap.rss import create_feed, write_feed_to_file
+
+
+def percentile(data: list[float], pct: float) -> float:
+    data = sorted(data)
+    return data[min(len(data) - 1, int(len(data) * pct / 100))]
+
+
+def main(number: int, path: str) -> None:
+    alert = Alert(datetime.datetime(2023, 3, 13, 16, 7, 5), [40, 41], 42201, "ALERT")
+    feed = create_feed(alert)
+
+    cases = [
+        ("in place", dict(atomic=False)),
+        ("atomic none", dict(atomic=True, durability="none")),
+        ("atomic fdatasync", dict(atomic=True, durability="fdatasync")),
+        ("atomic fsync", dict(atomic=True, durability="fsync")),
+    ]
+    with tempfile.TemporaryDirectory(dir=path) as directory:
+        filename = os.path.join(directory, "sasmex.xml")
+        for name, kwargs in cases:
+            latencies = []
+            for _ in range(number):
+                start = time.perf_counter()
+                write_feed_to_file(filename, feed, **kwargs)
+                latencies.append((time.perf_counter() - start) * 1e6)
+
+            print(f"{name:<17} median: {statistics.median(latencies):9.1f} us  "
+                  f"p99: {percentile(latencies, 99):9.1f} us  "
+                  f"max: {max(latencies):9.1f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=200)
+    parser.add_argument("--path", default=None)
+    args = parser.parse_args()
+    main(args.number, args.path)
@@ -0,0 +1,83 @@
+""" Measure how the cost of rendering an update grows with the number of
+    references, with and without a limit on the embedded references.
+
+    The time per reference should stay roughly constant as the chain grows.
+
+    Usage:
+        python benchmarks/bench_references.py [--number 50] [--max-refs 50]
+"""
+import argparse
+import datetime
+import timeit
+import tracemalloc
+from typing import Optional
+
+from rss.cap.alert import Alert
+from rss.cap.document import build_document
+from rss.cap.rss import create_feed
+
+CHAIN_LENGTHS = (1, 10, 100, 250, 500, 1000)
+
+
+def update_chain(n_refs: int) -> Alert:
+    """ Returns an update whose references are the previous n_refs alerts
+        of an aftershock sequence.
+    """
+    date = datetime.datetime(2023, 3, 13, 16, 7, 5)
+    refs = [
+        Alert(
+            time=date + datetime.timedelta(seconds=ii),
+            states=[40 + ii % 10],
+            region=42201,
+            id=f"REF{ii:04d}",
+        )
+        for ii in range(n_refs)
+    ]
+    return Alert(
+        time=date + datetime.timedelta(seconds=n_refs),
+        states=[41],
+        region=42201,
+        id="UPDATE",
+        refs=refs,
+    )
+
+
+def render(alert: Alert, renderer: str, max_refs: Optional[int]) -> bytes:
+    # The documents are cached by alert, so the cache is cleared to measure
+    # the whole render
+    build_document.cache_clear()
+    return create_feed(alert, renderer=renderer, max_refs=max_refs).data
+
+
+def peak_memory(alert: Alert, renderer: str, max_refs: Optional[int]) -> float:
+    """ Returns the peak memory allocated by a render in KiB. """
+    build_document.cache_clear()
+    tracemalloc.start()
+    create_feed(alert, renderer=renderer, max_refs=max_refs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main(number: int, max_refs: int) -> None:
+    print(f"{'renderer':<9} {'refs':>5} {'limit':>6} {'us':>10} {'us/ref':>8} "
+          f"{'peak KiB':>9} {'size KiB':>9}")
+    for renderer in ("template", "minidom"):
+        for n_refs in CHAIN_LENGTHS:
+            alert = update_chain(n_refs)
+            for limit in (None, max_refs):
+                render(alert, renderer, limit)
+                total = timeit.timeit(lambda: render(alert, renderer, limit), number=number)
+                latency = total / number * 1e6
+                size = len(render(alert, renderer, limit)) / 1024
+                print(f"{renderer:<9} {n_refs:>5} {str(limit):>6} {latency:>10.1f} "
+                      f"{latency / n_refs:>8.2f} {peak_memory(alert, renderer, limit):>9.1f} "
+                      f"{size:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=50)
+    parser.add_argument("--max-refs", type=int, default=50)
+    args = parser.parse_args()
+    main(args.number, args.max_refs)
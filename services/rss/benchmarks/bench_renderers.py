@@ -0,0 +1,48 @@
+""" Compare the per alert latency of the minidom and template renderers.
+
+    Usage:
+        python benchmarks/bench_renderers.py [--number 2000]
+"""
+import argparse
+import datetime
+import timeit
+
+from rss.cap.alert import Alert
+from rss.cap.rss import create_feed
+
+
+def sample_alerts() -> dict[str, Alert]:
+    date = datetime.datetime(2023, 3, 13, 16, 7, 5)
+    refs = [
+        Alert(time=date, states=[40], region=42201, id="REF_ID_1"),
+        Alert(time=date, states=[41], region=42201, id="REF_ID_2"),
+    ]
+    return {
+        "alert": Alert(time=date, states=[40, 41], region=42201, id="ALERT"),
+        "update": Alert(time=date, states=[42], region=42201, id="UPDATE", refs=refs),
+        "event": Alert(time=date, states=[40], region=42201, id="EVENT", is_event=True),
+    }
+
+
+def main(number: int) -> None:
+    for name, alert in sample_alerts().items():
+        latencies = {}
+        for renderer in ("minidom", "template"):
+            # Warm up, so we do not measure one time costs such as template compilation
+            create_feed(alert, renderer=renderer)
+            total = timeit.timeit(
+                lambda: create_feed(alert, renderer=renderer), number=number
+            )
+            latencies[renderer] = total / number * 1e6
+
+        speedup = latencies["minidom"] / latencies["template"]
+        print(f"{name:<8} minidom: {latencies['minidom']:8.1f} us  "
+              f"template: {latencies['template']:8.1f} us  "
+              f"speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.number)
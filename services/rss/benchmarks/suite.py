@@ -0,0 +1,293 @@
+""" Benchmark suite for the rendering functions of the rss library.
+
+    Each benchmark renders alerts of different shapes (alert or event, number of
+    states and length of the update chain) and reports the latency percentiles
+    of each render and the peak memory allocated by it (measured with tracemalloc).
+
+    Results are compared with the baseline stored in benchmarks/baseline.json, and
+    benchmarks whose median latency or peak memory is above the baseline by more
+    than the threshold are flagged as regressions. Baselines depend on the machine,
+    so they should be regenerated with --save-baseline when the machine changes.
+
+    The documents of the alerts are cached by alert, so the cache is cleared
+    before each run and every run renders the alert. The texts of the states
+    and regions are cached for the whole process and are still reused.
+
+    Usage:
+        python benchmarks/suite.py [--threshold 0.25] [--filter create_feed] [--save-baseline]
+
+    The exit code is 1 if a regression is found.
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, NamedTuple, Optional
+
+from rss.cap import document, rss
+from rss.cap.alert import Alert
+from rss.cap.states import STATES
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+ALL_STATES = list(STATES)
+REGION = 42201
+
+
+class Shape(NamedTuple):
+    is_event: bool
+    n_states: int
+    n_refs: int
+
+    @property
+    def name(self) -> str:
+        kind = "event" if self.is_event else "alert"
+        return f"{kind}-states{self.n_states}-refs{self.n_refs}"
+
+
+class Result(NamedTuple):
+    p50: float
+    p90: float
+    p99: float
+    peak_kib: float
+
+
+SHAPES = [
+    Shape(is_event, n_states, n_refs)
+    for is_event in (False, True)
+    for n_states in (1, 3, len(ALL_STATES))
+    for n_refs in (0, 10, 100, 500)
+]
+
+
+def make_alert(shape: Shape) -> Alert:
+    states = ALL_STATES
+    date = datetime.datetime(2023, 3, 13, 16, 7, 5)
+    refs = None
+    if shape.n_refs > 0:
+        refs = [
+            Alert(
+                time=date - datetime.timedelta(seconds=shape.n_refs - ii),
+                states=[states[ii % len(states)]],
+                region=REGION,
+                id=f"REF{ii}",
+                is_event=shape.is_event,
+            )
+            for ii in range(shape.n_refs)
+        ]
+    return Alert(
+        time=date,
+        states=states[:shape.n_states],
+        region=REGION,
+        id="ALERT",
+        is_event=shape.is_event,
+        refs=refs,
+    )
+
+
+def clear_alert_caches() -> None:
+    """ Clear the caches of the documents and feeds of the alerts. Otherwise,
+        after the warm up only cache hits are measured.
+    """
+    document.build_document.cache_clear()
+    rss.FEED_CACHE.clear()
+
+
+def bench_create_feed_minidom(alert: Alert) -> Callable[[], Callable[[], object]]:
+    def setup():
+        clear_alert_caches()
+        return lambda: rss.create_feed(alert)
+    return setup
+
+
+def bench_create_feed_template(alert: Alert) -> Callable[[], Callable[[], object]]:
+    def setup():
+        clear_alert_caches()
+        return lambda: rss.create_feed(alert, renderer="template")
+    return setup
+
+
+def bench_build(alert: Alert) -> Callable[[], Callable[[], object]]:
+    # A minidom feed can only be built once, so a new feed is created for each run
+    def setup():
+        clear_alert_caches()
+        return rss.RSSFeed(alert).build
+    return setup
+
+
+def bench_polygon_tags(alert: Alert) -> Callable[[], Callable[[], object]]:
+    def setup():
+        clear_alert_caches()
+        feed = rss.RSSFeed(alert)
+        area = feed._root.createElement("area")
+        return lambda: feed._polygon_tags(area)
+    return setup
+
+
+def bench_get_description(alert: Alert) -> Callable[[], Callable[[], object]]:
+    return lambda: lambda: rss.RSSFeed._get_description(
+        alert.is_event, alert.region, alert.states)
+
+
+def bench_get_title(alert: Alert) -> Callable[[], Callable[[], object]]:
+    # The title is stored in the document of the feed, so a new feed is
+    # created for each run
+    def setup():
+        clear_alert_caches()
+        return rss.RSSFeed(alert)._get_title
+    return setup
+
+
+BENCHMARKS = {
+    "create_feed[minidom]": bench_create_feed_minidom,
+    "create_feed[template]": bench_create_feed_template,
+    "RSSFeed.build": bench_build,
+    "_polygon_tags": bench_polygon_tags,
+    "_get_description": bench_get_description,
+    "_get_title": bench_get_title,
+}
+
+
+def percentile(data: list[float], pct: float) -> float:
+    return data[min(len(data) - 1, int(len(data) * pct / 100))]
+
+
+def measure(
+        setup: Callable[[], Callable[[], object]],
+        min_runs: int = 20,
+        min_time: float = 0.1,
+) -> Result:
+    """ Run a benchmark at least min_runs times and for at least min_time
+        seconds. Setup returns the function that is measured.
+    """
+    # Warm up, so one time costs such as filling caches are not measured
+    start = time.perf_counter()
+    while time.perf_counter() - start < min_time / 4:
+        setup()()
+
+    latencies = []
+    start = time.perf_counter()
+    while len(latencies) < min_runs or time.perf_counter() - start < min_time:
+        func = setup()
+        t0 = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - t0) * 1e6)
+    latencies.sort()
+
+    func = setup()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return Result(
+        p50=percentile(latencies, 50),
+        p90=percentile(latencies, 90),
+        p99=percentile(latencies, 99),
+        peak_kib=peak / 1024,
+    )
+
+
+def run(name_filter: str = "", min_time: float = 0.1) -> dict[str, Result]:
+    results = {}
+    for shape in SHAPES:
+        alert = make_alert(shape)
+        for bench_name, bench in BENCHMARKS.items():
+            if shape.is_event and bench_name == "_polygon_tags":
+                continue
+            key = f"{bench_name}/{shape.name}"
+            if name_filter not in key:
+                continue
+            results[key] = measure(bench(alert), min_time=min_time)
+    return results
+
+
+def load_baseline() -> dict[str, Result]:
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH) as fp:
+        data = json.load(fp)
+    return {key: Result(**values) for key, values in data["results"].items()}
+
+
+def save_baseline(results: dict[str, Result]) -> None:
+    data = {
+        "python": sys.version.split()[0],
+        "results": {key: res._asdict() for key, res in sorted(results.items())},
+    }
+    with open(BASELINE_PATH, "w") as fp:
+        json.dump(data, fp, indent=2)
+        fp.write("\n")
+
+
+def find_regressions(
+        results: dict[str, Result],
+        baseline: dict[str, Result],
+        threshold: float,
+) -> list[str]:
+    """ Returns a message for each result whose median latency or peak memory
+        is above the baseline by more than the threshold (a fraction).
+    """
+    regressions = []
+    for key, res in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if res.p50 > base.p50 * (1 + threshold):
+            regressions.append(
+                f"{key}: p50 {res.p50:.1f} us vs baseline {base.p50:.1f} us")
+        if res.peak_kib > base.peak_kib * (1 + threshold):
+            regressions.append(
+                f"{key}: peak {res.peak_kib:.1f} KiB vs baseline {base.peak_kib:.1f} KiB")
+    return regressions
+
+
+def report(results: dict[str, Result], baseline: dict[str, Result]) -> None:
+    print(f"{'benchmark':<52} {'p50 us':>10} {'p90 us':>10} {'p99 us':>10} "
+          f"{'peak KiB':>10} {'vs base':>8}")
+    for key, res in results.items():
+        base = baseline.get(key)
+        change = f"{res.p50 / base.p50 - 1:+.0%}" if base else "-"
+        print(f"{key:<52} {res.p50:10.1f} {res.p90:10.1f} {res.p99:10.1f} "
+              f"{res.peak_kib:10.1f} {change:>8}")
+
+
+def main(
+        threshold: float,
+        name_filter: str = "",
+        save: bool = False,
+        min_time: float = 0.1,
+) -> Optional[int]:
+    results = run(name_filter, min_time)
+    baseline = load_baseline()
+    report(results, baseline)
+
+    if save:
+        baseline.update(results)
+        save_baseline(baseline)
+        print(f"Baseline saved to {BASELINE_PATH}")
+        return 0
+
+    regressions = find_regressions(results, baseline, threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regressions above {threshold:.0%}:")
+        for msg in regressions:
+            print("  " + msg)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed slowdown as a fraction of the baseline")
+    parser.add_argument("--filter", default="", help="Only run benchmarks containing this text")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--min-time", type=float, default=0.1,
+                        help="Minimum seconds spent in each benchmark")
+    args = parser.parse_args()
+    sys.exit(main(args.threshold, args.filter, args.save_baseline, args.min_time))
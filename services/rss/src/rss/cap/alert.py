@@ -1,26 +1,141 @@
 import dataclasses
 import datetime
-from typing import Any, Optional
+from typing import Any, Iterable, Optional
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, slots=True)
 class Alert:
+    """ An earthquake alert or event.
+
+        Alerts are immutable: the states and the references are stored as
+        tuples (lists are converted when the alert is created). An alert
+        can therefore be shared between threads and used as a dictionary
+        key without copying it. References are shared, not copied, and
+        copy.copy and copy.deepcopy return the same alert.
+
+        The received attribute is the time.monotonic() time when the message
+        of the alert was received, used to measure the latency of the alert.
+        It is not part of the alert: it is not compared, hashed, encoded or
+        pickled.
+    """
     time: datetime.datetime
-    states: list[int]
+    states: tuple[int, ...]
     region: int
     id: str = ""
     is_event: bool = False
-    refs: Optional[list["Alert"]] = None
+    refs: Optional[tuple["Alert", ...]] = None
+    received: Optional[float] = dataclasses.field(default=None, compare=False, repr=False)
+    _hash: int = dataclasses.field(init=False, repr=False, compare=False)
+
+    def __init__(
+            self,
+            time: datetime.datetime,
+            states: Iterable[int],
+            region: int,
+            id: str = "",
+            is_event: bool = False,
+            refs: Optional[Iterable["Alert"]] = None,
+            received: Optional[float] = None,
+    ):
+        states = tuple(states)
+        if refs is not None:
+            refs = tuple(refs)
+        set_attr = object.__setattr__
+        set_attr(self, "time", time)
+        set_attr(self, "states", states)
+        set_attr(self, "region", region)
+        set_attr(self, "id", id)
+        set_attr(self, "is_event", is_event)
+        set_attr(self, "refs", refs)
+        set_attr(self, "received", received)
+        # The hash of the references is cached in each of them, so hashing
+        # a chain of updates does not traverse the whole chain
+        set_attr(self, "_hash", hash((time, states, region, id, is_event, refs)))
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        # The chains of references are compared without recursion, so long
+        # chains of updates can be compared. Alerts with different hashes are
+        # not equal, and shared references are compared once
+        pending = [(self, other)]
+        compared = set()
+        while pending:
+            alert, other = pending.pop()
+            if alert is other or (id(alert), id(other)) in compared:
+                continue
+            compared.add((id(alert), id(other)))
+            if (
+                    alert._hash != other._hash
+                    or alert._fields() != other._fields()
+                    or (alert.refs is None) != (other.refs is None)
+            ):
+                return False
+            if alert.refs is not None:
+                if len(alert.refs) != len(other.refs):
+                    return False
+                pending.extend(zip(alert.refs, other.refs))
+        return True
+
+    def _fields(self) -> tuple:
+        return self.time, self.states, self.region, self.id, self.is_event
+
+    def __copy__(self) -> "Alert":
+        return self
+
+    def __deepcopy__(self, memo: dict) -> "Alert":
+        return self
+
+    def __reduce__(self):
+        # The hash is not pickled. String hashes differ between processes.
+        # The chain of references is flattened, so pickling a long chain of
+        # updates does not exceed the recursion limit
+        return _unflatten, (_flatten(self),)
 
     @classmethod
     def from_json(cls, json: dict[str, Any]) -> "Alert":
-        """ Create an alert from a dictionary. If the dictionary
-            has references to other alerts, they are not considered.
+        """ Create an alert from a dictionary. References that are ids are
+            not considered, references that are alert objects are decoded.
+
+            See rss.cap.codec for the format.
         """
-        return cls(
-            time=datetime.datetime.fromisoformat(json["time"]),
-            states=json["states"],
-            region=json["region"],
-            is_event=json["is_event"],
-            id=json["id"],
-        )
+        from rss.cap.codec import alert_from_json
+        return alert_from_json(json)
+
+
+def _flatten(alert: Alert) -> list[tuple]:
+    """ Returns the fields of an alert and of every alert in its chain of
+        references. The references of each alert are the indices of the
+        alerts before it, the last one is the given alert.
+    """
+    indices = {}  # type: dict[int, int]
+    flat = []
+    pending = [(alert, False)]
+    while pending:
+        current, refs_done = pending.pop()
+        if id(current) in indices:
+            continue
+        refs = current.refs
+        if refs is not None and not refs_done:
+            pending.append((current, True))
+            pending.extend((ref, False) for ref in reversed(refs) if id(ref) not in indices)
+            continue
+        if refs is not None:
+            refs = tuple(indices[id(ref)] for ref in refs)
+        indices[id(current)] = len(flat)
+        flat.append(current._fields() + (refs,))
+    return flat
+
+
+def _unflatten(flat: list[tuple]) -> Alert:
+    """ Rebuilds the alert flattened by _flatten.
+    """
+    alerts = []  # type: list[Alert]
+    for time, states, region, id, is_event, refs in flat:
+        if refs is not None:
+            refs = [alerts[index] for index in refs]
+        alerts.append(Alert(time, states, region, id, is_event, refs))
+    return alerts[-1]
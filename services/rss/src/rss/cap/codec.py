@@ -0,0 +1,235 @@
+""" JSON codec of the alerts exchanged by cap-gen and the API.
+
+    An alert is encoded as the following object:
+
+        {
+            "time": "2023-03-13T16:07:05",
+            "states": [40, 41],
+            "region": 42201,
+            "is_event": false,
+            "id": "20230313160705",
+            "references": []
+        }
+
+    The references are either the ids of the referenced alerts, which is what
+    is posted to the API, or the referenced alerts themselves, which is what
+    the API returns. Fields that are not in the schema are ignored, so
+    clients and servers can add fields without breaking older versions.
+"""
+import datetime
+import functools
+import json
+from json.encoder import encode_basestring_ascii
+from typing import Any, Union
+
+from rss.cap.alert import Alert
+
+
+class InvalidAlertError(ValueError):
+    """ Raised when an alert cannot be encoded or decoded.
+    """
+    pass
+
+
+# Schema of an encoded alert. Maps the name of each field to its type
+ALERT_FIELDS = {
+    "time": str,
+    "states": list,
+    "region": int,
+    "is_event": bool,
+    "id": str,
+    "references": list,
+}  # type: dict[str, type]
+# Fields that every encoded alert has
+REQUIRED_FIELDS = frozenset(ALERT_FIELDS) - {"references"}
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_time(text: str) -> datetime.datetime:
+    # The alerts of an update chain share times, so parsed times are cached
+    try:
+        return datetime.datetime.fromisoformat(text)
+    except ValueError:
+        raise InvalidAlertError(f"Invalid alert time {text!r}")
+
+
+@functools.lru_cache(maxsize=1024)
+def _intern(alert: Alert) -> Alert:
+    # Returns the first decoded alert that is equal to this one, so the
+    # references that repeat in an update chain share the same object
+    return alert
+
+
+def _check_int(value: Any, name: str) -> int:
+    if type(value) is not int:
+        raise InvalidAlertError(f"Alert {name} must be an integer, got {value!r}")
+    return value
+
+
+def _alert_from_object(obj: dict[str, Any]) -> Alert:
+    """ Build an alert from a JSON object.
+
+        Nested objects are decoded first, so the references that are
+        objects are already alerts.
+    """
+    try:
+        time = obj["time"]
+        states = obj["states"]
+        region = obj["region"]
+        is_event = obj["is_event"]
+        id_ = obj["id"]
+    except KeyError:
+        missing = [name for name in ALERT_FIELDS if name not in obj and name != "references"]
+        raise InvalidAlertError(f"Missing alert fields: {', '.join(missing)}")
+    references = obj.get("references", ())
+
+    if not (type(time) is str and type(states) is list and type(region) is int
+            and type(is_event) is bool and type(id_) is str and type(references) in (list, tuple)):
+        for name, expected in ALERT_FIELDS.items():
+            if name in obj and type(obj[name]) is not expected:
+                raise InvalidAlertError(
+                    f"Alert {name} must be of type {expected.__name__}, got {obj[name]!r}")
+    for state in states:
+        _check_int(state, "state")
+
+    refs = None
+    for ref in references:
+        if type(ref) is str:
+            continue
+        if type(ref) is dict:
+            # An object without the fields of an alert, raises the fields it misses
+            _alert_from_object(ref)
+        if not isinstance(ref, Alert):
+            raise InvalidAlertError(f"Invalid alert reference {ref!r}")
+        if refs is None:
+            refs = []
+        refs.append(_intern(ref))
+
+    return Alert(_parse_time(time), states, region, id_, is_event, refs)
+
+
+def _object_hook(obj: dict[str, Any]) -> Union[Alert, dict[str, Any]]:
+    # Every object of the document is passed to the hook, including the
+    # values of fields that are ignored, so only the objects with the fields
+    # of an alert are decoded as alerts
+    if REQUIRED_FIELDS.issubset(obj):
+        return _alert_from_object(obj)
+    return obj
+
+
+_decoder = json.JSONDecoder(object_hook=_object_hook)
+
+
+def decode_alert(data: Union[bytes, str]) -> Alert:
+    """ Decode an alert from JSON.
+
+        Each alert in the document is built as soon as its object is parsed,
+        including the references. The json module still builds a dictionary
+        for each object, it is not kept. References that are ids are
+        validated but ignored, because only the alerts they refer to can be
+        stored in the alert.
+
+        :raises InvalidAlertError: If the document is not a valid alert.
+    """
+    if isinstance(data, bytes):
+        data = data.decode()
+    try:
+        alert = _decoder.decode(data)
+    except json.JSONDecodeError as err:
+        raise InvalidAlertError(f"Invalid JSON: {err}")
+    if type(alert) is dict:
+        # Raises the fields that the object misses
+        _alert_from_object(alert)
+    if not isinstance(alert, Alert):
+        raise InvalidAlertError("The document is not an alert")
+    return alert
+
+
+def alert_from_json(obj: dict[str, Any]) -> Alert:
+    """ Create an alert from a decoded JSON object, for example the one
+        returned by Flask's request.json. It is validated like decode_alert.
+    """
+    if not isinstance(obj, dict):
+        raise InvalidAlertError("The document is not an alert")
+    references = obj.get("references")
+    if type(references) is list and any(isinstance(ref, dict) for ref in references):
+        obj = dict(obj)
+        obj["references"] = [
+            alert_from_json(ref) if isinstance(ref, dict) else ref for ref in references
+        ]
+    return _alert_from_object(obj)
+
+
+def reference_ids(obj: dict[str, Any]) -> list[str]:
+    """ Returns the ids of the references of an alert JSON object, whether the
+        references are ids or nested alerts.
+    """
+    return [ref if isinstance(ref, str) else ref["id"] for ref in obj.get("references", [])]
+
+
+def _check_alert(alert: Alert) -> None:
+    if not isinstance(alert.time, datetime.datetime):
+        raise InvalidAlertError(f"Alert time must be a datetime, got {alert.time!r}")
+    for state in alert.states:
+        _check_int(state, "state")
+    _check_int(alert.region, "region")
+    if type(alert.id) is not str:
+        raise InvalidAlertError(f"Alert id must be a string, got {alert.id!r}")
+
+
+def _field_types(alert: Alert) -> tuple[type, ...]:
+    # Alerts with fields of different types can be equal, for example a
+    # region True and a region 1, so the types are part of the cache key of
+    # _encode and an invalid alert is never taken for a cached valid one
+    return type(alert.time), type(alert.region), type(alert.id), *map(type, alert.states)
+
+
+@functools.lru_cache(maxsize=1024)
+def _encode(alert: Alert, nested_refs: bool, field_types: tuple[type, ...]) -> str:
+    # Alerts are immutable and hashable, so the references of an update chain
+    # are encoded once and reused by the alerts that refer to them
+    _check_alert(alert)
+    refs = alert.refs if alert.refs is not None else ()
+    if nested_refs:
+        references = ",".join(_encode(ref, True, _field_types(ref)) for ref in refs)
+    else:
+        references = ",".join(encode_basestring_ascii(ref.id) for ref in refs)
+    return (
+        f'{{"time":"{alert.time.isoformat(timespec="seconds")}",'
+        f'"states":[{",".join(map(str, alert.states))}],'
+        f'"region":{alert.region},'
+        f'"is_event":{"true" if alert.is_event else "false"},'
+        f'"id":{encode_basestring_ascii(alert.id)},'
+        f'"references":[{references}]}}'
+    )
+
+
+def encode_alert(alert: Alert, nested_refs: bool = False) -> bytes:
+    """ Encode an alert as JSON.
+
+        :param alert: The alert.
+        :param nested_refs: Whether to encode the references as alert objects.
+            By default, only their ids are encoded.
+        :raises InvalidAlertError: If a field of the alert has an invalid type.
+    """
+    return _encode(alert, nested_refs, _field_types(alert)).encode()
+
+
+def alert_to_json(alert: Alert, nested_refs: bool = False) -> dict[str, Any]:
+    """ Returns the JSON object of an alert as a dictionary, for APIs that
+        expect one, such as Flask's jsonify.
+    """
+    _check_alert(alert)
+    refs = alert.refs if alert.refs is not None else ()
+    if nested_refs:
+        references = [alert_to_json(ref, True) for ref in refs]
+    else:
+        references = [ref.id for ref in refs]
+    return {
+        "time": alert.time.isoformat(timespec="seconds"),
+        "states": list(alert.states),
+        "region": alert.region,
+        "is_event": alert.is_event,
+        "id": alert.id,
+        "references": references,
+    }
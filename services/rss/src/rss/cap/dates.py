@@ -0,0 +1,34 @@
+import datetime
+
+# Abbreviated month names of the es_MX locale, as defined in CLDR
+MONTHS_ES_MX = (
+    "ene", "feb", "mar", "abr", "may", "jun",
+    "jul", "ago", "sept", "oct", "nov", "dic",
+)
+
+
+def format_datetime(
+        date: datetime.datetime,
+        format: str = "medium",
+        locale: str = "es_MX"
+) -> str:
+    """ Format a datetime the same way as babel.dates.format_datetime.
+
+        The medium format of the es_MX locale, which is the one used in the
+        feed titles, is formatted without Babel. Other formats and locales
+        fall back to Babel, which is only imported when needed.
+    """
+    if format == "medium" and locale == "es_MX":
+        return format_datetime_es_mx(date)
+
+    from babel.dates import format_datetime as babel_format_datetime
+    return babel_format_datetime(date, format=format, locale=locale)
+
+
+def format_datetime_es_mx(date: datetime.datetime) -> str:
+    """ Format a datetime with the medium format of the es_MX locale.
+
+        Example: 13 mar 2023 16:07:05
+    """
+    return f"{date.day} {MONTHS_ES_MX[date.month - 1]} {date.year} " \
+           f"{date.hour:02d}:{date.minute:02d}:{date.second:02d}"
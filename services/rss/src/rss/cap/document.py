@@ -0,0 +1,302 @@
+""" Format neutral representation of the feed of an alert.
+
+    The texts of a feed (title, event, headline, description, references...)
+    and its area are computed once per alert by alert_document. The
+    serializers in rss.cap.formats write the same document as Atom + CAP 1.1,
+    CAP 1.2, JSON Feed or GeoJSON.
+"""
+import dataclasses
+import datetime
+import functools
+import itertools
+from typing import TYPE_CHECKING, Optional
+
+from rss.cap.alert import Alert
+from rss.cap.dates import format_datetime
+from rss.cap.geopoint import distance_between_points, haversine_distances
+from rss.cap.polygon import POLYGONS, outline as state_outline, state_mask
+from rss.cap.regions import REGIONS, REGION_COORDS
+from rss.cap.states import STATES, STATES_COORDS
+
+if TYPE_CHECKING:
+    import numpy as np
+
+SENDER = "cires.org.mx"
+
+# Radius in Km of the circle around the region of an event
+CIRCLE_RADIUS = 70.0
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class AlertDocument:
+    """ The contents of the feed of an alert that do not depend on the
+        output format.
+
+        Dates are formatted as in the CAP alert, with the offset of the
+        central time zone.
+    """
+    alert: Alert
+    is_test: bool
+    title: str
+    identifier: str
+    sender: str
+    sent: str
+    expires: str
+    status: str
+    msg_type: str
+    # Each reference has the format sender,refID,date. If the number of
+    # references was limited, only the last ones are included
+    references: tuple[str, ...]
+    event: str
+    severity: str
+    headline: str
+    description: str
+    response_type: str
+    area_desc: str
+    # States whose polygon is the area of an alert, in order of appearance
+    area_states: tuple[int, ...]
+    # Region at the center of the circle that is the area of an event
+    area_region: Optional[int]
+    # Whether the area of an alert is the merged outline of its states
+    # instead of one polygon per state
+    outline: bool = False
+
+    @property
+    def id(self) -> str:
+        return self.alert.id
+
+    @property
+    def is_update(self) -> bool:
+        return self.alert.refs is not None
+
+    @property
+    def polygons(self) -> list[str]:
+        """ The text of each polygon of the area. """
+        if self.outline and self.area_states:
+            return list(outline_texts(self.area_mask))
+        return [polygon_text(st) for st in self.area_states]
+
+    @property
+    def area_mask(self) -> int:
+        """ The mask of the states of the area, see rss.cap.polygon.state_mask. """
+        return state_mask(self.area_states)
+
+    @property
+    def circle(self) -> Optional[str]:
+        """ The text of the circle of the area, if it is an event. """
+        if self.area_region is None:
+            return None
+        return circle_text(self.area_region)
+
+
+def cap_date(date: datetime.datetime) -> str:
+    """ Format a date as in the CAP alerts. """
+    return date.isoformat(timespec="seconds") + "-06:00"
+
+
+def alert_document(
+        alert: Alert,
+        is_test: bool = False,
+        max_refs: Optional[int] = None,
+        outline: bool = False,
+) -> AlertDocument:
+    """ Returns the document of the feed of an alert.
+
+        Documents are cached by alert, so rendering an alert in several
+        formats computes its contents only once.
+
+        :param alert: The alert.
+        :param is_test: Whether the alert is a test.
+        :param max_refs: Maximum number of references included in the
+            document. Long update chains only include their last references,
+            so the size of the document is bounded. The area still includes
+            the states of every reference. By default, all references are
+            included.
+        :param outline: Whether the area of an alert is the merged outline of
+            its states, one polygon per group of overlapping states, instead
+            of one polygon per state.
+    """
+    if max_refs is not None and max_refs < 1:
+        raise ValueError("max_refs must be a positive integer")
+    return build_document(alert, is_test, max_refs, outline)
+
+
+@functools.lru_cache(maxsize=256)
+def build_document(
+        alert: Alert, is_test: bool, max_refs: Optional[int] = None, outline: bool = False
+) -> AlertDocument:
+    region = REGIONS[alert.region]
+    states = states_text(alert.states)
+    sent = cap_date(alert.time)
+
+    title = format_datetime(alert.time, locale="es_MX")
+    if alert.is_event:
+        title += f" Sismo en {region}"
+        event = f"SASMEX: Sismo Moderado en {region}"
+        severity = "Unknown"
+        headline = f"Sismo Moderado en {region}"
+        response_type = "Monitor"
+        area_desc = "Zona Probable Epicentro"
+        area_states = ()
+        area_region = alert.region
+    else:
+        title += f" Alerta en {states} por sismo en {region}"
+        event = f"SASMEX: ALERTA SISMICA en {states} por sismo en {region}"
+        severity = "Severe"
+        headline = f"ALERTA SISMICA por sismo Severo en {region}"
+        response_type = "Execute"
+        area_desc = "Region de Alertamiento"
+        area_states = _area_states(alert)
+        area_region = None
+
+    references = ()
+    if alert.refs is not None:
+        refs = alert.refs
+        if max_refs is not None:
+            refs = refs[-max_refs:]
+        references = tuple(
+            f"{SENDER},CIRES_{ref.id},{_reference_date(ref.time)}" for ref in refs
+        )
+
+    return AlertDocument(
+        alert=alert,
+        is_test=is_test,
+        title=title,
+        identifier="CIRES" + alert.id,
+        sender=SENDER,
+        sent=sent,
+        expires=cap_date(alert.time + datetime.timedelta(minutes=1)),
+        status="Test" if is_test else "Actual",
+        msg_type="Update" if alert.refs is not None else "Alert",
+        references=references,
+        event=event,
+        severity=severity,
+        headline=headline,
+        description=description_text(alert.is_event, alert.region, alert.states),
+        response_type=response_type,
+        area_desc=area_desc,
+        area_states=area_states,
+        area_region=area_region,
+        outline=outline,
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def _reference_date(date: datetime.datetime) -> str:
+    # The alerts of an update chain are referenced again by every update
+    return cap_date(date)
+
+
+def _area_states(alert: Alert) -> tuple[int, ...]:
+    # First the states of the references, if any. States that appear more
+    # than once are only added once
+    refs = alert.refs if alert.refs is not None else ()
+    states = itertools.chain.from_iterable([ref.states for ref in refs] + [alert.states])
+    return tuple(dict.fromkeys(states))
+
+
+def states_text(states: tuple[int, ...]) -> str:
+    """ Returns the states of an alert as a string with the following format:
+            state1/state2/.../stateN
+    """
+    return "/".join(STATES[s] for s in states)
+
+
+def description_text(is_event: bool, region: int, states: tuple[int, ...]) -> str:
+    """ Returns the description of an alert.
+    """
+    region_name = REGIONS[region]
+    if is_event:
+        description = f"Sismo Moderado en {region_name}"
+    else:
+        description = f"Sismo Severo en {region_name}"
+
+    if len(states) > 1:
+        for ii in range(len(states) - 1):
+            st = STATES[states[ii]]
+            distance = state_region_distance(st, region)
+            description += f", a {distance}km de {st}"
+        st = STATES[states[-1]]
+        distance = state_region_distance(st, region)
+        description += f" y a {distance}km de {st}"
+    else:
+        st = STATES[states[0]]
+        distance = state_region_distance(st, region)
+        description += f", a {distance}km de {st}"
+
+    return description
+
+
+@functools.cache
+def polygon_text(state: int) -> str:
+    """ Returns the text of the polygon tag of a state. The text is
+        formatted the first time it is requested.
+    """
+    poly = POLYGONS[STATES[state]]
+    return " ".join(f"{point.lat:0.2f},{point.lon:0.2f}" for point in poly.points)
+
+
+@functools.cache
+def outline_texts(mask: int) -> tuple[str, ...]:
+    """ Returns the text of the polygon tag of each part of the merged outline
+        of a set of states. The texts are formatted the first time they are
+        requested.
+
+        :param mask: The mask of the states, see rss.cap.polygon.state_mask.
+    """
+    return tuple(
+        " ".join(f"{point.lat:0.2f},{point.lon:0.2f}" for point in poly.points)
+        for poly in state_outline(mask)
+    )
+
+
+@functools.cache
+def circle_text(region: int) -> str:
+    """ Returns the text of the circle tag of a region. The text is
+        formatted the first time it is requested.
+    """
+    coords = REGION_COORDS[region]
+    return f"{coords.lat:0.2f},{coords.lon:0.2f} {CIRCLE_RADIUS}"
+
+
+@functools.cache
+def state_region_distance_matrix() -> "np.ndarray":
+    """ Returns the distance in Km between each state of STATES_COORDS (rows)
+        and each region of REGION_COORDS (columns).
+
+        As in distance_between_points, the longitude of the region is used
+        for both points, so the distance is measured along the meridian of the
+        region. The matrix is computed the first time it is requested.
+    """
+    _, state_lat, _ = STATES_COORDS.arrays()
+    _, region_lat, region_lon = REGION_COORDS.arrays()
+    return haversine_distances(
+        state_lat[:, None], region_lon[None, :], region_lat[None, :], region_lon[None, :]
+    )
+
+
+@functools.cache
+def state_region_distance_table() -> dict[str, dict[int, int]]:
+    """ Returns the rounded distance in Km between each state of STATES_COORDS
+        and each region of REGION_COORDS, as a mapping of state to a mapping of
+        region to distance.
+
+        It is state_region_distance_matrix rounded, computed without NumPy so
+        rendering an alert does not import it. The table is computed the first
+        time it is requested.
+    """
+    regions = list(REGION_COORDS.items())
+    return {
+        state: {
+            region: round(distance_between_points(state_coords, region_coords))
+            for region, region_coords in regions
+        }
+        for state, state_coords in STATES_COORDS.items()
+    }
+
+
+def state_region_distance(state: str, region: int) -> int:
+    """ Returns the rounded distance in Km between a state and a region,
+        looked up in state_region_distance_table.
+    """
+    return state_region_distance_table()[state][region]
@@ -0,0 +1,281 @@
+""" Serializers of the feed of an alert.
+
+    Every serializer writes an AlertDocument, so producing several formats
+    of the same alert builds its document once. The available formats are:
+
+        - atom: Atom feed with a CAP 1.1 alert, the format of the rss feed.
+        - cap: Standalone CAP 1.2 alert.
+        - json: JSON Feed 1.1, with the CAP fields in the "_cap" extension.
+        - geojson: GeoJSON feature with the area of the alert.
+"""
+import datetime
+import functools
+import json
+from typing import Any, Callable, Iterable, Optional
+
+from rss.cap.alert import Alert
+from rss.cap.document import AlertDocument, CIRCLE_RADIUS, alert_document
+from rss.cap.polygon import POLYGONS, outline
+from rss.cap.regions import REGION_COORDS
+from rss.cap.states import STATES
+from rss.cap.template import cap_template, entry_template, feed_template
+
+# A serializer takes the document, the updated date, the indentation and
+# whether the output is compact, and returns the serialized document
+Serializer = Callable[[AlertDocument, str, str, bool], str]
+
+
+def template_values(
+        document: AlertDocument, updated: str
+) -> tuple[dict[str, str], dict[str, list[tuple[str, str]]]]:
+    """ Returns the fields and blocks used to render the feed and CAP templates.
+    """
+    fields = {
+        "updated": updated,
+        "id": document.id,
+        "title": document.title,
+        "identifier": document.identifier,
+        "sender": document.sender,
+        "sent": document.sent,
+        "status": document.status,
+        "msg_type": document.msg_type,
+        "event": document.event,
+        "response_type": document.response_type,
+        "severity": document.severity,
+        "effective": document.sent,
+        "expires": document.expires,
+        "headline": document.headline,
+        "description": document.description,
+        "area_desc": document.area_desc,
+    }
+
+    references = []
+    if document.is_update:
+        references.append(("references", " ".join(document.references)))
+
+    if document.circle is not None:
+        shapes = [("circle", document.circle)]
+    else:
+        shapes = [("polygon", text) for text in document.polygons]
+
+    return fields, {"references": references, "shapes": shapes}
+
+
+def atom_feed(
+        document: AlertDocument,
+        updated: str,
+        indentation: str = "\t",
+        compact: bool = False,
+) -> str:
+    """ Returns the Atom + CAP 1.1 feed of an alert.
+    """
+    template = feed_template("", "") if compact else feed_template(indentation)
+    return template.render(*template_values(document, updated))
+
+
+def atom_entry(
+        document: AlertDocument,
+        updated: str,
+        indentation: str = "\t",
+        compact: bool = False,
+) -> str:
+    """ Returns the 'entry' tag of the Atom feed of an alert, indented as
+        a child of the 'feed' tag.
+    """
+    template = entry_template("", "") if compact else entry_template(indentation)
+    return template.render(*template_values(document, updated))
+
+
+def cap_alert(
+        document: AlertDocument,
+        updated: str,
+        indentation: str = "\t",
+        compact: bool = False,
+) -> str:
+    """ Returns the standalone CAP 1.2 alert. The updated date is not
+        part of a CAP alert.
+    """
+    template = cap_template("", "") if compact else cap_template(indentation)
+    return template.render(*template_values(document, updated))
+
+
+def _dumps(obj: Any, indentation: str, compact: bool) -> str:
+    if compact:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    return json.dumps(obj, ensure_ascii=False, indent=indentation)
+
+
+def cap_fields(document: AlertDocument) -> dict[str, Any]:
+    """ Returns the fields of the CAP alert as a dictionary.
+    """
+    return {
+        "identifier": document.identifier,
+        "sender": document.sender,
+        "sent": document.sent,
+        "status": document.status,
+        "msgType": document.msg_type,
+        "scope": "Public",
+        "references": list(document.references),
+        "event": document.event,
+        "responseType": document.response_type,
+        "urgency": "Immediate",
+        "severity": document.severity,
+        "certainty": "Observed",
+        "effective": document.sent,
+        "expires": document.expires,
+        "headline": document.headline,
+        "description": document.description,
+        "areaDesc": document.area_desc,
+    }
+
+
+def json_feed(
+        document: AlertDocument,
+        updated: str,
+        indentation: str = "\t",
+        compact: bool = False,
+) -> str:
+    """ Returns the JSON Feed 1.1 of an alert.
+    """
+    item = {
+        "id": document.id,
+        "url": "https://rss.sasmex.net",
+        "title": document.title,
+        "summary": document.headline,
+        "content_text": document.description,
+        "date_published": document.sent,
+        "date_modified": updated,
+        "_cap": cap_fields(document),
+    }
+    feed = {
+        "version": "https://jsonfeed.org/version/1.1",
+        "title": "SASMEX-CIRES RSS Feed",
+        "description": "Sistema de Alerta Sismica Mexicano",
+        "home_page_url": "https://rss.sasmex.net",
+        "feed_url": "https://rss.sasmex.net/sasmex.json",
+        "icon": "https://rss.sasmex.net/ciresFeedLogo2b.png",
+        "favicon": "https://rss.sasmex.net/ciresFeedFavicon.ico",
+        "authors": [{"name": "CIRES A.C."}],
+        "language": "es-MX",
+        "items": [item],
+    }
+    return _dumps(feed, indentation, compact)
+
+
+@functools.cache
+def polygon_coordinates(state: int) -> tuple[tuple[float, float], ...]:
+    """ Returns the (lon, lat) coordinates of the polygon of a state, rounded
+        like the polygon tags of the feed.
+    """
+    return tuple(
+        (round(point.lon, 2), round(point.lat, 2))
+        for point in POLYGONS[STATES[state]].points
+    )
+
+
+@functools.cache
+def outline_coordinates(mask: int) -> tuple[tuple[tuple[float, float], ...], ...]:
+    """ Returns the (lon, lat) coordinates of each part of the merged outline
+        of a set of states, rounded like the polygon tags of the feed.
+    """
+    return tuple(
+        tuple((round(point.lon, 2), round(point.lat, 2)) for point in poly.points)
+        for poly in outline(mask)
+    )
+
+
+def geojson(
+        document: AlertDocument,
+        updated: str,
+        indentation: str = "\t",
+        compact: bool = False,
+) -> str:
+    """ Returns a GeoJSON feature with the area of an alert.
+
+        The area of an alert is a MultiPolygon with the polygon of each
+        state. If the document uses outlines it is the merged outline of the
+        states, a Polygon if the states overlap and a MultiPolygon otherwise.
+        The area of an event is the Point of its region, the radius of the
+        circle in Km is the "radius" property.
+    """
+    if document.area_region is not None:
+        coords = REGION_COORDS[document.area_region]
+        geometry = {
+            "type": "Point",
+            "coordinates": [round(coords.lon, 2), round(coords.lat, 2)],
+        }
+    elif document.outline and document.area_states:
+        parts = outline_coordinates(document.area_mask)
+        if len(parts) == 1:
+            geometry = {"type": "Polygon", "coordinates": [parts[0]]}
+        else:
+            geometry = {"type": "MultiPolygon", "coordinates": [[part] for part in parts]}
+    else:
+        geometry = {
+            "type": "MultiPolygon",
+            "coordinates": [[polygon_coordinates(st)] for st in document.area_states],
+        }
+
+    properties = cap_fields(document)
+    properties["id"] = document.id
+    properties["title"] = document.title
+    properties["updated"] = updated
+    if document.area_region is not None:
+        properties["radius"] = CIRCLE_RADIUS
+
+    feature = {
+        "type": "Feature",
+        "id": document.id,
+        "geometry": geometry,
+        "properties": properties,
+    }
+    return _dumps(feature, indentation, compact)
+
+
+SERIALIZERS = {
+    "atom": atom_feed,
+    "cap": cap_alert,
+    "json": json_feed,
+    "geojson": geojson,
+}  # type: dict[str, Serializer]
+
+
+def render(
+        alert: Alert,
+        formats: Iterable[str] = ("atom",),
+        is_test: bool = False,
+        updated: Optional[str] = None,
+        indentation: str = "\t",
+        compact: bool = False,
+        max_refs: Optional[int] = None,
+        outline: bool = False,
+) -> dict[str, bytes]:
+    """ Render an alert in one or more formats.
+
+        :param alert: The alert.
+        :param formats: Names of the formats, see SERIALIZERS.
+        :param is_test: Whether the alert is a test.
+        :param updated: The updated date. Defaults to the current time.
+        :param indentation: The indentation of the output. Ignored if compact
+            is True.
+        :param compact: Whether to write the output without indentation or
+            newlines.
+        :param max_refs: Maximum number of references included in the output.
+        :param outline: Whether the area of an alert is the merged outline of
+            its states instead of one polygon per state.
+        :return: Map of format name to the output encoded as UTF-8.
+    """
+    serializers = {}
+    for name in formats:
+        try:
+            serializers[name] = SERIALIZERS[name]
+        except KeyError:
+            raise ValueError(f"Invalid format {name}")
+
+    if updated is None:
+        updated = datetime.datetime.now().isoformat()
+    document = alert_document(alert, is_test, max_refs, outline)
+    return {
+        name: serializer(document, updated, indentation, compact).encode()
+        for name, serializer in serializers.items()
+    }
@@ -0,0 +1,181 @@
+""" Compact tables with the coordinates of the regions and states and
+    the vertices of the polygons of the states.
+
+    The tables are stored as NumPy files in the data directory. Each file is
+    memory-mapped the first time one of its values is accessed, so importing
+    the package does not create any point.
+
+    Looking up a point or a polygon reads the rows of the mapped file with
+    struct, NumPy is only imported by save_table and by the arrays of a
+    PointTable, which are meant for bulk computations.
+"""
+import ast
+import functools
+import mmap
+import os
+import struct
+from typing import TYPE_CHECKING, Callable, Hashable, Iterable, Iterator, Mapping, Optional
+
+from rss.cap.geopoint import GeoPoint
+
+if TYPE_CHECKING:
+    import numpy as np
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "data")
+
+# Each row has the code of a region or state and a coordinate. Polygon tables
+# have one row per vertex, the vertices of a polygon are contiguous
+POINT_DTYPE = [("code", "<i4"), ("lat", "<f8"), ("lon", "<f8")]
+# A row of a table, the fields of POINT_DTYPE are packed without padding
+ROW = struct.Struct("<idd")
+
+_NPY_MAGIC = b"\x93NUMPY"
+
+
+def _rows_offset(data: mmap.mmap, filename: str) -> int:
+    """ Returns the offset of the first row of a NumPy file, after checking
+        that its header describes a table of POINT_DTYPE rows.
+    """
+    if data[:6] != _NPY_MAGIC:
+        raise ValueError(f"{filename} is not a NumPy file")
+    if data[6] == 1:
+        header_len, = struct.unpack_from("<H", data, 8)
+        offset = 10
+    else:
+        header_len, = struct.unpack_from("<I", data, 8)
+        offset = 12
+    header = ast.literal_eval(data[offset:offset + header_len].decode("latin1"))
+    if header["descr"] != POINT_DTYPE or header["fortran_order"]:
+        raise ValueError(f"{filename} is not a table of {POINT_DTYPE}")
+    return offset + header_len
+
+
+@functools.cache
+def load_rows(filename: str) -> memoryview:
+    """ Returns the read only, memory-mapped rows of the table stored in the
+        data directory with the given name. Each row is packed as ROW.
+    """
+    with open(os.path.join(DATA_PATH, filename), "rb") as fp:
+        data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(data)[_rows_offset(data, filename):]
+
+
+@functools.cache
+def load_table(filename: str) -> "np.ndarray":
+    """ Returns the read only, memory-mapped NumPy array of the table stored
+        in the data directory with the given name.
+    """
+    import numpy as np
+
+    return np.load(os.path.join(DATA_PATH, filename), mmap_mode="r")
+
+
+def save_table(path: str, rows: Iterable[tuple[int, GeoPoint]]) -> None:
+    """ Write a table of codes and points. Used to update the data files.
+    """
+    import numpy as np
+
+    table = np.array([(code, p.lat, p.lon) for code, p in rows], dtype=POINT_DTYPE)
+    np.save(path, table)
+
+
+class PointTable(Mapping[Hashable, GeoPoint]):
+    """ Read only mapping of a key to a point, backed by a table.
+
+        :param filename: Name of the table in the data directory.
+        :param key: Returns the key of a row given its code. By default, the
+            key is the code.
+    """
+
+    def __init__(self, filename: str, key: Optional[Callable[[int], Hashable]] = None):
+        self._filename = filename
+        self._key = key
+        self._index = None  # type: Optional[dict[Hashable, int]]
+
+    @property
+    def rows(self) -> memoryview:
+        return load_rows(self._filename)
+
+    @property
+    def table(self) -> "np.ndarray":
+        return load_table(self._filename)
+
+    def _get_index(self) -> dict[Hashable, int]:
+        if self._index is None:
+            codes = [code for code, _, _ in ROW.iter_unpack(self.rows)]
+            if self._key is not None:
+                codes = [self._key(code) for code in codes]
+            self._index = {key: row for row, key in enumerate(codes)}
+        return self._index
+
+    def __getitem__(self, key: Hashable) -> GeoPoint:
+        _, lat, lon = ROW.unpack_from(self.rows, self._get_index()[key] * ROW.size)
+        return GeoPoint(lon=lon, lat=lat)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self._get_index())
+
+    def __len__(self) -> int:
+        return len(self.rows) // ROW.size
+
+    def arrays(self) -> tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+        """ Returns the codes, latitudes and longitudes of the points as NumPy
+            arrays, in the same order as the keys.
+        """
+        table = self.table
+        return table["code"], table["lat"], table["lon"]
+
+
+class PolygonTable(Mapping[Hashable, "Polygon"]):
+    """ Read only mapping of a key to a polygon, backed by a table of vertices.
+
+        Polygons are created the first time they are accessed and reused
+        afterwards.
+    """
+
+    def __init__(
+            self,
+            filename: str,
+            polygon_class: type,
+            key: Optional[Callable[[int], Hashable]] = None
+    ):
+        self._filename = filename
+        self._polygon_class = polygon_class
+        self._key = key
+        self._index = None  # type: Optional[dict[Hashable, slice]]
+        self._polygons = {}  # type: dict[Hashable, Polygon]
+
+    @property
+    def rows(self) -> memoryview:
+        return load_rows(self._filename)
+
+    def _get_index(self) -> dict[Hashable, slice]:
+        if self._index is None:
+            codes = [code for code, _, _ in ROW.iter_unpack(self.rows)]
+            index = {}
+            start = 0
+            # The vertices of each polygon are contiguous
+            for stop in range(1, len(codes) + 1):
+                if stop == len(codes) or codes[stop] != codes[start]:
+                    code = codes[start]
+                    key = self._key(code) if self._key is not None else code
+                    index[key] = slice(start * ROW.size, stop * ROW.size)
+                    start = stop
+            self._index = index
+        return self._index
+
+    def __getitem__(self, key: Hashable) -> "Polygon":
+        polygon = self._polygons.get(key)
+        if polygon is None:
+            rows = self.rows[self._get_index()[key]]
+            polygon = self._polygon_class([
+                GeoPoint(lon=lon, lat=lat) for _, lat, lon in ROW.iter_unpack(rows)
+            ])
+            self._polygons[key] = polygon
+        return polygon
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self._get_index())
+
+    def __len__(self) -> int:
+        return len(self._get_index())
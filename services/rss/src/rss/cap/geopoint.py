@@ -1,5 +1,15 @@
 from dataclasses import dataclass
 import math
+from typing import TYPE_CHECKING, Iterable
+
+if TYPE_CHECKING:
+    # NumPy is imported by the functions that use it, so importing this
+    # module stays cheap
+    import numpy as np
+    import numpy.typing as npt
+
+
+EARTH_RADIUS = 6371  # Earth's mean radius in Km
 
 
 @dataclass(frozen=True)
@@ -16,8 +26,58 @@ def distance_between_points(point1: GeoPoint, point2: GeoPoint) -> float:
     dlon = lon2 - lon1
 
     # Haversine formula
-    earth_radius = 6371  # in Km
+    earth_radius = EARTH_RADIUS  # in Km
     # Angular separation
     sep = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
     angular_distance = 2 * math.atan2(math.sqrt(sep), math.sqrt(1 - sep))
     return earth_radius * angular_distance  # Earth's mean radius in kilometers
+
+
+def haversine_distances(
+        lat1: "npt.ArrayLike",
+        lon1: "npt.ArrayLike",
+        lat2: "npt.ArrayLike",
+        lon2: "npt.ArrayLike",
+) -> "np.ndarray":
+    """ Compute the haversine distance between arrays of points.
+
+        The arrays follow NumPy broadcasting rules, so passing column and
+        row vectors returns the full distance matrix.
+
+        :param lat1: Latitudes of the first points in degrees.
+        :param lon1: Longitudes of the first points in degrees.
+        :param lat2: Latitudes of the second points in degrees.
+        :param lon2: Longitudes of the second points in degrees.
+        :return: An array with the distances in Km.
+    """
+    import numpy as np
+
+    lat1, lon1, lat2, lon2 = (
+        np.radians(np.asarray(arr, dtype=np.float64)) for arr in (lat1, lon1, lat2, lon2)
+    )
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+
+    sep = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    angular_distance = 2 * np.arctan2(np.sqrt(sep), np.sqrt(1 - sep))
+    return EARTH_RADIUS * angular_distance
+
+
+def points_to_arrays(points: Iterable[GeoPoint]) -> tuple["np.ndarray", "np.ndarray"]:
+    """ Returns the latitudes and longitudes of the points as two arrays.
+    """
+    import numpy as np
+
+    coords = np.array([(p.lat, p.lon) for p in points], dtype=np.float64).reshape(-1, 2)
+    return coords[:, 0], coords[:, 1]
+
+
+def distance_matrix(
+        points1: Iterable[GeoPoint], points2: Iterable[GeoPoint]
+) -> "np.ndarray":
+    """ Returns a matrix with the distance in Km between each point of
+        points1 (rows) and each point of points2 (columns).
+    """
+    lat1, lon1 = points_to_arrays(points1)
+    lat2, lon2 = points_to_arrays(points2)
+    return haversine_distances(lat1[:, None], lon1[:, None], lat2[None, :], lon2[None, :])
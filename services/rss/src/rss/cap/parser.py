@@ -0,0 +1,306 @@
+""" Parser of the feeds and CAP files written by this package.
+
+    The alerts of Atom feeds (with CAP 1.1 alerts), rolling feeds and
+    standalone CAP 1.2 files are read back into Alert objects, so files that
+    were published but never stored can be imported.
+
+    Documents are parsed incrementally: each alert is built as soon as its
+    element ends and the parsed elements are then discarded, so memory does
+    not grow with the size of a file.
+
+    A CAP alert does not contain every field of the alert it was written
+    from, they are recovered as follows:
+
+        - id: the identifier without the "CIRES" prefix.
+        - time: the sent date, without its offset.
+        - is_event: whether the response type is "Monitor".
+        - region and states: the description, which has the name of the region
+          and the distance to each state. Regions that share a name are told
+          apart by those distances or, for events, by the center of the circle.
+        - refs: the references. Only their id and time are known, the region of
+          a reference is the one of the alert and it has no states. See
+          link_references to replace them by the parsed alerts.
+"""
+import datetime
+import functools
+import io
+import itertools
+import os
+import re
+from concurrent import futures
+from typing import BinaryIO, Iterable, Iterator, NamedTuple, Optional, Union
+from xml.etree import ElementTree
+
+from rss.cap.alert import Alert
+from rss.cap.document import state_region_distance
+from rss.cap.regions import REGION_CODES, REGION_COORDS
+from rss.cap.states import STATES, STATES_CODES
+from rss.cap.template import CAP_1_1_NAMESPACE, CAP_1_2_NAMESPACE
+
+Source = Union[str, os.PathLike, BinaryIO]
+
+# Extensions of the files read by parse_directory
+FEED_EXTENSIONS = (".cap", ".xml")
+
+_CAP_NAMESPACES = (CAP_1_1_NAMESPACE, CAP_1_2_NAMESPACE)
+_ALERT_TAGS = frozenset(f"{{{ns}}}alert" for ns in _CAP_NAMESPACES)
+# Maps the tags of the fields used to build an alert to their name
+_FIELD_TAGS = {
+    f"{{{ns}}}{name}": name
+    for ns in _CAP_NAMESPACES
+    for name in (
+        "identifier", "sent", "msgType", "references",
+        "responseType", "description", "circle",
+    )
+}  # type: dict[str, str]
+
+_DESCRIPTION = re.compile(
+    r"Sismo (?:Severo|Moderado) en (?P<region>.+?)(?P<states>(?:(?:, | y )a -?\d+km de .+?)+)"
+)
+_STATE_DISTANCE = re.compile(r"(?:, | y )a (-?\d+)km de (.+?)(?=(?:, | y )a -?\d+km de |$)")
+
+
+class InvalidFeedError(ValueError):
+    """ Raised when a feed or one of its alerts cannot be parsed.
+    """
+    pass
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_sent(text: str) -> datetime.datetime:
+    # The offset is always the one of the central time zone, alerts have
+    # naive times. Update chains repeat dates, so they are cached
+    try:
+        return datetime.datetime.fromisoformat(text[:19])
+    except ValueError:
+        raise InvalidFeedError(f"Invalid alert date {text!r}")
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_description(description: str) -> tuple[str, tuple[tuple[int, int], ...]]:
+    """ Returns the name of the region and the (state code, distance) pairs
+        of the description of an alert.
+
+        :raises InvalidFeedError: If the description does not have the format
+            of rss.cap.document.description_text.
+    """
+    match = _DESCRIPTION.fullmatch(description)
+    if match is None:
+        raise InvalidFeedError(f"Invalid alert description {description!r}")
+    states = []
+    for distance, name in _STATE_DISTANCE.findall(match["states"]):
+        try:
+            states.append((STATES_CODES[name], int(distance)))
+        except KeyError:
+            raise InvalidFeedError(f"Unknown state {name!r}")
+    return match["region"], tuple(states)
+
+
+def _region_code(
+        name: str,
+        distances: tuple[tuple[int, int], ...],
+        circle: Optional[str],
+) -> int:
+    try:
+        codes = REGION_CODES[name]
+    except KeyError:
+        raise InvalidFeedError(f"Unknown region {name!r}")
+    if len(codes) == 1:
+        return next(iter(codes))
+
+    candidates = sorted(codes)
+    if circle is not None:
+        center = circle.split(" ", 1)[0]
+        candidates = [
+            code for code in candidates
+            if f"{REGION_COORDS[code].lat:0.2f},{REGION_COORDS[code].lon:0.2f}" == center
+        ] or candidates
+    matching = [
+        code for code in candidates
+        if all(state_region_distance(STATES[st], code) == km for st, km in distances)
+    ]
+    # Regions with the same name, center and distances cannot be told apart
+    return (matching or candidates)[0]
+
+
+@functools.lru_cache(maxsize=1024)
+def _reference(text: str, region: int) -> Alert:
+    # The references of an update chain repeat in every update
+    try:
+        _, identifier, date = text.split(",")
+    except ValueError:
+        raise InvalidFeedError(f"Invalid reference {text!r}")
+    return Alert(_parse_sent(date), (), region, identifier.removeprefix("CIRES_"))
+
+
+def alert_from_fields(fields: dict[str, str]) -> Alert:
+    """ Build an alert from the text of the fields of a CAP alert.
+
+        :param fields: Maps the name of each field (identifier, sent, msgType,
+            references, responseType, description and circle) to its text.
+        :raises InvalidFeedError: If a required field is missing or invalid.
+    """
+    try:
+        identifier = fields["identifier"]
+        sent = fields["sent"]
+        description = fields["description"]
+    except KeyError as err:
+        raise InvalidFeedError(f"Missing alert field {err.args[0]}")
+
+    region_name, distances = parse_description(description)
+    region = _region_code(region_name, distances, fields.get("circle"))
+
+    refs = None
+    if fields.get("msgType") == "Update":
+        refs = [_reference(text, region) for text in fields.get("references", "").split()]
+
+    return Alert(
+        time=_parse_sent(sent),
+        states=[st for st, _ in distances],
+        region=region,
+        id=identifier.removeprefix("CIRES"),
+        is_event=fields.get("responseType") == "Monitor",
+        refs=refs,
+    )
+
+
+def iter_alerts(source: Source) -> Iterator[Alert]:
+    """ Yields the alerts of a feed, a rolling feed or a CAP file in the order
+        they appear.
+
+        :param source: The path of the file or a binary file object.
+        :raises InvalidFeedError: If the document is not valid XML or one of
+            its alerts cannot be parsed.
+    """
+    events = ElementTree.iterparse(source, events=("start", "end"))
+    fields = {}  # type: dict[str, str]
+    try:
+        _, root = next(events)
+        for event, elem in events:
+            if event == "start":
+                continue
+            tag = elem.tag
+            name = _FIELD_TAGS.get(tag)
+            if name is not None:
+                fields.setdefault(name, elem.text or "")
+            elif tag in _ALERT_TAGS:
+                yield alert_from_fields(fields)
+                fields = {}
+                # The parsed elements are no longer needed
+                root.clear()
+    except ElementTree.ParseError as err:
+        raise InvalidFeedError(f"Invalid XML: {err}")
+    except StopIteration:
+        raise InvalidFeedError("The document is empty")
+
+
+def parse_alerts(source: Union[Source, bytes]) -> list[Alert]:
+    """ Returns the alerts of a feed, a rolling feed or a CAP file.
+
+        :param source: The path of the file, a binary file object or the
+            contents of the file.
+        :raises InvalidFeedError: If the document cannot be parsed.
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    return list(iter_alerts(source))
+
+
+class ParsedFile(NamedTuple):
+    """ The alerts of a file, or the error that prevented parsing it. """
+    path: str
+    alerts: list[Alert]
+    error: Optional[str] = None
+
+
+def _parse_files(paths: list[str]) -> list[ParsedFile]:
+    """ Parse a chunk of files. Runs in the worker processes of parse_directory.
+    """
+    results = []
+    for path in paths:
+        try:
+            results.append(ParsedFile(path, parse_alerts(path)))
+        except (InvalidFeedError, OSError) as err:
+            results.append(ParsedFile(path, [], str(err)))
+    return results
+
+
+def feed_files(
+        directory: Union[str, os.PathLike],
+        extensions: tuple[str, ...] = FEED_EXTENSIONS,
+) -> Iterator[str]:
+    """ Yields the paths of the files of a directory and its subdirectories
+        that have one of the extensions.
+    """
+    for dirpath, _, filenames in os.walk(directory):
+        for filename in sorted(filenames):
+            if filename.endswith(extensions):
+                yield os.path.join(dirpath, filename)
+
+
+def parse_directory(
+        directory: Union[str, os.PathLike],
+        workers: Optional[int] = None,
+        chunksize: int = 256,
+        extensions: tuple[str, ...] = FEED_EXTENSIONS,
+) -> Iterator[ParsedFile]:
+    """ Parse the feeds of a directory and its subdirectories using a pool
+        of processes.
+
+        The results are yielded as soon as each chunk of files is parsed, so
+        they may not be in the same order as the files. Files are listed
+        lazily, at most two chunks per worker are in flight at any time.
+        A file that cannot be read or parsed does not stop the others, its
+        error is returned instead.
+
+        :param directory: The directory.
+        :param workers: Number of worker processes. Defaults to the number of
+            CPUs. If it is 1, the files are parsed in the current process.
+        :param chunksize: Number of files sent to a worker at a time.
+        :param extensions: Extensions of the files that are parsed.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    paths = feed_files(directory, extensions)
+    chunks = iter(lambda: list(itertools.islice(paths, chunksize)), [])
+
+    if workers == 1:
+        for chunk in chunks:
+            yield from _parse_files(chunk)
+        return
+
+    with futures.ProcessPoolExecutor(workers) as executor:
+        max_pending = workers * 2
+        pending = set()
+        for chunk in chunks:
+            pending.add(executor.submit(_parse_files, chunk))
+            if len(pending) >= max_pending:
+                done, pending = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+
+        for future in futures.as_completed(pending):
+            yield from future.result()
+
+
+def link_references(alerts: Iterable[Alert]) -> list[Alert]:
+    """ Replace the references of the alerts by the alerts with the same id,
+        so the references have their states and region.
+
+        The alerts are processed in order of time, a reference that is linked
+        also has its own references linked. References to alerts that are not
+        given are kept as parsed. An alert that appears more than once (the
+        same alert in several files) is only returned once.
+
+        :return: The alerts sorted by time.
+    """
+    linked = {}  # type: dict[str, Alert]
+    for alert in sorted(alerts, key=lambda a: a.time):
+        if alert.id in linked:
+            continue
+        if alert.refs:
+            refs = [linked.get(ref.id, ref) for ref in alert.refs]
+            alert = Alert(alert.time, alert.states, alert.region, alert.id, alert.is_event, refs)
+        linked[alert.id] = alert
+    return list(linked.values())
@@ -1,82 +1,184 @@
 from dataclasses import dataclass
+import functools
+import itertools
+from typing import Iterable, Mapping, Optional
+
+from rss.cap.geodata import PolygonTable
 from rss.cap.geopoint import GeoPoint
+from rss.cap.states import STATES
 
 
 @dataclass(frozen=True)
 class Polygon:
     points: list[GeoPoint]
 
+    @functools.cached_property
+    def bounds(self) -> tuple[float, float, float, float]:
+        """ The bounding box of the polygon as (min_lon, min_lat, max_lon, max_lat).
+        """
+        lons = [p.lon for p in self.points]
+        lats = [p.lat for p in self.points]
+        return min(lons), min(lats), max(lons), max(lats)
+
+    def contains(self, point: GeoPoint) -> bool:
+        """ Whether the point is inside the polygon. Points outside the bounding
+            box are rejected before testing the polygon (ray casting).
+        """
+        min_lon, min_lat, max_lon, max_lat = self.bounds
+        if not (min_lon <= point.lon <= max_lon and min_lat <= point.lat <= max_lat):
+            return False
+
+        inside = False
+        x, y = point.lon, point.lat
+        points = self.points
+        for p1, p2 in zip(points, points[1:] + points[:1]):
+            if (p1.lat > y) != (p2.lat > y):
+                x_cross = p1.lon + (y - p1.lat) * (p2.lon - p1.lon) / (p2.lat - p1.lat)
+                if x < x_cross:
+                    inside = not inside
+        return inside
+
+
+# Polygon of the alert area of each state.
+# TODO: The polygons of Puebla and Morelos are incorrect, they are the one of Jalisco
+POLYGONS = PolygonTable(
+    "polygons.npy", Polygon, key=lambda code: STATES[code]
+)  # type: Mapping[str, Polygon]
+
+
+def states_containing(point: GeoPoint) -> list[str]:
+    """ Returns the names of the states whose polygon contains the point.
+    """
+    return [state for state, polygon in POLYGONS.items() if polygon.contains(point)]
+
+
+# Bit of each state in a state mask. A set of states is identified by the
+# mask with the bits of its states, there are 2 ** len(STATES) sets
+STATE_BITS = {code: 1 << ii for ii, code in enumerate(STATES)}  # type: dict[int, int]
+
+
+def state_mask(states: Iterable[int]) -> int:
+    """ Returns the mask of a set of state codes.
+    """
+    mask = 0
+    for code in states:
+        mask |= STATE_BITS[code]
+    return mask
+
+
+def mask_states(mask: int) -> list[int]:
+    """ Returns the codes of the states of a mask, in the order of STATES.
+    """
+    return [code for code, bit in STATE_BITS.items() if mask & bit]
+
+
+def _signed_area(ring: list[tuple[float, float]]) -> float:
+    # Twice the area of a ring of (lon, lat) coordinates, positive if it is
+    # counterclockwise
+    return sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]))
+
+
+def _intersection(
+        a: tuple[float, float],
+        b: tuple[float, float],
+        c: tuple[float, float],
+        d: tuple[float, float],
+) -> Optional[tuple[float, float, tuple[float, float]]]:
+    # The point where the segments ab and cd cross, with its position along
+    # each segment, or None if they do not cross
+    rx, ry = b[0] - a[0], b[1] - a[1]
+    sx, sy = d[0] - c[0], d[1] - c[1]
+    den = rx * sy - ry * sx
+    if den == 0:
+        return None
+    qx, qy = c[0] - a[0], c[1] - a[1]
+    t = (qx * sy - qy * sx) / den
+    u = (qx * ry - qy * rx) / den
+    if 0 < t < 1 and 0 < u < 1:
+        return t, u, (a[0] + t * rx, a[1] + t * ry)
+    return None
+
+
+def union(polygons: Iterable[Polygon]) -> tuple[Polygon, ...]:
+    """ Returns the union of polygons, one polygon for each group of polygons
+        that overlap. Each one is a closed ring in counterclockwise order.
+
+        The edges of each polygon are split where they cross the edges of the
+        other polygons, and the pieces that are not inside another polygon
+        are the boundary of the union.
+
+        A union with a hole, or with polygons that only touch at a vertex,
+        cannot be written as a list of polygons without covering land outside
+        them, so the polygons are returned as they are (without repeated ones).
+    """
+    rings = []  # type: list[list[tuple[float, float]]]
+    for poly in polygons:
+        ring = [(p.lon, p.lat) for p in poly.points[:-1]]
+        if _signed_area(ring) < 0:
+            ring.reverse()
+        if all(sorted(ring) != sorted(other) for other in rings):
+            rings.append(ring)
+    shapes = [Polygon([GeoPoint(lon=x, lat=y) for x, y in ring + ring[:1]]) for ring in rings]
+    if len(rings) == 1:
+        return tuple(shapes)
+
+    edges = [(ii, a, b) for ii, ring in enumerate(rings) for a, b in zip(ring, ring[1:] + ring[:1])]
+    crossings = [[] for _ in edges]  # type: list[list[tuple[float, tuple[float, float]]]]
+    for (ii, (ring1, a, b)), (jj, (ring2, c, d)) in itertools.combinations(enumerate(edges), 2):
+        if ring1 == ring2:
+            continue
+        crossing = _intersection(a, b, c, d)
+        if crossing is not None:
+            t, u, point = crossing
+            crossings[ii].append((t, point))
+            crossings[jj].append((u, point))
+
+    # Start of each piece of the boundary to its end
+    boundary = {}  # type: dict[tuple[float, float], tuple[float, float]]
+    for (ring_index, a, b), edge_crossings in zip(edges, crossings):
+        points = [a] + [point for _, point in sorted(edge_crossings)] + [b]
+        for start, end in zip(points, points[1:]):
+            middle = GeoPoint(lon=(start[0] + end[0]) / 2, lat=(start[1] + end[1]) / 2)
+            if any(shape.contains(middle) for kk, shape in enumerate(shapes) if kk != ring_index):
+                continue
+            if start in boundary:
+                return tuple(shapes)
+            boundary[start] = end
+
+    parts = []
+    while boundary:
+        start = min(boundary)
+        ring = [start]
+        point = boundary.pop(start)
+        while point != start:
+            ring.append(point)
+            point = boundary.pop(point)
+        if _signed_area(ring) < 0:
+            return tuple(shapes)
+        parts.append(Polygon([GeoPoint(lon=x, lat=y) for x, y in ring + ring[:1]]))
+    return tuple(parts)
+
+
+@functools.lru_cache(maxsize=1 << len(STATES))
+def outline(mask: int) -> tuple[Polygon, ...]:
+    """ Returns the outline of the alert area of a set of states: the union
+        of their polygons, one polygon for each group of states whose
+        polygons overlap. It covers the polygons of the states and nothing else.
+
+        Outlines are computed the first time they are requested.
+
+        :param mask: The mask of the states, see state_mask.
+    """
+    states = mask_states(mask)
+    if not states or mask >= 1 << len(STATES):
+        raise ValueError(f"Invalid state mask {mask}")
+    if len(states) == 1:
+        return (POLYGONS[STATES[states[0]]],)
+    return union(POLYGONS[STATES[code]] for code in states)
+
 
-POLYGONS = {
-    "CDMX": Polygon([
-        GeoPoint(-98.95, 19.15),
-        GeoPoint(-98.95, 19.60),
-        GeoPoint(-99.35, 19.60),
-        GeoPoint(-99.35, 19.15),
-        GeoPoint(-98.95, 19.15),
-    ]),
-    "Guerrero": Polygon([
-        GeoPoint(-98.07862978825065, 16.0110296092669),
-        GeoPoint(-97.54593323457897, 17.8415966116602),
-        GeoPoint(-101.8761975763345, 19.2879448824476),
-        GeoPoint(-102.5378210264313, 17.7258083999512),
-        GeoPoint(-98.07862978825065, 16.0110296092669),
-    ]),
-    "Oaxaca": Polygon([
-        GeoPoint(-94.06228754859151, 15.47721897238834),
-        GeoPoint(-93.87265942984988, 18.35477333359784),
-        GeoPoint(-98.59345543761631, 18.54701348538807),
-        GeoPoint(-98.70231961564679, 15.62069465224437),
-        GeoPoint(-94.06228754859151, 15.47721897238834),
-    ]),
-    "Michoacan": Polygon([
-        GeoPoint(-100.3082496102006, 19.22258227299296),
-        GeoPoint(-99.90574894221695, 20.25137939386669),
-        GeoPoint(-101.7004679199828, 20.98750980416739),
-        GeoPoint(-102.5163263850749, 20.04819533305848),
-        GeoPoint(-100.3082496102006, 19.22258227299296),
-    ]),
-    "Colima": Polygon([
-        GeoPoint(-102.1736180920661, 17.52391478191304),
-        GeoPoint(-100.1106393437513, 19.34135457963665),
-        GeoPoint(-103.1835224398227, 20.50015872501815),
-        GeoPoint(-104.95654982688, 19.06711470238654),
-        GeoPoint(-102.1736180920661, 17.52391478191304),
-    ]),
-    "Jalisco": Polygon([
-        GeoPoint(-104.2491058523325, 18.38044565693096),
-        GeoPoint(-101.3397552345668, 20.92694779732655),
-        GeoPoint(-102.6629224869377, 22.03350792252786),
-        GeoPoint(-106.3991102388304, 20.90634816402552),
-        GeoPoint(-104.2491058523325, 18.38044565693096),
-    ]),
-    # TODO: Polygon 46 and 47 are incorrect
-    "Puebla": Polygon([
-        GeoPoint(-104.2491058523325, 18.38044565693096),
-        GeoPoint(-101.3397552345668, 20.92694779732655),
-        GeoPoint(-102.6629224869377, 22.03350792252786),
-        GeoPoint(-106.3991102388304, 20.90634816402552),
-        GeoPoint(-104.2491058523325, 18.38044565693096),
-    ]),
-    "Morelos": Polygon([
-        GeoPoint(-104.2491058523325, 18.38044565693096),
-        GeoPoint(-101.3397552345668, 20.92694779732655),
-        GeoPoint(-102.6629224869377, 22.03350792252786),
-        GeoPoint(-106.3991102388304, 20.90634816402552),
-        GeoPoint(-104.2491058523325, 18.38044565693096),
-    ]),
-    "Veracruz": Polygon([
-        GeoPoint(-93.25305668675571, 17.42108253392388),
-        GeoPoint(-93.12916347987822, 18.52870348672094),
-        GeoPoint(-97.73072782213934, 20.6891868605619),
-        GeoPoint(-98.45648071083687, 18.1953653038331),
-        GeoPoint(-93.25305668675571, 17.42108253392388),
-    ]),
-    "Chiapas": Polygon([
-        GeoPoint(-93.27134825264807, 15.45412744189985),
-        GeoPoint(-91.50417117489262, 16.99065334514076),
-        GeoPoint(-94.04488228807821, 18.2991028252503),
-        GeoPoint(-94.3660249339337, 16.12904295556978),
-        GeoPoint(-93.27134825264807, 15.45412744189985),
-    ])
-}
+def precompute_outlines() -> None:
+    """ Compute the outline of every set of states, so no alert pays for it.
+    """
+    for mask in range(1, 1 << len(STATES)):
+        outline(mask)
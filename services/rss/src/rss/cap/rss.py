@@ -1,25 +1,99 @@
-from babel.dates import format_datetime
+import collections
+from concurrent import futures
 import datetime
+import gzip
+import hashlib
+import io
+import itertools
+import os
+import threading
+from typing import Callable, Hashable, Iterable, Iterator, Literal, NamedTuple, Optional, Union
 from xml.dom import minidom
 
 from rss.cap.alert import Alert
-from rss.cap.geopoint import distance_between_points
-from rss.cap.polygon import POLYGONS
-from rss.cap.regions import REGIONS, REGION_COORDS
-from rss.cap.states import STATES, STATES_COORDS
+from rss.cap.document import (
+    SENDER,
+    AlertDocument,
+    alert_document,
+    circle_text,
+    description_text,
+    states_text,
+)
+from rss.cap.formats import atom_entry, atom_feed
+from rss.cap.template import rolling_feed_template
+from rss.cap.validation import FeedValidator
+from rss.utils.atomic_write import Durability, write_atomic
 
 
 class UpdateWithNoReferencesError(ValueError):
     pass
 
 
+# Returns the current time. Used for the updated date of the feeds
+Clock = Callable[[], datetime.datetime]
+
+# Updated date of a deterministic feed without alerts
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def updated_date(
+        alert: Optional[Alert],
+        clock: Optional[Clock] = None,
+        deterministic: bool = False,
+) -> str:
+    """ Returns the updated date of the feed of an alert.
+
+        :param alert: The alert, or None if the feed has no alerts.
+        :param clock: Returns the current time. Defaults to datetime.now.
+        :param deterministic: Whether the updated date is the time of the
+            alert instead of the current time, so the same alert always
+            produces the same feed.
+    """
+    if deterministic:
+        if clock is not None:
+            raise ValueError("A deterministic feed does not use a clock")
+        return (alert.time if alert is not None else EPOCH).isoformat()
+    if clock is None:
+        clock = datetime.datetime.now
+    return clock().isoformat()
+
+
+class _DigestStream(io.RawIOBase):
+    """ Binary stream that keeps the chunks written to it and updates
+        their SHA-256 as they arrive.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []  # type: list[bytes]
+        self.sha256 = hashlib.sha256()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:
+        self.sha256.update(data)
+        self.chunks.append(bytes(data))
+        return len(data)
+
+
 class RSSFeed:
-    """ Class to write rss files."""
+    """ Class to write rss files.
+
+        The contents of the feed are taken from the AlertDocument of the
+        alert, which is built once per alert (see rss.cap.document).
+    """
+
+    sender = SENDER
 
     def __init__(
             self,
             alert: Alert,
             is_test: bool = False,
+            clock: Optional[Clock] = None,
+            deterministic: bool = False,
+            max_refs: Optional[int] = None,
+            outline: bool = False,
     ):
         self._alert = alert
 
@@ -28,16 +102,64 @@ class RSSFeed:
             self._is_update = True
 
         self._is_test = is_test
-        self._updated_date = datetime.datetime.now().isoformat()
+        self._updated_date = updated_date(alert, clock, deterministic)
         self._refs = self._alert.refs
+        self._max_refs = max_refs
+        self._outline = outline
+        self._document = None  # type: Optional[AlertDocument]
 
         self._root = minidom.Document()
-        self._content = ""
+        self._data = b""
+        self._content = None  # type: Optional[str]
+        self._digest = None  # type: Optional[str]
+        # Errors found by FEED_VALIDATOR. None if the feed was not validated
+        self.validation_errors = None  # type: Optional[list[str]]
 
     @property
     def content(self) -> str:
+        """ The contents of the feed as a string. It is decoded from data
+            the first time it is accessed.
+        """
+        if self._content is None:
+            self._content = self._data.decode()
         return self._content
 
+    @property
+    def data(self) -> bytes:
+        """ The contents of the feed encoded as UTF-8.
+        """
+        return self._data
+
+    @property
+    def buffer(self) -> memoryview:
+        """ A read only view of data that can be sliced without copying.
+        """
+        return memoryview(self._data)
+
+    @property
+    def digest(self) -> str:
+        """ The SHA-256 of data as a hex string. It is computed when the
+            feed is built, so it can be used as an ETag or to detect that a
+            feed did not change.
+        """
+        if self._digest is None:
+            self._digest = hashlib.sha256(self._data).hexdigest()
+        return self._digest
+
+    def _set_data(self, data: bytes, digest: Optional[str] = None) -> None:
+        self._data = data
+        self._content = None
+        self._digest = digest
+
+    @property
+    def document(self) -> AlertDocument:
+        """ The format neutral contents of the feed.
+        """
+        if self._document is None:
+            self._document = alert_document(
+                self._alert, self._is_test, self._max_refs, self._outline)
+        return self._document
+
     @property
     def updated_date(self) -> str:
         return self._updated_date
@@ -105,9 +227,7 @@ class RSSFeed:
         """
         self._add_text_tag(entry, "id", self._alert.id)
         self._add_text_tag(entry, "updated", self._updated_date)
-
-        title = self._get_title()
-        self._add_text_tag(entry, "title", title)
+        self._add_text_tag(entry, "title", self.document.title)
 
         author = self._root.createElement("author")
         entry.appendChild(author)
@@ -157,33 +277,29 @@ class RSSFeed:
         alert.setAttribute("xmlns", "urn:oasis:names:tc:emergency:cap:1.1")
         content.appendChild(alert)
 
-        status = "Actual"
-        if self._is_test:
-            status = "Test"
-
-        sender = "cires.org.mx"
-        msg_type = "Alert"
-        if self._is_update:
-            msg_type = "Update"
-
+        document = self.document
         text_tags = [
-            ("identifier", "CIRES" + self._alert.id),
-            ("sender", sender),
-            ("sent", self._alert.time.isoformat(timespec="seconds") + "-06:00"),
-            ("status", status),
-            ("msgType", msg_type),
+            ("identifier", document.identifier),
+            ("sender", document.sender),
+            ("sent", document.sent),
+            ("status", document.status),
+            ("msgType", document.msg_type),
             ("scope", "Public"),
         ]
         for tag in text_tags:
             self._add_text_tag(alert, tag[0], tag[1])
 
         if self._is_update:
-            references = self._get_references(sender)
-            self._add_text_tag(alert, "references", references)
+            self._add_text_tag(alert, "references", self._get_references())
 
         return content, alert
 
-    def _get_references(self, sender: str) -> str:
+    def _get_status_and_msg_type(self) -> tuple[str, str]:
+        """ Returns the status and the message type of the alert.
+        """
+        return self.document.status, self.document.msg_type
+
+    def _get_references(self) -> str:
         """ Get the list of references for an update as a single string
             where each reference is separated by a space.
 
@@ -194,17 +310,7 @@ class RSSFeed:
             is returned:
                 sender,refID_1,date_1 sender,refID_2,date_2
         """
-        references = ""
-        for ii in range(len(self._refs) - 1):
-            ref_id = "CIRES_" + self._refs[ii].id
-            date = self._refs[ii].time.isoformat(timespec="seconds") + "-06:00"
-            references += sender + "," + ref_id + "," + date + " "
-
-        ref_id = "CIRES_" + self._refs[-1].id
-        date = self._refs[-1].time.isoformat(timespec="seconds") + "-06:00"
-        references += sender + "," + ref_id + "," + date
-
-        return references
+        return " ".join(self.document.references)
 
     def _create_info_tag(self) -> minidom.Element:
         """ Create the info tag.
@@ -213,23 +319,8 @@ class RSSFeed:
             such as the area, severity, etc.
         """
         info = self._root.createElement("info")
-        expire_date = self._alert.time + datetime.timedelta(minutes=1)
-
-        region = REGIONS[self._alert.region]
-        states = self._get_states()
-
-        if not self._alert.is_event:
-            event = f"SASMEX: ALERTA SISMICA en {states} por sismo en {region}"
-            severity = "Severe"
-            headline = f"ALERTA SISMICA por sismo Severo en {region}"
-            description = self._get_description(False, self._alert.region, self._alert.states)
-            response_type = "Execute"
-        else:
-            event = f"SASMEX: Sismo Moderado en {region}"
-            severity = "Unknown"
-            headline = f"Sismo Moderado en {region}"
-            description = self._get_description(True, self._alert.region, self._alert.states)
-            response_type = "Monitor"
+        document = self.document
+        event, severity, headline, description, response_type = self._get_event_info()
 
         text_tags = [
             ("language", "es-MX"),
@@ -245,8 +336,8 @@ class RSSFeed:
         self._add_event_code_tag(info, "SAME", "EQW")
 
         text_tags = [
-            ("effective", self._alert.time.isoformat(timespec="seconds") + "-06:00"),
-            ("expires", expire_date.isoformat(timespec="seconds") + "-06:00"),
+            ("effective", document.sent),
+            ("expires", document.expires),
             ("senderName", "SASMEX - CIRES"),
             ("headline", headline),
             ("description", description),
@@ -264,6 +355,14 @@ class RSSFeed:
         info.appendChild(area)
         return info
 
+    def _get_event_info(self) -> tuple[str, str, str, str, str]:
+        """ Returns the event, severity, headline, description and response type
+            of the info tag.
+        """
+        document = self.document
+        return (document.event, document.severity, document.headline,
+                document.description, document.response_type)
+
     def _create_area_tag(self) -> minidom.Element:
         """ Creates the area tag.
 
@@ -274,12 +373,7 @@ class RSSFeed:
             region of the earthquake.
         """
         area = self._root.createElement("area")
-        if self._alert.is_event:
-            area_desc = "Zona Probable Epicentro"
-        else:
-            area_desc = "Region de Alertamiento"
-
-        self._add_text_tag(area, "areaDesc", area_desc)
+        self._add_text_tag(area, "areaDesc", self._get_area_desc())
 
         if self._alert.is_event:
             self._circle_tag(area)
@@ -287,24 +381,20 @@ class RSSFeed:
             self._polygon_tags(area)
         return area
 
+    def _get_area_desc(self) -> str:
+        return self.document.area_desc
+
     def _get_title(self) -> str:
         """ Returns the title of the feed.
         """
-        title = format_datetime(self._alert.time, locale="es_MX")
-        region = REGIONS[self._alert.region]
-        if self._alert.is_event:
-            title += f" Sismo en {region}"
-        else:
-            title += f" Alerta en {self._get_states()} por sismo en {region}"
-        return title
+        return self.document.title
 
     def _get_states(self) -> str:
         """ Returns the states of the alert as a string with the
             following format:
                 state1/state2/.../stateN
         """
-        state_list = [STATES[s] for s in self._alert.states]
-        return "/".join(state_list)
+        return states_text(self._alert.states)
 
     def _polygon_tags(self, parent: minidom.Element) -> None:
         """ Add the polygons tags that describes the area of alerting.
@@ -313,25 +403,19 @@ class RSSFeed:
 
                 <polygon>lat1,lon1 lat2,lon2, lat3,lon3, lat4,lon4, lat5,lon5</polygon>
         """
-        polygons = []
-        # First the references of polygons if any
-        if self._refs is not None:
-            for ref in self._refs:
-                for state in ref.states:
-                    polygons.append(POLYGONS[STATES[state]])
-        polygons.extend(POLYGONS[STATES[st]] for st in self._alert.states)
-
-        for poly in polygons:
-            text = ""
-            for ii in range(len(poly.points) - 1):
-                point = poly.points[ii]
-                text += f"{point.lat:0.2f},{point.lon:0.2f} "
-
-            # Last point should not have space at the end
-            point = poly.points[-1]
-            text += f"{point.lat:0.2f},{point.lon:0.2f}"
+        for text in self._get_polygons():
             self._add_text_tag(parent, "polygon", text)
 
+    def _get_polygons(self) -> list[str]:
+        """ Returns the text of each polygon tag.
+
+            There is one polygon per state, or one polygon per group of
+            overlapping states if the feed uses outlines. States
+            that appear more than once in the references or the alert are
+            only added once.
+        """
+        return self.document.polygons
+
     def _circle_tag(self, parent: minidom.Element) -> None:
         """ Add a circle tag to describe the epicenter region of an earthquake.
 
@@ -339,38 +423,24 @@ class RSSFeed:
 
                 <circle>lat,lon radius</circle>
         """
-        coords = REGION_COORDS[self._alert.region]
-        text = f"{coords.lat:0.2f},{coords.lon:0.2f} 70.0"
-        self._add_text_tag(parent, "circle", text)
+        self._add_text_tag(parent, "circle", self._get_circle())
+
+    def _get_circle(self) -> str:
+        """ Returns the text of the circle tag.
+        """
+        return circle_text(self._alert.region)
 
     @staticmethod
-    def _get_description(is_event: bool, region: int, states: list[int]) -> str:
+    def _get_description(is_event: bool, region: int, states: tuple[int, ...]) -> str:
         """ Get the description string for the description tag
         """
-        region_name = REGIONS[region]
-        if is_event:
-            description = f"Sismo Moderado en {region_name}"
-        else:
-            description = f"Sismo Severo en {region_name}"
-
-        region_coords = REGION_COORDS[region]
-        if len(states) > 1:
-            for ii in range(len(states) - 1):
-                st = STATES[states[ii]]
-                distance = round(distance_between_points(STATES_COORDS[st], region_coords))
-                description += f", a {distance}km de {st}"
-            st = STATES[states[-1]]
-            distance = round(distance_between_points(STATES_COORDS[st], region_coords))
-            description += f" y a {distance}km de {st}"
-        else:
-            st = STATES[states[0]]
-            distance = round(distance_between_points(STATES_COORDS[st], region_coords))
-            description += f", a {distance}km de {st}"
-
-        return description
+        return description_text(is_event, region, states)
 
-    def build(self, indentation: str = '\t') -> None:
+    def build(self, indentation: str = '\t', compact: bool = False) -> None:
         """ Creates a string with the contents of the rss feed.
+
+            If compact is True, the feed is written without indentation
+            or newlines.
         """
         entry = self._create_header()
         self._create_entry_tag(entry)
@@ -380,18 +450,299 @@ class RSSFeed:
         alert_tag.appendChild(info_tag)
         entry.appendChild(content_tag)
 
-        self._content = self._root.toprettyxml(indent=indentation, encoding="UTF-8").decode()
+        # Same as toxml and toprettyxml, but the digest is computed while
+        # the document is written
+        stream = _DigestStream()
+        writer = io.TextIOWrapper(
+            stream, encoding="UTF-8", errors="xmlcharrefreplace", newline="\n")
+        if compact:
+            self._root.writexml(writer, encoding="UTF-8")
+        else:
+            self._root.writexml(writer, "", indentation, "\n", encoding="UTF-8")
+        writer.flush()
+        self._set_data(b"".join(stream.chunks), stream.sha256.hexdigest())
+
+    def write(self, filename: str) -> None:
+        """ Write the feed to a file.
+        """
+        with open(filename, "wb") as fp:
+            fp.write(self._data)
+
+
+class TemplateRSSFeed(RSSFeed):
+    """ RSS feed that is rendered from a precompiled template instead of
+        building a DOM tree.
+
+        The content is identical to the one produced by RSSFeed.
+    """
+
+    def build(self, indentation: str = '\t', compact: bool = False) -> None:
+        """ Creates a string with the contents of the rss feed.
+
+            If compact is True, the feed is written without indentation
+            or newlines.
+        """
+        content = atom_feed(self.document, self._updated_date, indentation, compact)
+        data = content.encode()
+        self._set_data(data, hashlib.sha256(data).hexdigest())
+        self._content = content
+
+    def build_entry(self, indentation: str = '\t', compact: bool = False) -> str:
+        """ Returns the 'entry' tag of the feed, indented as a child of the
+            'feed' tag.
+        """
+        return atom_entry(self.document, self._updated_date, indentation, compact)
+
+
+class RollingFeed:
+    """ Atom feed with the entries of the last alerts, newest first.
+
+        The entry of each alert is rendered once, when the alert is added.
+        Adding an alert prepends its entry and drops the oldest one, the
+        other entries are not rendered again.
+
+        The self link of the feed is the url of filename, the name of the file
+        where the feed is published.
+    """
+
+    def __init__(
+            self,
+            size: int = 10,
+            is_test: bool = False,
+            indentation: str = '\t',
+            compact: bool = False,
+            clock: Optional[Clock] = None,
+            deterministic: bool = False,
+            max_refs: Optional[int] = None,
+            outline: bool = False,
+            filename: str = "sasmex_rolling.xml",
+    ):
+        if size < 1:
+            raise ValueError("The size of a rolling feed must be at least 1")
+        self._entries = collections.deque(maxlen=size)  # type: collections.deque[str]
+        self._is_test = is_test
+        self._indentation = indentation
+        self._compact = compact
+        self._clock = clock
+        self._deterministic = deterministic
+        self._max_refs = max_refs
+        self._outline = outline
+        self._self_href = f"https://rss.sasmex.net/{filename}"
+        self._updated_date = updated_date(None, clock, deterministic)
+        self._data = None  # type: Optional[bytes]
+        self._digest = None  # type: Optional[str]
+        # Errors found by FEED_VALIDATOR in the entry of the last alert that
+        # was added. None if it was not validated
+        self.validation_errors = None  # type: Optional[list[str]]
+
+    @property
+    def size(self) -> int:
+        return self._entries.maxlen
+
+    @property
+    def updated_date(self) -> str:
+        return self._updated_date
+
+    @property
+    def self_href(self) -> str:
+        return self._self_href
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, alert: Alert, updated_date: Optional[str] = None) -> None:
+        """ Add an alert to the feed.
+
+            :param alert: The alert.
+            :param updated_date: The updated date of the alert entry and the
+                feed. Defaults to the time given by the clock of the feed, or
+                the time of the alert if the feed is deterministic.
+
+            The entry is validated by FEED_VALIDATOR according to its mode, the
+            errors are stored in the validation_errors attribute of the feed.
+        """
+        entry = TemplateRSSFeed(
+            alert, self._is_test, self._clock, self._deterministic, self._max_refs,
+            self._outline)
+        if updated_date is not None:
+            entry.updated_date = updated_date
+        text = entry.build_entry(self._indentation, self._compact)
+        self.validation_errors = FEED_VALIDATOR.check(text.encode())
+        self._entries.appendleft(text)
+        self._updated_date = entry.updated_date
+        self._data = None
+        self._digest = None
+
+    @property
+    def data(self) -> bytes:
+        """ The contents of the feed encoded as UTF-8. They are rendered the
+            first time they are requested after an alert is added.
+        """
+        if self._data is None:
+            self._data = self.content.encode()
+        return self._data
+
+    @property
+    def digest(self) -> str:
+        """ The SHA-256 of data as a hex string.
+        """
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.data).hexdigest()
+        return self._digest
+
+    @property
+    def content(self) -> str:
+        """ The contents of the feed.
+        """
+        if self._compact:
+            template = rolling_feed_template("", "")
+        else:
+            template = rolling_feed_template(self._indentation)
+        return template.render(
+            {"updated": self._updated_date, "self_href": self._self_href},
+            raw={"entries": "".join(self._entries)}
+        )
 
     def write(self, filename: str) -> None:
         """ Write the feed to a file.
         """
-        with open(filename, "w") as fp:
-            fp.write(self._content)
+        with open(filename, "wb") as fp:
+            fp.write(self.data)
+
+
+RENDERERS = {
+    "minidom": RSSFeed,
+    "template": TemplateRSSFeed,
+}  # type: dict[str, type[RSSFeed]]
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class FeedCache:
+    """ Bounded LRU cache of rendered feeds.
+
+        Feeds are keyed by the contents of the alert (see alert_key), so the
+        same alert is only rendered once while it stays in the cache.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        if maxsize < 0:
+            raise ValueError("maxsize must be a non negative integer")
+        self._maxsize = maxsize
+        self._feeds = collections.OrderedDict()  # type: collections.OrderedDict[Hashable, RSSFeed]
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, size: int) -> None:
+        if size < 0:
+            raise ValueError("maxsize must be a non negative integer")
+        with self._lock:
+            self._maxsize = size
+            self._evict()
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    def __len__(self) -> int:
+        return len(self._feeds)
+
+    def get(self, key: Hashable) -> Optional[RSSFeed]:
+        """ Returns the feed stored with the given key or None if it is
+            not in the cache.
+        """
+        with self._lock:
+            feed = self._feeds.get(key)
+            if feed is None:
+                self._misses += 1
+                return None
+            self._feeds.move_to_end(key)
+            self._hits += 1
+            return feed
+
+    def put(self, key: Hashable, feed: RSSFeed) -> None:
+        with self._lock:
+            self._feeds[key] = feed
+            self._feeds.move_to_end(key)
+            self._evict()
+
+    def _evict(self) -> None:
+        while len(self._feeds) > self._maxsize:
+            self._feeds.popitem(last=False)
+
+    def invalidate(self, alert: Alert) -> None:
+        """ Remove every cached feed of the given alert.
+        """
+        alert_part = alert_key(alert)
+        with self._lock:
+            for key in [k for k in self._feeds if k[0] == alert_part]:
+                del self._feeds[key]
+
+    def clear(self) -> None:
+        """ Remove all feeds and reset the hit and miss counters.
+        """
+        with self._lock:
+            self._feeds.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self._hits, self._misses, self._maxsize, len(self._feeds))
+
+
+def alert_key(alert: Alert) -> str:
+    """ Returns a canonical digest of the contents of an alert that are
+        written to its feed.
+
+        The references are represented by their id, date and states, so the
+        digest is computed without traversing the chain of references and
+        alerts built separately from the same data have the same digest.
+    """
+    refs = None
+    if alert.refs is not None:
+        refs = tuple((ref.id, ref.time.isoformat(), ref.states) for ref in alert.refs)
+    contents = (
+        alert.time.isoformat(),
+        alert.states,
+        alert.region,
+        alert.id,
+        alert.is_event,
+        refs,
+    )
+    return hashlib.sha256(repr(contents).encode()).hexdigest()
+
+
+FEED_CACHE = FeedCache()
+
+# Validation of rendered feeds against the CAP 1.1 schema. It is off by default
+FEED_VALIDATOR = FeedValidator()
 
 
 def create_feed(alert: Alert,
                 is_test: bool = False,
                 indentation: str = '\t',
+                renderer: Literal["minidom", "template"] = "minidom",
+                cache: bool = False,
+                compact: bool = False,
+                clock: Optional[Clock] = None,
+                deterministic: bool = False,
+                max_refs: Optional[int] = None,
+                outline: bool = False,
                 ) -> RSSFeed:
     """ Create and rss feed string.
 
@@ -406,11 +757,288 @@ def create_feed(alert: Alert,
         indentation : str, default='\t'
             The indentation to use in the feed file
 
+        renderer : {"minidom", "template"}, default="minidom"
+            How the feed is rendered. Both renderers produce the same output,
+            but "template" is considerably faster.
+
+        cache : bool, default=False
+            Whether to look up the feed in FEED_CACHE before rendering it. Feeds
+            that are rendered are stored in the cache. Cached feeds keep the
+            updated date of their first render.
+
+        compact : bool, default=False
+            Whether to write the feed without indentation or newlines. If True
+            the indentation is ignored.
+
+        clock : Clock, optional
+            Returns the updated date of the feed. Defaults to datetime.now.
+
+        deterministic : bool, default=False
+            Whether the updated date is the time of the alert. The same alert
+            then always produces the same feed, with the same digest. A
+            clock cannot be given for a deterministic feed.
+
+        max_refs : int, optional
+            Maximum number of references of an update that are written to
+            the feed, the last ones are kept. Bounds the size of the feeds of
+            long update chains. By default, all references are written.
+
+        outline : bool, default=False
+            Whether the area of an alert is the merged outline of its states,
+            one polygon per group of overlapping states, instead of one
+            polygon per state.
+
+        Rendered feeds are validated by FEED_VALIDATOR according to its mode,
+        the errors are stored in the validation_errors attribute of the feed.
+        Feeds taken from the cache are not validated again.
+
     """
-    rss_feed = RSSFeed(alert, is_test)
-    rss_feed.build(indentation)
+    try:
+        feed_class = RENDERERS[renderer]
+    except KeyError:
+        raise ValueError(f"Invalid renderer {renderer}")
+
+    key = None
+    if cache:
+        key = (
+            alert_key(alert), is_test, indentation, compact, clock, deterministic, max_refs,
+            outline,
+        )
+        rss_feed = FEED_CACHE.get(key)
+        if rss_feed is not None:
+            return rss_feed
+
+    rss_feed = feed_class(alert, is_test, clock, deterministic, max_refs, outline)
+    rss_feed.build(indentation, compact)
+    rss_feed.validation_errors = FEED_VALIDATOR.check(rss_feed.data)
+
+    if cache:
+        FEED_CACHE.put(key, rss_feed)
     return rss_feed
 
 
-def write_feed_to_file(filename: str, feed: RSSFeed):
-    feed.write(filename)
+def _render_feeds(
+        alerts: list[Alert],
+        is_test: bool,
+        indentation: str,
+        renderer: Literal["minidom", "template"],
+        deterministic: bool = False,
+        max_refs: Optional[int] = None,
+        outline: bool = False,
+) -> list[tuple[str, bytes]]:
+    """ Render a chunk of alerts. Runs in the worker processes of create_feeds.
+    """
+    feed_class = RENDERERS[renderer]
+    results = []
+    for alert in alerts:
+        feed = feed_class(
+            alert, is_test, deterministic=deterministic, max_refs=max_refs, outline=outline)
+        feed.build(indentation)
+        results.append((alert.id, feed.data))
+    return results
+
+
+def _validate_feeds(results: list[tuple[str, bytes]]) -> list[tuple[str, bytes]]:
+    for _, data in results:
+        FEED_VALIDATOR.check(data)
+    return results
+
+
+def create_feeds(
+        alerts: Iterable[Alert],
+        workers: Optional[int] = None,
+        is_test: bool = False,
+        indentation: str = '\t',
+        renderer: Literal["minidom", "template"] = "template",
+        chunksize: int = 64,
+        deterministic: bool = False,
+        max_refs: Optional[int] = None,
+        outline: bool = False,
+) -> Iterator[tuple[str, bytes]]:
+    """ Render the feeds of many alerts using a pool of processes.
+
+        The results are yielded as soon as each chunk of alerts is rendered,
+        so they may not be in the same order as the alerts. Alerts are consumed
+        lazily, at most two chunks per worker are in flight at any time.
+
+        Parameters
+        ----------
+        alerts : Iterable[Alert]
+            The alerts to render.
+
+        workers : int, optional
+            Number of worker processes. Defaults to the number of CPUs. If it
+            is 1, the feeds are rendered in the current process.
+
+        is_test : bool
+            Whether the created feeds are tests.
+
+        indentation : str, default='\t'
+            The indentation to use in the feed files.
+
+        renderer : {"minidom", "template"}, default="template"
+            How the feeds are rendered.
+
+        chunksize : int, default=64
+            Number of alerts sent to a worker at a time.
+
+        deterministic : bool, default=False
+            Whether the updated date of each feed is the time of its alert.
+
+        max_refs : int, optional
+            Maximum number of references written to each feed.
+
+        outline : bool, default=False
+            Whether the area of each alert is the merged outline of its states.
+
+        The feeds are validated in the current process by FEED_VALIDATOR,
+        according to its mode.
+
+        Yields
+        ------
+        tuple[str, bytes]
+            The id of the alert and the contents of its feed encoded as UTF-8.
+    """
+    if renderer not in RENDERERS:
+        raise ValueError(f"Invalid renderer {renderer}")
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    alerts = iter(alerts)
+    chunks = iter(lambda: list(itertools.islice(alerts, chunksize)), [])
+
+    if workers == 1:
+        for chunk in chunks:
+            yield from _validate_feeds(
+                _render_feeds(
+                    chunk, is_test, indentation, renderer, deterministic, max_refs, outline))
+        return
+
+    with futures.ProcessPoolExecutor(workers) as executor:
+        max_pending = workers * 2
+        pending = set()
+        for chunk in chunks:
+            pending.add(
+                executor.submit(
+                    _render_feeds, chunk, is_test, indentation, renderer,
+                    deterministic, max_refs, outline)
+            )
+            if len(pending) >= max_pending:
+                done, pending = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    yield from _validate_feeds(future.result())
+
+        for future in futures.as_completed(pending):
+            yield from _validate_feeds(future.result())
+
+
+class PublishedFeeds:
+    """ Remembers the digest of the last feed written to each file, so a
+        feed that did not change is not written again. Any name can be used
+        instead of a file name, for example the id of a posted alert.
+
+        Only the last maxsize files are remembered.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self._maxsize = maxsize
+        self._digests = collections.OrderedDict()  # type: collections.OrderedDict[str, str]
+        self._lock = threading.Lock()
+
+    def digest(self, filename: str) -> Optional[str]:
+        """ Returns the digest of the last feed written to a file, or None if
+            it is not known.
+        """
+        with self._lock:
+            return self._digests.get(filename)
+
+    def is_unchanged(self, filename: str, digest: str) -> bool:
+        """ Whether the last feed written to the file has the given digest.
+        """
+        return self.digest(filename) == digest
+
+    def update(self, filename: str, digest: str) -> None:
+        with self._lock:
+            self._digests[filename] = digest
+            self._digests.move_to_end(filename)
+            while len(self._digests) > self._maxsize:
+                self._digests.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._digests.clear()
+
+
+def write_feed_to_file(
+        filename: str,
+        feed: Union[RSSFeed, RollingFeed],
+        compress: Iterable[Literal["gzip", "brotli"]] = (),
+        atomic: bool = True,
+        durability: Durability = "none",
+        published: Optional[PublishedFeeds] = None,
+) -> bool:
+    """ Write the feed to a file.
+
+        By default, the feed is published atomically: it is written to a temporary
+        file that then replaces the target, so readers never see a partially
+        written feed. The durability policy controls what is flushed to disk
+        before returning (see rss.utils.atomic_write.write_atomic).
+
+        Optionally, write compressed copies of the feed next to it (filename.gz
+        and filename.br) so web servers can serve them directly, for example
+        with nginx's gzip_static. Brotli requires the brotli package.
+
+        If published is given, the feed is not written when the file already
+        has a feed with the same digest, and the digest is recorded otherwise.
+
+        :return: Whether the feed was written.
+    """
+    if published is not None and published.is_unchanged(filename, feed.digest):
+        return False
+
+    if atomic:
+        write_atomic(filename, feed.data, durability)
+    else:
+        feed.write(filename)
+
+    for method in compress:
+        write_compressed_feed(filename, feed, method, atomic, durability)
+
+    if published is not None:
+        published.update(filename, feed.digest)
+    return True
+
+
+def write_compressed_feed(
+        filename: str,
+        feed: Union[RSSFeed, RollingFeed],
+        method: Literal["gzip", "brotli"],
+        atomic: bool = True,
+        durability: Durability = "none",
+) -> str:
+    """ Write a compressed copy of the feed to filename.gz or filename.br.
+
+        :return: The path of the compressed file.
+    """
+    data = feed.data
+    if method == "gzip":
+        path = filename + ".gz"
+        # mtime is fixed so the same feed always produces the same file
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    elif method == "brotli":
+        try:
+            import brotli
+        except ImportError:
+            raise ValueError("brotli compression requires the brotli package")
+        path = filename + ".br"
+        compressed = brotli.compress(data, mode=brotli.MODE_TEXT)
+    else:
+        raise ValueError(f"Invalid compression method {method}")
+
+    if atomic:
+        write_atomic(path, compressed, durability)
+    else:
+        with open(path, "wb") as fp:
+            fp.write(compressed)
+    return path
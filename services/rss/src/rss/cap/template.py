@@ -0,0 +1,283 @@
+import dataclasses
+import functools
+from typing import Optional, Union
+
+
+@dataclasses.dataclass(frozen=True)
+class Field:
+    """ Placeholder for a text value that is escaped and inserted when
+        the template is rendered.
+    """
+    name: str
+
+
+@dataclasses.dataclass(frozen=True)
+class Block:
+    """ Placeholder for a variable number of text elements, for example,
+        the polygons of an area.
+    """
+    name: str
+
+
+@dataclasses.dataclass(frozen=True)
+class Raw:
+    """ Placeholder for markup that was already rendered, for example, the
+        entries of a feed. It is inserted as is.
+    """
+    name: str
+
+
+@dataclasses.dataclass(frozen=True)
+class Element:
+    """ An element of a template. The value of an attribute can be static
+        text or a field. The body can be static text, a field or a tuple with
+        child elements and blocks.
+    """
+    tag: str
+    attrs: tuple[tuple[str, Union[str, Field]], ...] = ()
+    body: Union[str, Field, tuple[Union["Element", Block, Raw], ...]] = ()
+
+
+def escape(text: str) -> str:
+    """ Escape text the same way as xml.dom.minidom does. """
+    return text.replace("&", "&amp;").replace("<", "&lt;"). \
+        replace("\"", "&quot;").replace(">", "&gt;")
+
+
+class Template:
+    """ A document template compiled for a given indentation and newline.
+
+        The output of render is identical to the one produced by
+        minidom's toprettyxml with the same indentation, newline and UTF-8
+        encoding. With an empty indentation and newline the output is the
+        same as minidom's toxml.
+
+        Templates of elements that are not the root of the document are compiled
+        with the depth of the element and without the xml declaration.
+    """
+
+    def __init__(
+            self,
+            root: Element,
+            indentation: str = "\t",
+            newline: str = "\n",
+            depth: int = 0,
+            declaration: bool = True,
+    ):
+        self._indentation = indentation
+        self._newline = newline
+        self._block_indents = {}  # type: dict[str, str]
+        lines = []
+        if declaration:
+            lines.append(f'<?xml version="1.0" encoding="UTF-8"?>{_escape_braces(newline)}')
+        self._compile(root, depth, lines)
+        self._source = "".join(lines)
+
+    @property
+    def source(self) -> str:
+        return self._source
+
+    def _compile(self, element: Element, depth: int, lines: list[str]) -> None:
+        # The indentation and newline are static text of the source, as the
+        # tags, so their braces are escaped
+        indent = _escape_braces(self._indentation * depth)
+        newline = _escape_braces(self._newline)
+        start = indent + "<" + element.tag
+        for name, value in element.attrs:
+            if isinstance(value, Field):
+                start += f' {name}="{{{value.name}}}"'
+            else:
+                start += f' {name}="{_escape_braces(escape(value))}"'
+
+        if isinstance(element.body, str):
+            text = _escape_braces(escape(element.body))
+            lines.append(f"{start}>{text}</{element.tag}>{newline}")
+        elif isinstance(element.body, Field):
+            lines.append(f"{start}>{{{element.body.name}}}</{element.tag}>{newline}")
+        elif len(element.body) == 0:
+            lines.append(f"{start}/>{newline}")
+        else:
+            lines.append(f"{start}>{newline}")
+            for child in element.body:
+                if isinstance(child, Block):
+                    self._block_indents[child.name] = self._indentation * (depth + 1)
+                    lines.append(f"{{{child.name}}}")
+                elif isinstance(child, Raw):
+                    lines.append(f"{{{child.name}}}")
+                else:
+                    self._compile(child, depth + 1, lines)
+            lines.append(f"{indent}</{element.tag}>{newline}")
+
+    def render(
+            self,
+            fields: dict[str, str],
+            blocks: Optional[dict[str, list[tuple[str, str]]]] = None,
+            raw: Optional[dict[str, str]] = None,
+    ) -> str:
+        """ Render the template.
+
+            :param fields: Map of field name to the text value of the field.
+            :param blocks: Map of block name to a list of (tag, text) tuples. Each
+                tuple is rendered as a text element.
+            :param raw: Map of raw placeholder name to already rendered markup.
+            :return: The rendered document.
+        """
+        values = {name: escape(text) for name, text in fields.items()}
+        if raw is not None:
+            values.update(raw)
+        if blocks is None:
+            blocks = {}
+        newline = self._newline
+        for name, elements in blocks.items():
+            indent = self._block_indents[name]
+            values[name] = "".join(
+                f"{indent}<{tag}>{escape(text)}</{tag}>{newline}" for tag, text in elements
+            )
+        return self._source.format_map(values)
+
+
+def _escape_braces(text: str) -> str:
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+CAP_1_1_NAMESPACE = "urn:oasis:names:tc:emergency:cap:1.1"
+CAP_1_2_NAMESPACE = "urn:oasis:names:tc:emergency:cap:1.2"
+
+
+def alert_element(namespace: str) -> Element:
+    """ Returns the template of a CAP alert with the given namespace.
+    """
+    return Element("alert", (("xmlns", namespace),), (
+        Element("identifier", body=Field("identifier")),
+        Element("sender", body=Field("sender")),
+        Element("sent", body=Field("sent")),
+        Element("status", body=Field("status")),
+        Element("msgType", body=Field("msg_type")),
+        Element("scope", body="Public"),
+        Block("references"),
+        Element("info", body=(
+            Element("language", body="es-MX"),
+            Element("category", body="Geo"),
+            Element("event", body=Field("event")),
+            Element("responseType", body=Field("response_type")),
+            Element("urgency", body="Immediate"),
+            Element("severity", body=Field("severity")),
+            Element("certainty", body="Observed"),
+            Element("eventCode", body=(
+                Element("valueName", body="SAME"),
+                Element("value", body="EQW"),
+            )),
+            Element("effective", body=Field("effective")),
+            Element("expires", body=Field("expires")),
+            Element("senderName", body="SASMEX - CIRES"),
+            Element("headline", body=Field("headline")),
+            Element("description", body=Field("description")),
+            Element("instruction", body="Realice procedimiento en caso de sismo"),
+            Element("web", body="https://rss.sasmex.net"),
+            Element("contact", body="infoCAP@cires-ac.mx"),
+            Element("parameter", body=(
+                Element("valueName", body="SAME"),
+                Element("value", body="CIV"),
+            )),
+            Element("parameter", body=(
+                Element("valueName", body="messageIdentifier"),
+                Element("value", body="4370"),
+            )),
+            Element("area", body=(
+                Element("areaDesc", body=Field("area_desc")),
+                Block("shapes"),
+            )),
+        )),
+    ))
+
+
+ENTRY_TEMPLATE = Element("entry", body=(
+    Element("id", body=Field("id")),
+    Element("updated", body=Field("updated")),
+    Element("title", body=Field("title")),
+    Element("author", body=(
+        Element("name", body="CIRES A.C."),
+    )),
+    Element("content", (("type", "text/xml"),), (
+        alert_element(CAP_1_1_NAMESPACE),
+    )),
+))
+
+# Standalone CAP 1.2 alert, without the Atom feed
+CAP_TEMPLATE = alert_element(CAP_1_2_NAMESPACE)
+
+
+FEED_ATTRS = (
+    ("xml:lang", "es-MX"),
+    ("xmlns:georss", "http://www.georss.org/georss"),
+    ("xmlns", "http://www.w3.org/2005/Atom"),
+)
+
+
+def header_template(self_href: Union[str, Field]) -> tuple[Element, ...]:
+    """ Returns the elements of the header of a feed whose self link is
+        the given url or field.
+    """
+    return (
+        Element("id", body="https://rss.sasmex.net"),
+        Element("link", (
+            ("type", "text/html"),
+            ("rel", "alternate"),
+            ("href", "https://rss.sasmex.net"),
+        )),
+        Element("link", (
+            ("type", "application/atom+xml"),
+            ("rel", "self"),
+            ("href", self_href),
+        )),
+        Element("title", body="SASMEX-CIRES RSS Feed"),
+        Element("subtitle", body="Sistema de Alerta Sismica Mexicano"),
+        Element("updated", body=Field("updated")),
+        Element("logo", body="https://rss.sasmex.net/ciresFeedLogo2b.png"),
+        Element("icon", body="https://rss.sasmex.net/ciresFeedFavicon.ico"),
+        Element("author", body=(
+            Element("name", body="CIRES A.C."),
+            Element("email", body="infoCAP@cires-ac.mx"),
+        )),
+    )
+
+
+FEED_TEMPLATE = Element(
+    "feed", FEED_ATTRS, header_template("https://rss.sasmex.net/sasmex.xml") + (ENTRY_TEMPLATE,))
+
+# Feed with multiple entries that were rendered separately. Its self link is
+# the url of the file where the feed is published
+ROLLING_FEED_TEMPLATE = Element(
+    "feed", FEED_ATTRS, header_template(Field("self_href")) + (Raw("entries"),))
+
+
+@functools.lru_cache(maxsize=8)
+def feed_template(indentation: str = "\t", newline: str = "\n") -> Template:
+    """ Returns the Atom + CAP 1.1 feed template compiled for the given
+        indentation and newline.
+    """
+    return Template(FEED_TEMPLATE, indentation, newline)
+
+
+@functools.lru_cache(maxsize=8)
+def entry_template(indentation: str = "\t", newline: str = "\n") -> Template:
+    """ Returns the template of a single feed entry compiled for the given
+        indentation and newline.
+    """
+    return Template(ENTRY_TEMPLATE, indentation, newline, depth=1, declaration=False)
+
+
+@functools.lru_cache(maxsize=8)
+def cap_template(indentation: str = "\t", newline: str = "\n") -> Template:
+    """ Returns the template of a standalone CAP 1.2 alert compiled for the
+        given indentation and newline.
+    """
+    return Template(CAP_TEMPLATE, indentation, newline)
+
+
+@functools.lru_cache(maxsize=8)
+def rolling_feed_template(indentation: str = "\t", newline: str = "\n") -> Template:
+    """ Returns the template of a feed whose entries are rendered with
+        entry_template, compiled for the given indentation and newline.
+    """
+    return Template(ROLLING_FEED_TEMPLATE, indentation, newline)
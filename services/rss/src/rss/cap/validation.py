@@ -0,0 +1,211 @@
+import collections
+import functools
+import os
+import threading
+import time
+from typing import Literal, NamedTuple, Optional
+
+CAP_NAMESPACE = "urn:oasis:names:tc:emergency:cap:1.1"
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "schemas", "CAP-v1.1.xsd")
+
+ValidationMode = Literal["every", "sample", "off"]
+VALIDATION_MODES = ("every", "sample", "off")
+
+# The schema is shared by the whole process and keeps the errors of its last
+# validation in its error log, so a validation and the read of its errors
+# must not be interleaved with another thread
+_SCHEMA_LOCK = threading.Lock()
+
+
+class InvalidCAPError(ValueError):
+    """ Raised when a feed does not contain valid CAP 1.1 alerts.
+    """
+
+    def __init__(self, errors: list[str]):
+        super().__init__("Invalid CAP alert: " + "; ".join(errors))
+        self.errors = errors
+
+
+@functools.cache
+def cap_schema():
+    """ Returns the CAP 1.1 schema. It is compiled the first time it is
+        requested and shared by the whole process.
+
+        Requires the lxml package.
+    """
+    try:
+        from lxml import etree
+    except ImportError:
+        raise ValueError("CAP validation requires the lxml package")
+    return etree.XMLSchema(etree.parse(SCHEMA_PATH))
+
+
+def validate_alerts(data: bytes) -> list[str]:
+    """ Validate the CAP alerts of a feed against the CAP 1.1 schema.
+
+        Only the <alert> elements are validated, the Atom elements that
+        contain them are not.
+
+        :param data: The feed, or a single entry, encoded as UTF-8.
+        :return: The validation errors. The list is empty if the alerts are valid.
+    """
+    from lxml import etree
+
+    schema = cap_schema()
+    try:
+        root = etree.fromstring(data)
+    except etree.XMLSyntaxError as err:
+        return [str(err)]
+
+    errors = []
+    alerts = list(root.iter(f"{{{CAP_NAMESPACE}}}alert"))
+    if not alerts:
+        return ["The feed has no CAP alert"]
+    for alert in alerts:
+        with _SCHEMA_LOCK:
+            if not schema.validate(alert):
+                errors.extend(
+                    f"line {err.line}: {err.message}" for err in schema.error_log
+                )
+    return errors
+
+
+class ValidationStats(NamedTuple):
+    validated: int
+    failed: int
+    skipped: int
+    total_time: float
+    max_time: float
+
+    @property
+    def mean_time(self) -> float:
+        if self.validated == 0:
+            return 0.
+        return self.total_time / self.validated
+
+
+class FeedValidator:
+    """ Validates rendered feeds against the CAP 1.1 schema.
+
+        The mode sets which feeds are validated: "every" feed, one out of each
+        sample_rate feeds ("sample") or none ("off"). The time spent validating
+        is recorded, see stats and timings.
+
+        If strict is True an InvalidCAPError is raised when a feed is not
+        valid, otherwise the errors are only returned.
+    """
+
+    def __init__(
+            self,
+            mode: ValidationMode = "off",
+            sample_rate: int = 100,
+            strict: bool = True,
+            max_timings: int = 1024,
+    ):
+        self._lock = threading.Lock()
+        self._mode = "off"  # type: ValidationMode
+        self._sample_rate = 1
+        self.configure(mode, sample_rate, strict)
+        self._count = 0
+        self._validated = 0
+        self._failed = 0
+        self._skipped = 0
+        self._total_time = 0.
+        self._max_time = 0.
+        self._timings = collections.deque(maxlen=max_timings)  # type: collections.deque[float]
+
+    def configure(
+            self,
+            mode: ValidationMode,
+            sample_rate: Optional[int] = None,
+            strict: Optional[bool] = None,
+    ) -> None:
+        """ Change the mode, the sample rate or whether invalid feeds raise an error.
+        """
+        if mode not in VALIDATION_MODES:
+            raise ValueError(f"Invalid validation mode {mode}")
+        if sample_rate is not None:
+            if sample_rate < 1:
+                raise ValueError("The sample rate must be at least 1")
+            self._sample_rate = sample_rate
+        if strict is not None:
+            self.strict = strict
+        self._mode = mode
+
+    @property
+    def mode(self) -> ValidationMode:
+        return self._mode
+
+    @property
+    def sample_rate(self) -> int:
+        return self._sample_rate
+
+    def _should_validate(self) -> bool:
+        if self._mode == "off":
+            return False
+        if self._mode == "every":
+            return True
+        # The first feed is always validated, then one out of each sample_rate
+        with self._lock:
+            validate = self._count % self._sample_rate == 0
+            self._count += 1
+            return validate
+
+    def check(self, data: bytes) -> Optional[list[str]]:
+        """ Validate the feed if the mode selects it.
+
+            :return: None if the feed was not validated, otherwise the
+                validation errors.
+            :raises InvalidCAPError: If strict and the feed is not valid.
+        """
+        if not self._should_validate():
+            with self._lock:
+                self._skipped += 1
+            return None
+        return self.validate(data)
+
+    def validate(self, data: bytes) -> list[str]:
+        """ Validate the feed regardless of the mode.
+
+            :return: The validation errors.
+            :raises InvalidCAPError: If strict and the feed is not valid.
+        """
+        start = time.perf_counter()
+        errors = validate_alerts(data)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self._validated += 1
+            self._failed += bool(errors)
+            self._total_time += elapsed
+            self._max_time = max(self._max_time, elapsed)
+            self._timings.append(elapsed)
+
+        if errors and self.strict:
+            raise InvalidCAPError(errors)
+        return errors
+
+    def stats(self) -> ValidationStats:
+        with self._lock:
+            return ValidationStats(
+                self._validated, self._failed, self._skipped,
+                self._total_time, self._max_time
+            )
+
+    def timings(self) -> list[float]:
+        """ Returns the duration in seconds of the last validations, oldest first.
+        """
+        with self._lock:
+            return list(self._timings)
+
+    def reset(self) -> None:
+        """ Reset the statistics and the timings.
+        """
+        with self._lock:
+            self._count = 0
+            self._validated = 0
+            self._failed = 0
+            self._skipped = 0
+            self._total_time = 0.
+            self._max_time = 0.
+            self._timings.clear()
@@ -0,0 +1,74 @@
+import os
+import uuid
+from typing import Literal
+
+Durability = Literal["none", "fdatasync", "fsync"]
+
+DURABILITY_POLICIES = ("none", "fdatasync", "fsync")
+
+
+def write_atomic(path: str, data: bytes, durability: Durability = "none") -> None:
+    """ Write data to a file so readers only ever see the old or the new
+        contents of the file, never a partially written one.
+
+        The data is written to a temporary file in the same directory, which
+        then replaces the target file with os.replace.
+
+        :param path: The path of the file.
+        :param data: The contents of the file.
+        :param durability: What is flushed to disk before returning.
+            - none: nothing. The file is complete for readers, but may be lost
+              if the machine crashes. This is the fastest option.
+            - fdatasync: the contents of the temporary file are flushed before
+              it replaces the target.
+            - fsync: the temporary file is flushed with fsync, and the directory
+              is also flushed after the replacement, so the rename itself is
+              durable.
+    """
+    if durability not in DURABILITY_POLICIES:
+        raise ValueError(f"Invalid durability policy {durability}")
+
+    directory, name = os.path.split(os.path.abspath(path))
+    tmp_path = os.path.join(directory, f".{name}.{uuid.uuid4().hex}.tmp")
+
+    # os.open respects the umask, unlike tempfile, which creates files that
+    # only the owner can read
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(data)
+            fp.flush()
+            if durability == "fdatasync":
+                _fdatasync(fp.fileno())
+            elif durability == "fsync":
+                os.fsync(fp.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    if durability == "fsync":
+        _fsync_directory(directory)
+
+
+def _fdatasync(fd: int) -> None:
+    # fdatasync is not available in every platform (e.g. macOS)
+    if hasattr(os, "fdatasync"):
+        os.fdatasync(fd)
+    else:
+        os.fsync(fd)
+
+
+def _fsync_directory(directory: str) -> None:
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        # Directories cannot be opened in some platforms (e.g. Windows)
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -1,5 +1,10 @@
+import copy
+import dataclasses
 import datetime
+import pickle
+import pytest
 
+from rss.cap import rss
 from rss.cap.alert import Alert
 
 
@@ -22,3 +27,97 @@ def test_from_json():
     )
     alert = Alert.from_json(alert_json)
     assert alert == expected
+
+
+def update_chain(length: int) -> Alert:
+    """ An alert followed by length updates, each one referencing the previous one.
+    """
+    date = datetime.datetime(2023, 9, 13, 15, 36, 41)
+    alert = Alert(time=date, states=[40], region=42201, id="ALERT0")
+    for ii in range(1, length + 1):
+        alert = Alert(time=date + datetime.timedelta(seconds=ii), states=[40 + ii % 3],
+                      region=42201, id=f"ALERT{ii}", refs=[alert])
+    return alert
+
+
+class TestImmutableAlert:
+
+    @staticmethod
+    def sample_alert() -> Alert:
+        date = datetime.datetime(2023, 9, 13, 15, 36, 41)
+        ref = Alert(time=date, states=[40], region=40101, id="REF")
+        return Alert(time=date, states=[41, 42], region=40101, id="ALERT", refs=[ref])
+
+    def test_lists_are_converted_to_tuples(self):
+        alert = self.sample_alert()
+        assert alert.states == (41, 42)
+        assert isinstance(alert.refs, tuple)
+        assert alert.refs[0].states == (40,)
+
+    def test_cannot_be_modified(self):
+        alert = self.sample_alert()
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            alert.id = "OTHER"
+        assert not hasattr(alert, "__dict__")
+
+    def test_equal_alerts_have_the_same_hash(self):
+        alert1 = self.sample_alert()
+        alert2 = self.sample_alert()
+        assert alert1 is not alert2
+        assert alert1 == alert2
+        assert hash(alert1) == hash(alert2)
+        assert len({alert1, alert2, alert1.refs[0]}) == 2
+
+    def test_copies_are_the_same_alert(self):
+        alert = self.sample_alert()
+        assert copy.copy(alert) is alert
+        assert copy.deepcopy(alert) is alert
+
+    def test_references_are_shared(self):
+        alert = self.sample_alert()
+        update = Alert(time=alert.time, states=[43], region=40101,
+                       id="UPDATE", refs=alert.refs + (alert,))
+        assert update.refs[0] is alert.refs[0]
+        assert update.refs[1] is alert
+
+    def test_receive_time_is_not_part_of_the_alert(self):
+        alert = self.sample_alert()
+        received = Alert(alert.time, alert.states, alert.region, alert.id, refs=alert.refs,
+                         received=12.5)
+        assert received.received == 12.5
+        assert received == alert
+        assert hash(received) == hash(alert)
+        assert pickle.loads(pickle.dumps(received)).received is None
+
+    def test_pickle(self):
+        alert = self.sample_alert()
+        unpickled = pickle.loads(pickle.dumps(alert))
+        assert unpickled == alert
+        assert hash(unpickled) == hash(alert)
+
+    def test_shared_references_are_pickled_once(self):
+        alert = self.sample_alert()
+        update = Alert(time=alert.time, states=[43], region=40101,
+                       id="UPDATE", refs=alert.refs + (alert,))
+        unpickled = pickle.loads(pickle.dumps(update))
+        assert unpickled == update
+        assert unpickled.refs[0] is unpickled.refs[1].refs[0]
+
+
+class TestLongUpdateChains:
+
+    def test_equality(self):
+        assert update_chain(1000) == update_chain(1000)
+        assert update_chain(1000) != update_chain(999)
+
+    def test_pickle(self):
+        chain = update_chain(1000)
+        unpickled = pickle.loads(pickle.dumps(chain))
+        assert unpickled == chain
+        assert hash(unpickled) == hash(chain)
+
+    def test_cached_feed(self):
+        rss.FEED_CACHE.clear()
+        feed = rss.create_feed(update_chain(1000), cache=True)
+        assert rss.create_feed(update_chain(1000), cache=True) is feed
+        rss.FEED_CACHE.clear()
@@ -0,0 +1,155 @@
+import datetime
+import json
+import pytest
+
+from rss.cap.alert import Alert
+from rss.cap.codec import (
+    InvalidAlertError,
+    alert_from_json,
+    alert_to_json,
+    decode_alert,
+    encode_alert,
+    reference_ids,
+)
+
+
+def sample_update() -> Alert:
+    date = datetime.datetime(2023, 3, 13, 16, 7, 5)
+    ref1 = Alert(time=date, states=[40], region=42201, id="REF1")
+    ref2 = Alert(time=date, states=[41], region=42201, id="REF2", refs=[ref1])
+    return Alert(time=date, states=[42, 43], region=42201, id="UPDATE", refs=[ref1, ref2])
+
+
+def alert_json(**fields) -> dict:
+    obj = {
+        "time": "2023-03-13T16:07:05",
+        "states": [40, 41],
+        "region": 42201,
+        "is_event": False,
+        "id": "ALERT",
+        "references": [],
+    }
+    obj.update(fields)
+    return obj
+
+
+class TestEncode:
+
+    def test_encode_with_reference_ids(self):
+        data = encode_alert(sample_update())
+        assert json.loads(data) == {
+            "time": "2023-03-13T16:07:05",
+            "states": [42, 43],
+            "region": 42201,
+            "is_event": False,
+            "id": "UPDATE",
+            "references": ["REF1", "REF2"],
+        }
+
+    def test_encode_nested_references(self):
+        update = sample_update()
+        obj = json.loads(encode_alert(update, nested_refs=True))
+        assert obj["references"][1]["references"][0]["id"] == "REF1"
+        assert obj == alert_to_json(update, nested_refs=True)
+
+    def test_encode_matches_json_module(self):
+        alert = Alert(time=datetime.datetime(2023, 3, 13, 16, 7, 5, 123),
+                      states=[40], region=42201, id='ID "ñ"', is_event=True)
+        assert json.loads(encode_alert(alert)) == alert_to_json(alert)
+        assert json.loads(encode_alert(alert))["time"] == "2023-03-13T16:07:05"
+
+    def test_encode_invalid_alert(self):
+        alert = Alert(time=datetime.datetime.now(), states=["40"], region=42201)
+        with pytest.raises(InvalidAlertError):
+            encode_alert(alert)
+
+    def test_invalid_alert_equal_to_an_encoded_one(self):
+        date = datetime.datetime(2023, 3, 13, 16, 7, 5)
+        encode_alert(Alert(time=date, states=[1], region=1, id="ALERT"))
+        encode_alert(Alert(time=date, states=[40], region=1, id="REF"), nested_refs=True)
+
+        invalid = Alert(time=date, states=[True], region=True, id="ALERT")
+        assert invalid == Alert(time=date, states=[1], region=1, id="ALERT")
+        with pytest.raises(InvalidAlertError):
+            encode_alert(invalid)
+        with pytest.raises(InvalidAlertError):
+            alert_to_json(invalid)
+
+        ref = Alert(time=date, states=[40.0], region=1, id="REF")
+        update = Alert(time=date, states=[41], region=1, id="UPDATE", refs=[ref])
+        with pytest.raises(InvalidAlertError):
+            encode_alert(update, nested_refs=True)
+
+
+class TestDecode:
+
+    def test_round_trip_with_nested_references(self):
+        update = sample_update()
+        decoded = decode_alert(encode_alert(update, nested_refs=True))
+        assert decoded == update
+        # Repeated references are decoded as the same alert
+        assert decoded.refs[1].refs[0] is decoded.refs[0]
+
+    def test_reference_ids_are_ignored(self):
+        decoded = decode_alert(encode_alert(sample_update()))
+        assert decoded.refs is None
+        assert decoded.states == (42, 43)
+
+    def test_decode_str(self):
+        alert = decode_alert(json.dumps(alert_json()))
+        assert alert.id == "ALERT"
+        assert alert.time == datetime.datetime(2023, 3, 13, 16, 7, 5)
+
+    def test_references_are_optional(self):
+        obj = alert_json()
+        del obj["references"]
+        assert decode_alert(json.dumps(obj)).refs is None
+
+    @pytest.mark.parametrize("obj", [
+        alert_json(states=["40"]),
+        alert_json(states=40),
+        alert_json(region="42201"),
+        alert_json(is_event=0),
+        alert_json(id=1),
+        alert_json(time="13/03/2023"),
+        alert_json(references=[1]),
+        alert_json(references=[{"id": "REF"}]),
+        {"time": "2023-03-13T16:07:05", "states": [40]},
+        [],
+    ])
+    def test_invalid_alerts(self, obj):
+        with pytest.raises(InvalidAlertError):
+            decode_alert(json.dumps(obj).encode())
+        with pytest.raises(InvalidAlertError):
+            alert_from_json(obj)
+
+    @pytest.mark.parametrize("fields", [
+        {"extra": 1},
+        {"source": {"name": "cap-gen"}},
+        {"tags": [{"name": "test"}]},
+    ])
+    def test_unknown_fields_are_ignored(self, fields):
+        obj = alert_json(**fields)
+        expected = Alert(datetime.datetime(2023, 3, 13, 16, 7, 5), [40, 41], 42201, "ALERT")
+        assert decode_alert(json.dumps(obj).encode()) == expected
+        assert alert_from_json(obj) == expected
+        assert Alert.from_json(obj) == expected
+
+    def test_missing_fields(self):
+        with pytest.raises(InvalidAlertError, match="Missing alert fields: region, is_event, id"):
+            decode_alert(b'{"time": "2023-03-13T16:07:05", "states": [40]}')
+
+    def test_invalid_json(self):
+        with pytest.raises(InvalidAlertError):
+            decode_alert(b'{"time": ')
+
+    def test_alert_from_json_with_nested_references(self):
+        update = sample_update()
+        obj = alert_to_json(update, nested_refs=True)
+        assert alert_from_json(obj) == update
+        assert Alert.from_json(obj) == update
+
+    def test_reference_ids(self):
+        assert reference_ids(alert_json(references=["A", "B"])) == ["A", "B"]
+        nested = alert_to_json(sample_update(), nested_refs=True)
+        assert reference_ids(nested) == ["REF1", "REF2"]
@@ -0,0 +1,40 @@
+import datetime
+import subprocess
+import sys
+
+from babel.dates import format_datetime as babel_format_datetime
+import pytest
+
+from rss.cap.dates import format_datetime, format_datetime_es_mx
+
+
+class TestFormatDatetime:
+
+    @pytest.mark.parametrize("month", range(1, 13))
+    def test_same_as_babel(self, month):
+        dates = [
+            datetime.datetime(2023, month, 1, 0, 0, 0),
+            datetime.datetime(2023, month, 9, 3, 7, 5, 123456),
+            datetime.datetime(1999, month, 28, 23, 59, 59),
+        ]
+        for date in dates:
+            assert format_datetime_es_mx(date) == babel_format_datetime(date, locale="es_MX")
+
+    def test_medium_es_mx_format(self):
+        date = datetime.datetime(2023, 3, 13, 16, 7, 5)
+        assert format_datetime(date) == "13 mar 2023 16:07:05"
+
+    def test_other_formats_fall_back_to_babel(self):
+        date = datetime.datetime(2023, 9, 13, 16, 7, 5)
+        expected = babel_format_datetime(date, format="short", locale="en_US")
+        assert format_datetime(date, format="short", locale="en_US") == expected
+
+    def test_rendering_a_feed_does_not_import_babel(self):
+        code = (
+            "import datetime, sys\n"
+            "from rss.cap.alert import Alert\n"
+            "from rss.cap.rss import create_feed\n"
+            "create_feed(Alert(datetime.datetime.now(), [40], 42201, 'ID'))\n"
+            "assert 'babel' not in sys.modules\n"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
@@ -0,0 +1,189 @@
+from datetime import datetime
+import json
+from bs4 import BeautifulSoup
+import pytest
+
+from rss.cap import formats, rss
+from rss.cap.alert import Alert
+from rss.cap.document import alert_document, build_document
+from rss.cap.validation import validate_alerts
+
+UPDATED = "2023-05-15T12:00:00"
+
+
+def sample_alerts() -> dict[str, Alert]:
+    date = datetime(year=2023, month=3, day=13, hour=16, minute=7, second=5)
+    refs = [
+        Alert(time=date, states=[40], region=42201, id="REF_ID_1"),
+        Alert(time=date, states=[41], region=42201, id="REF_ID_2"),
+    ]
+    return {
+        "alert": Alert(time=date, states=[40, 41], region=42201, id="ALERT"),
+        "update": Alert(time=date, states=[42], region=42201, id="UPDATE", refs=refs),
+        "event": Alert(time=date, states=[40], region=42201, id="EVENT", is_event=True),
+    }
+
+
+class TestAlertDocument:
+
+    def test_document_is_cached(self):
+        alert = sample_alerts()["alert"]
+        assert alert_document(alert) is alert_document(alert)
+        assert alert_document(alert, True) is not alert_document(alert)
+
+    def test_update_document(self):
+        document = alert_document(sample_alerts()["update"], is_test=True)
+        assert document.status == "Test"
+        assert document.msg_type == "Update"
+        assert document.references == (
+            "cires.org.mx,CIRES_REF_ID_1,2023-03-13T16:07:05-06:00",
+            "cires.org.mx,CIRES_REF_ID_2,2023-03-13T16:07:05-06:00",
+        )
+        assert document.area_states == (40, 41, 42)
+        assert document.circle is None
+
+    def test_event_document(self):
+        document = alert_document(sample_alerts()["event"])
+        assert document.severity == "Unknown"
+        assert document.area_states == ()
+        assert document.circle == "16.31,-98.44 70.0"
+
+    @staticmethod
+    def update_chain(n_refs: int) -> Alert:
+        date = datetime(year=2023, month=3, day=13, hour=16, minute=7, second=5)
+        refs = [
+            Alert(time=date, states=[40 + ii % 10], region=42201, id=f"REF{ii}")
+            for ii in range(n_refs)
+        ]
+        return Alert(time=date, states=[41], region=42201, id="UPDATE", refs=refs)
+
+    def test_long_update_chain(self):
+        document = alert_document(self.update_chain(1000))
+        assert len(document.references) == 1000
+        assert document.references[-1].startswith("cires.org.mx,CIRES_REF999,")
+        assert document.area_states == tuple(range(40, 50))
+
+    def test_limit_references(self):
+        alert = self.update_chain(1000)
+        document = alert_document(alert, max_refs=3)
+        assert [ref.split(",")[1] for ref in document.references] == [
+            "CIRES_REF997", "CIRES_REF998", "CIRES_REF999"
+        ]
+        # The area still has the states of every reference
+        assert document.area_states == tuple(range(40, 50))
+        assert len(alert_document(alert, max_refs=2000).references) == 1000
+
+    def test_invalid_reference_limit(self):
+        with pytest.raises(ValueError):
+            alert_document(sample_alerts()["update"], max_refs=0)
+
+    def test_outline(self):
+        alert = sample_alerts()["update"]
+        document = alert_document(alert, outline=True)
+        assert document.area_mask == 0b111
+        # CDMX does not overlap Guerrero and Oaxaca
+        assert len(document.polygons) == 2
+        assert document.polygons != alert_document(alert).polygons
+        assert alert_document(alert, outline=True) is document
+        # Events do not have polygons
+        assert alert_document(sample_alerts()["event"], outline=True).polygons == []
+
+    def test_feed_uses_document(self):
+        alert = sample_alerts()["alert"]
+        feed = rss.TemplateRSSFeed(alert)
+        assert feed.document is alert_document(alert)
+
+
+class TestSerializers:
+
+    @pytest.mark.parametrize("name", ["alert", "update", "event"])
+    def test_atom_is_identical_to_feed(self, name):
+        alert = sample_alerts()[name]
+        feed = rss.RSSFeed(alert)
+        feed.updated_date = UPDATED
+        feed.build()
+        assert formats.render(alert, updated=UPDATED)["atom"] == feed.data
+
+    @pytest.mark.parametrize("name", ["alert", "update", "event"])
+    def test_cap_alert(self, name):
+        alert = sample_alerts()[name]
+        data = formats.render(alert, ["cap"])["cap"]
+        cap = BeautifulSoup(data, "xml").alert
+        assert cap["xmlns"] == "urn:oasis:names:tc:emergency:cap:1.2"
+        assert cap.identifier.string == "CIRES" + alert.id
+
+        # Apart from the namespace, the alert is the same as the one of the feed
+        feed_data = formats.render(alert, updated=UPDATED, compact=True)["atom"]
+        cap_data = formats.render(alert, ["cap"], compact=True)["cap"]
+        cap_1_1 = cap_data.replace(b"cap:1.2", b"cap:1.1").split(b"?>", 1)[1]
+        assert cap_1_1 in feed_data
+        assert validate_alerts(feed_data) == []
+
+    def test_json_feed(self):
+        alert = sample_alerts()["update"]
+        feed = json.loads(formats.render(alert, ["json"], updated=UPDATED)["json"])
+        assert feed["version"] == "https://jsonfeed.org/version/1.1"
+        item = feed["items"][0]
+        assert item["id"] == "UPDATE"
+        assert item["date_modified"] == UPDATED
+        assert item["content_text"] == alert_document(alert).description
+        assert item["_cap"]["msgType"] == "Update"
+        assert len(item["_cap"]["references"]) == 2
+
+    def test_geojson_alert(self):
+        alert = sample_alerts()["update"]
+        feature = json.loads(formats.render(alert, ["geojson"])["geojson"])
+        assert feature["type"] == "Feature"
+        geometry = feature["geometry"]
+        assert geometry["type"] == "MultiPolygon"
+        assert len(geometry["coordinates"]) == 3
+        ring = geometry["coordinates"][0][0]
+        assert ring[0] == [-98.95, 19.15]
+        assert ring[0] == ring[-1]
+
+    def test_geojson_outline(self):
+        date = datetime(year=2023, month=3, day=13, hour=16, minute=7, second=5)
+        alert = Alert(time=date, states=[41, 42], region=42201, id="ALERT")
+        feature = json.loads(formats.render(alert, ["geojson"], outline=True)["geojson"])
+        geometry = feature["geometry"]
+        assert geometry["type"] == "Polygon"
+        assert len(geometry["coordinates"]) == 1
+        ring = geometry["coordinates"][0]
+        assert ring[0] == ring[-1]
+
+    def test_geojson_outline_of_separate_states(self):
+        alert = sample_alerts()["update"]
+        feature = json.loads(formats.render(alert, ["geojson"], outline=True)["geojson"])
+        geometry = feature["geometry"]
+        assert geometry["type"] == "MultiPolygon"
+        assert len(geometry["coordinates"]) == 2
+
+    @pytest.mark.parametrize("renderer", ["minidom", "template"])
+    def test_outline_feed(self, renderer):
+        alert = sample_alerts()["update"]
+        data = rss.create_feed(alert, renderer=renderer, outline=True).data
+        assert data.count(b"<polygon>") == 2
+        assert len(data) < len(rss.create_feed(alert, renderer=renderer).data)
+        assert validate_alerts(data) == []
+
+    def test_geojson_event(self):
+        feature = json.loads(formats.render(sample_alerts()["event"], ["geojson"])["geojson"])
+        assert feature["geometry"] == {"type": "Point", "coordinates": [-98.44, 16.31]}
+        assert feature["properties"]["radius"] == 70.0
+
+    def test_compact_json(self):
+        data = formats.render(sample_alerts()["alert"], ["json"], compact=True)["json"]
+        assert b"\n" not in data
+        assert json.loads(data)["items"][0]["id"] == "ALERT"
+
+    def test_several_formats_build_one_document(self):
+        date = datetime(year=2023, month=4, day=1, hour=10)
+        alert = Alert(time=date, states=[43], region=42201, id="FORMATS")
+        misses = build_document.cache_info().misses
+        outputs = formats.render(alert, formats.SERIALIZERS)
+        assert set(outputs) == {"atom", "cap", "json", "geojson"}
+        assert build_document.cache_info().misses == misses + 1
+
+    def test_invalid_format(self):
+        with pytest.raises(ValueError, match="Invalid format"):
+            formats.render(sample_alerts()["alert"], ["rss2"])
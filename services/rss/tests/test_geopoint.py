@@ -0,0 +1,56 @@
+import math
+
+import numpy as np
+
+from rss.cap.geopoint import (
+    GeoPoint,
+    distance_matrix,
+    haversine_distances,
+    points_to_arrays,
+)
+
+
+def haversine(point1: GeoPoint, point2: GeoPoint) -> float:
+    lat1, lon1 = math.radians(point1.lat), math.radians(point1.lon)
+    lat2, lon2 = math.radians(point2.lat), math.radians(point2.lon)
+    sep = math.sin((lat2 - lat1) / 2) ** 2 + \
+        math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 6371 * 2 * math.atan2(math.sqrt(sep), math.sqrt(1 - sep))
+
+
+class TestBatchDistances:
+
+    points1 = [
+        GeoPoint(lat=19.42847, lon=-99.12766),
+        GeoPoint(lat=17.4392, lon=-99.5451),
+        GeoPoint(lat=16.7569, lon=-93.1292),
+    ]
+    points2 = [
+        GeoPoint(lat=16.30636, lon=-98.44299),
+        GeoPoint(lat=20.62926, lon=-103.33643),
+    ]
+
+    def test_points_to_arrays(self):
+        lat, lon = points_to_arrays(self.points2)
+        np.testing.assert_array_equal(lat, [16.30636, 20.62926])
+        np.testing.assert_array_equal(lon, [-98.44299, -103.33643])
+
+    def test_haversine_distances_of_point_arrays(self):
+        lat1, lon1 = points_to_arrays(self.points1[:2])
+        lat2, lon2 = points_to_arrays(self.points2)
+        distances = haversine_distances(lat1, lon1, lat2, lon2)
+
+        assert distances.shape == (2,)
+        for ii in range(2):
+            assert math.isclose(distances[ii], haversine(self.points1[ii], self.points2[ii]))
+
+    def test_distance_to_same_point_is_zero(self):
+        lat, lon = points_to_arrays(self.points1)
+        np.testing.assert_allclose(haversine_distances(lat, lon, lat, lon), 0)
+
+    def test_distance_matrix(self):
+        matrix = distance_matrix(self.points1, self.points2)
+        assert matrix.shape == (3, 2)
+        for ii, p1 in enumerate(self.points1):
+            for jj, p2 in enumerate(self.points2):
+                assert math.isclose(matrix[ii, jj], haversine(p1, p2))
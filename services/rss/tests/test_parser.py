@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+import io
+import pytest
+
+from rss.cap import formats, rss
+from rss.cap.alert import Alert
+from rss.cap.parser import (
+    InvalidFeedError,
+    iter_alerts,
+    link_references,
+    parse_alerts,
+    parse_description,
+    parse_directory,
+)
+
+DATE = datetime(year=2023, month=3, day=13, hour=16, minute=7, second=5)
+
+
+def update_chain() -> list[Alert]:
+    first = Alert(time=DATE, states=[40], region=42201, id="FIRST")
+    second = Alert(
+        time=DATE + timedelta(seconds=30), states=[41], region=42201, id="SECOND",
+        refs=[first],
+    )
+    third = Alert(
+        time=DATE + timedelta(seconds=60), states=[42, 40], region=42201, id="THIRD",
+        refs=[first, second],
+    )
+    return [first, second, third]
+
+
+class TestParseAlerts:
+
+    @pytest.mark.parametrize("alert", [
+        Alert(time=DATE, states=[40, 41], region=42201, id="ALERT"),
+        Alert(time=DATE, states=[43], region=45201, id="EVENT", is_event=True),
+        # Petatlan Gro is the name of more than one region
+        Alert(time=DATE, states=[41, 40], region=41202, id="SAME_NAME"),
+        Alert(time=DATE, states=[41], region=41202, id="SAME_NAME", is_event=True),
+    ])
+    @pytest.mark.parametrize("fmt", ["atom", "cap"])
+    def test_round_trip(self, alert, fmt):
+        data = formats.render(alert, [fmt])[fmt]
+        assert parse_alerts(data) == [alert]
+
+    def test_minidom_feed(self):
+        alert = Alert(time=DATE, states=[44, 45, 46], region=42201, id="MINIDOM")
+        assert parse_alerts(rss.create_feed(alert, renderer="minidom").data) == [alert]
+
+    def test_references(self):
+        third = update_chain()[-1]
+        parsed = parse_alerts(rss.create_feed(third).data)[0]
+        assert [(ref.id, ref.time) for ref in parsed.refs] == [
+            ("FIRST", DATE), ("SECOND", DATE + timedelta(seconds=30))
+        ]
+        assert parsed.states == (42, 40)
+
+    def test_rolling_feed(self):
+        feed = rss.RollingFeed(size=5)
+        alerts = update_chain()
+        for alert in alerts:
+            feed.add(alert)
+        parsed = list(iter_alerts(io.BytesIO(feed.data)))
+        # The newest entry is first
+        assert [a.id for a in parsed] == ["THIRD", "SECOND", "FIRST"]
+
+    def test_link_references(self):
+        alerts = update_chain()
+        parsed = []
+        for alert in reversed(alerts):
+            parsed.extend(parse_alerts(rss.create_feed(alert).data))
+        # Repeated alerts are returned once
+        parsed.append(parsed[0])
+        assert link_references(parsed) == alerts
+
+    def test_description(self):
+        assert parse_description(
+            "Sismo Severo en Costa Oax-Gro, a 280km de CDMX y a 12km de Guerrero"
+        ) == ("Costa Oax-Gro", ((40, 280), (41, 12)))
+
+    @pytest.mark.parametrize("data", [
+        b"",
+        b"<feed><entry>",
+        b"<alert xmlns='urn:oasis:names:tc:emergency:cap:1.2'><sent>2023</sent></alert>",
+    ])
+    def test_invalid_feed(self, data):
+        with pytest.raises(InvalidFeedError):
+            parse_alerts(data)
+
+    def test_document_without_alerts(self):
+        assert parse_alerts(b"<feed xmlns='http://www.w3.org/2005/Atom'></feed>") == []
+
+
+class TestParseDirectory:
+
+    @pytest.fixture
+    def feeds_dir(self, tmp_path):
+        alerts = update_chain()
+        for alert in alerts:
+            rss.write_feed_to_file(str(tmp_path / f"{alert.id}.cap"), rss.create_feed(alert))
+        (tmp_path / "nested").mkdir()
+        (tmp_path / "nested" / "broken.xml").write_bytes(b"<feed>")
+        (tmp_path / "notes.txt").write_text("not a feed")
+        return tmp_path
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_parse_directory(self, feeds_dir, workers):
+        results = list(parse_directory(feeds_dir, workers=workers, chunksize=2))
+        assert len(results) == 4
+
+        errors = [r for r in results if r.error is not None]
+        assert [r.path for r in errors] == [str(feeds_dir / "nested" / "broken.xml")]
+
+        alerts = [a for r in results for a in r.alerts]
+        assert link_references(alerts) == update_chain()
@@ -0,0 +1,234 @@
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from rss.cap import geodata
+from rss.cap.geodata import PointTable, save_table
+from rss.cap.polygon import (
+    POLYGONS,
+    GeoPoint,
+    Polygon,
+    mask_states,
+    outline,
+    state_mask,
+    states_containing,
+    union,
+)
+from rss.cap.regions import (
+    REGION_CODES,
+    REGION_COORDS,
+    REGION_INDEX,
+    REGIONS,
+    nearest_region,
+    normalize_region_name,
+)
+from rss.cap.states import STATES, STATES_COORDS
+
+
+class TestRegionIndex:
+
+    def test_normalize_region_name(self):
+        assert normalize_region_name("Costa  Oax-Gro") == "costaoax-gro"
+
+    def test_index_has_every_region(self):
+        assert len(REGION_INDEX) == len(REGION_CODES)
+        for region, codes in REGION_CODES.items():
+            assert REGION_INDEX[normalize_region_name(region)] == codes
+
+    def test_index_codes(self):
+        assert REGION_INDEX["costajal"] == {
+            45201, 45202, 45203, 45204, 45205, 45206,
+            45301, 45302, 45303, 45304, 45401, 46101,
+        }
+
+
+class TestPolygons:
+
+    square = Polygon([
+        GeoPoint(0, 0), GeoPoint(0, 2), GeoPoint(2, 2), GeoPoint(2, 0), GeoPoint(0, 0),
+    ])
+
+    def test_bounds(self):
+        assert self.square.bounds == (0, 0, 2, 2)
+        assert POLYGONS["CDMX"].bounds == (-99.35, 19.15, -98.95, 19.60)
+
+    @pytest.mark.parametrize("point, expected", [
+        (GeoPoint(1, 1), True),
+        (GeoPoint(1.9, 0.1), True),
+        (GeoPoint(3, 1), False),
+        (GeoPoint(1, -1), False),
+    ])
+    def test_contains(self, point, expected):
+        assert self.square.contains(point) == expected
+
+    def test_triangle_excludes_points_inside_bounding_box(self):
+        triangle = Polygon([GeoPoint(0, 0), GeoPoint(2, 2), GeoPoint(2, 0), GeoPoint(0, 0)])
+        assert triangle.contains(GeoPoint(1.5, 0.5))
+        assert not triangle.contains(GeoPoint(0.5, 1.5))
+
+    def test_states_containing(self):
+        assert states_containing(GeoPoint(lon=-99.13, lat=19.43)) == ["CDMX"]
+        assert states_containing(GeoPoint(lon=-96.72, lat=17.05)) == ["Oaxaca"]
+        assert states_containing(GeoPoint(lon=-110, lat=30)) == []
+
+
+class TestOutlines:
+
+    @staticmethod
+    def center(polygon: Polygon) -> GeoPoint:
+        points = polygon.points[:-1]
+        return GeoPoint(
+            lon=sum(p.lon for p in points) / len(points),
+            lat=sum(p.lat for p in points) / len(points),
+        )
+
+    def test_state_mask(self):
+        assert state_mask([40]) == 1
+        assert state_mask([49, 40, 40]) == state_mask([40, 49]) == 0b1000000001
+        assert mask_states(0b1000000001) == [40, 49]
+        assert mask_states(state_mask(range(40, 50))) == list(range(40, 50))
+
+    @staticmethod
+    def rectangle(min_lon: float, min_lat: float, max_lon: float, max_lat: float) -> Polygon:
+        return Polygon([
+            GeoPoint(min_lon, min_lat), GeoPoint(max_lon, min_lat), GeoPoint(max_lon, max_lat),
+            GeoPoint(min_lon, max_lat), GeoPoint(min_lon, min_lat),
+        ])
+
+    def test_union(self):
+        rectangles = [self.rectangle(0, 0, 2, 2), self.rectangle(1, 1, 3, 3)]
+        assert union(rectangles) == (Polygon([
+            GeoPoint(0, 0), GeoPoint(2, 0), GeoPoint(2, 1), GeoPoint(3, 1), GeoPoint(3, 3),
+            GeoPoint(1, 3), GeoPoint(1, 2), GeoPoint(0, 2), GeoPoint(0, 0),
+        ]),)
+
+    def test_union_of_separate_polygons(self):
+        rectangles = [self.rectangle(0, 0, 1, 1), self.rectangle(5, 0, 6, 1),
+                      self.rectangle(0, 0, 1, 1)]
+        assert union(rectangles) == (self.rectangle(0, 0, 1, 1), self.rectangle(5, 0, 6, 1))
+
+    def test_union_with_a_hole(self):
+        # A hole cannot be written as a list of polygons
+        frame = [
+            self.rectangle(0, 0, 3, 1),
+            self.rectangle(2.5, 0.5, 3.5, 3.5),
+            self.rectangle(0.5, 2.5, 3.2, 3.2),
+            self.rectangle(-0.2, 0.3, 0.8, 2.8),
+        ]
+        assert union(frame) == tuple(frame)
+
+    def test_outline_of_one_state_is_its_polygon(self):
+        assert outline(state_mask([40])) == (POLYGONS["CDMX"],)
+
+    def test_outline_contains_every_state(self):
+        for mask in range(1, 1 << 10):
+            parts = outline(mask)
+            for poly in parts:
+                assert poly.points[0] == poly.points[-1]
+            for code in mask_states(mask):
+                center = self.center(POLYGONS[STATES[code]])
+                assert any(poly.contains(center) for poly in parts)
+
+    def test_outline_only_covers_its_states(self):
+        points = [
+            GeoPoint(lon=-107 + 17 * ii / 60, lat=15 + 8 * jj / 30)
+            for ii in range(61) for jj in range(31)
+        ]
+        for mask in list(range(1, 1 << 10, 7)) + [(1 << 10) - 1]:
+            parts = outline(mask)
+            polygons = [POLYGONS[STATES[code]] for code in mask_states(mask)]
+            for point in points:
+                in_outline = any(poly.contains(point) for poly in parts)
+                assert in_outline == any(poly.contains(point) for poly in polygons)
+
+    def test_outline_of_separate_states(self):
+        # Oaxaca is between Guerrero and Chiapas, it is not covered
+        parts = outline(state_mask([41, 49]))
+        assert len(parts) == 2
+        for state in ["Oaxaca", "Veracruz"]:
+            center = self.center(POLYGONS[state])
+            assert not any(poly.contains(center) for poly in parts)
+
+    def test_outlines_are_cached(self):
+        mask = state_mask([41, 42, 49])
+        assert outline(mask) is outline(mask)
+
+    @pytest.mark.parametrize("mask", [0, 1 << 10])
+    def test_invalid_mask(self, mask):
+        with pytest.raises(ValueError):
+            outline(mask)
+
+
+class TestNearestRegion:
+
+    @pytest.mark.parametrize("code", [41203, 45201, 49216, 42201])
+    def test_region_coordinates_are_nearest_to_themselves(self, code):
+        assert nearest_region(REGION_COORDS[code]) == code
+
+    def test_nearest_region_has_a_name(self):
+        # Coordinates of a region without a name
+        assert 41102 not in REGIONS
+        assert nearest_region(REGION_COORDS[41102]) in REGIONS
+
+
+class TestGeoTables:
+
+    def test_tables_are_memory_mapped(self):
+        assert isinstance(REGION_COORDS.table, np.memmap)
+        assert not REGION_COORDS.table.flags.writeable
+
+    def test_table_is_loaded_on_first_access(self, tmp_path, monkeypatch):
+        save_table(str(tmp_path / "points.npy"), [(1, GeoPoint(lon=-99., lat=19.))])
+        monkeypatch.setattr(geodata, "DATA_PATH", str(tmp_path))
+        misses = geodata.load_rows.cache_info().misses
+        table = PointTable("points.npy", key=str)
+        try:
+            assert geodata.load_rows.cache_info().misses == misses
+            assert table["1"] == GeoPoint(lon=-99., lat=19.)
+            assert geodata.load_rows.cache_info().misses == misses + 1
+            assert table["1"] == GeoPoint(lon=-99., lat=19.)
+            assert dict(table) == {"1": GeoPoint(lon=-99., lat=19.)}
+        finally:
+            geodata.load_rows.cache_clear()
+
+    def test_only_point_tables_are_loaded(self, tmp_path, monkeypatch):
+        np.save(str(tmp_path / "other.npy"), np.zeros(3))
+        (tmp_path / "text.npy").write_bytes(b"not a table")
+        monkeypatch.setattr(geodata, "DATA_PATH", str(tmp_path))
+        try:
+            for filename in ("other.npy", "text.npy"):
+                with pytest.raises(ValueError):
+                    geodata.load_rows(filename)
+        finally:
+            geodata.load_rows.cache_clear()
+
+    def test_rendering_does_not_import_numpy(self):
+        code = (
+            "import datetime, sys\n"
+            "from rss.cap.alert import Alert\n"
+            "from rss.cap.rss import create_feed\n"
+            "create_feed(Alert(datetime.datetime(2023, 3, 22), [40, 41], 41203, is_event=True))\n"
+            "assert 'numpy' not in sys.modules\n"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
+
+    def test_point_table_is_a_mapping(self):
+        assert len(STATES_COORDS) == 10
+        assert STATES_COORDS["CDMX"] == GeoPoint(lat=19.42847, lon=-99.12766)
+        assert "Chiapas" in STATES_COORDS
+        assert 40101 in REGION_COORDS
+        with pytest.raises(KeyError):
+            REGION_COORDS[1]
+
+    def test_arrays_follow_keys(self):
+        codes, lats, lons = REGION_COORDS.arrays()
+        assert codes.tolist() == list(REGION_COORDS)
+        point = REGION_COORDS[int(codes[5])]
+        assert (lats[5], lons[5]) == (point.lat, point.lon)
+
+    def test_polygons_are_created_once(self):
+        assert POLYGONS["Oaxaca"] is POLYGONS["Oaxaca"]
+        assert len(POLYGONS) == 10
+        assert POLYGONS["CDMX"].points[0] == GeoPoint(-98.95, 19.15)
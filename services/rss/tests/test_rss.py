@@ -1,9 +1,19 @@
 from datetime import datetime
+import gzip
+import hashlib
 from bs4 import BeautifulSoup
 import pytest
 
 from rss.cap import rss
+from rss.cap.document import (
+    polygon_text,
+    state_region_distance,
+    state_region_distance_matrix,
+    state_region_distance_table,
+)
+from rss.cap.geopoint import distance_between_points
 from rss.cap.regions import REGION_COORDS
+from rss.cap.states import STATES_COORDS
 from rss.cap.alert import Alert
 
 
@@ -228,3 +238,478 @@ class TestCapEvent:
         lat, lon = coords.split(",")
         assert lat == expected_lat
         assert lon == expected_lon
+
+
+class TestTemplateRenderer:
+
+    @staticmethod
+    def alerts() -> list[Alert]:
+        date = datetime(year=2023, month=3, day=13, hour=16, minute=7, second=5)
+        refs = [
+            Alert(time=date, states=[40], region=42201, id="REF_ID_1"),
+            Alert(time=date, states=[41, 49], region=42201, id="REF_ID_2"),
+        ]
+        return [
+            Alert(time=date, states=[40, 41], region=42201, id="TEST-ALERT"),
+            Alert(time=date, states=[42], region=41203, id="TEST_ALERT", refs=refs),
+            Alert(time=date, states=[40], region=42201, id="TEST-EVENT", is_event=True),
+            Alert(time=date, states=[41], region=41203, id="", is_event=True, refs=refs),
+        ]
+
+    @pytest.mark.parametrize("is_test", [False, True])
+    @pytest.mark.parametrize("indentation", ["\t", "  ", "", "{x}"])
+    def test_output_is_identical_to_minidom(self, is_test, indentation):
+        for alert in self.alerts():
+            minidom_feed = rss.RSSFeed(alert, is_test)
+            template_feed = rss.TemplateRSSFeed(alert, is_test)
+            template_feed.updated_date = minidom_feed.updated_date
+
+            minidom_feed.build(indentation)
+            template_feed.build(indentation)
+            assert template_feed.content.encode() == minidom_feed.content.encode()
+
+    def test_text_is_escaped(self):
+        alert = Alert(
+            time=datetime(year=2023, month=3, day=13, hour=16, minute=7, second=5),
+            states=[40],
+            region=42201,
+            id='<ID & "{name}">',
+        )
+        minidom_feed = rss.RSSFeed(alert)
+        template_feed = rss.TemplateRSSFeed(alert)
+        template_feed.updated_date = minidom_feed.updated_date
+
+        minidom_feed.build()
+        template_feed.build()
+        assert template_feed.content == minidom_feed.content
+
+        data = BeautifulSoup(template_feed.content, "xml")
+        assert data.feed.entry.id.string == '<ID & "{name}">'
+
+    def test_indentation_with_braces(self):
+        alert = self.alerts()[1]
+        template_feed = rss.create_feed(
+            alert, renderer="template", indentation="{x}", deterministic=True)
+        minidom_feed = rss.create_feed(
+            alert, renderer="minidom", indentation="{x}", deterministic=True)
+        assert "\n{x}<entry>" in template_feed.content
+        assert template_feed.content == minidom_feed.content
+
+    def test_create_feed_with_invalid_renderer(self):
+        with pytest.raises(ValueError, match="Invalid renderer"):
+            rss.create_feed(self.alerts()[0], renderer="jinja")
+
+
+class TestFeedCache:
+
+    @pytest.fixture
+    def feed_cache(self):
+        rss.FEED_CACHE.clear()
+        yield rss.FEED_CACHE
+        rss.FEED_CACHE.clear()
+
+    @staticmethod
+    def sample_alert(refs=None) -> Alert:
+        return Alert(
+            time=datetime(year=2023, month=3, day=13, hour=16, minute=7, second=5),
+            states=[40, 41],
+            region=42201,
+            id="TEST-ALERT",
+            refs=refs
+        )
+
+    def test_same_alert_is_rendered_once(self, feed_cache):
+        feed1 = rss.create_feed(self.sample_alert(), cache=True)
+        feed2 = rss.create_feed(self.sample_alert(), cache=True)
+
+        assert feed1 is feed2
+        assert feed_cache.info() == rss.CacheInfo(hits=1, misses=1, maxsize=128, currsize=1)
+
+    def test_different_alerts_are_not_shared(self, feed_cache):
+        refs = [self.sample_alert()]
+        alert = self.sample_alert()
+        update = self.sample_alert(refs)
+
+        assert rss.alert_key(alert) != rss.alert_key(update)
+        feed1 = rss.create_feed(alert, cache=True)
+        feed2 = rss.create_feed(update, cache=True)
+        feed3 = rss.create_feed(alert, is_test=True, cache=True)
+
+        assert feed1 is not feed2
+        assert feed1 is not feed3
+        assert feed_cache.misses == 3
+        assert feed_cache.hits == 0
+
+    def test_least_recently_used_feed_is_evicted(self):
+        cache = rss.FeedCache(maxsize=2)
+        feeds = [rss.RSSFeed(self.sample_alert()) for _ in range(3)]
+        cache.put("a", feeds[0])
+        cache.put("b", feeds[1])
+        cache.get("a")
+        cache.put("c", feeds[2])
+
+        assert len(cache) == 2
+        assert cache.get("b") is None
+        assert cache.get("a") is feeds[0]
+
+        cache.maxsize = 1
+        assert len(cache) == 1
+        assert cache.get("c") is None
+
+    def test_invalidate_alert(self, feed_cache):
+        alert = self.sample_alert()
+        rss.create_feed(alert, cache=True)
+        rss.create_feed(alert, is_test=True, cache=True)
+        rss.create_feed(self.sample_alert([alert]), cache=True)
+        assert len(feed_cache) == 3
+
+        feed_cache.invalidate(alert)
+        assert len(feed_cache) == 1
+
+    def test_alert_key(self):
+        date = datetime(year=2023, month=3, day=13, hour=16, minute=7, second=5)
+        ref = Alert(time=date, states=[40], region=42201, id="REF")
+        update = self.sample_alert([ref])
+        assert rss.alert_key(update) == rss.alert_key(self.sample_alert([ref]))
+        assert rss.alert_key(update) != rss.alert_key(self.sample_alert())
+
+        # Only the id, date and states of the references are written to the feed
+        other_ref = Alert(time=date, states=[40], region=12205, id="REF", refs=[ref])
+        assert rss.alert_key(update) == rss.alert_key(self.sample_alert([other_ref]))
+        other_ref = Alert(time=date, states=[41], region=42201, id="REF")
+        assert rss.alert_key(update) != rss.alert_key(self.sample_alert([other_ref]))
+
+    def test_feeds_are_not_cached_by_default(self, feed_cache):
+        rss.create_feed(self.sample_alert())
+        assert len(feed_cache) == 0
+        assert feed_cache.misses == 0
+
+
+class TestAreaFragments:
+
+    def test_repeated_states_add_a_single_polygon(self):
+        date = datetime(year=2023, month=3, day=13, hour=16, minute=7, second=5)
+        refs = [
+            Alert(time=date, states=[40], region=42201, id="REF_ID_1"),
+            Alert(time=date, states=[40, 41], region=42201, id="REF_ID_2"),
+        ]
+        alert = Alert(time=date, states=[41, 42], region=42201, id="TEST_ALERT", refs=refs)
+        feed = rss.create_feed(alert)
+
+        data = BeautifulSoup(feed.content, "xml")
+        polygons = [p.string for p in data.find_all("polygon")]
+        assert polygons == [polygon_text(40), polygon_text(41), polygon_text(42)]
+
+    def test_polygon_text(self):
+        text = polygon_text(40)
+        assert text == "19.15,-98.95 19.60,-98.95 19.60,-99.35 19.15,-99.35 19.15,-98.95"
+        assert polygon_text(40) is text
+
+    def test_circle_text(self):
+        assert rss.circle_text(42201) == "16.31,-98.44 70.0"
+
+
+class TestStateRegionDistances:
+
+    def test_matrix_shape(self):
+        matrix = state_region_distance_matrix()
+        assert matrix.shape == (len(STATES_COORDS), len(REGION_COORDS))
+
+    def test_table_matches_scalar_distances(self):
+        for state, state_coords in STATES_COORDS.items():
+            for region, region_coords in REGION_COORDS.items():
+                expected = round(distance_between_points(state_coords, region_coords))
+                assert state_region_distance(state, region) == expected
+
+    def test_table_is_the_rounded_matrix(self):
+        table = state_region_distance_table()
+        assert state_region_distance_table() is table
+        matrix = state_region_distance_matrix()
+        for ii, state in enumerate(STATES_COORDS):
+            assert list(table[state]) == list(REGION_COORDS)
+            for jj, region in enumerate(REGION_COORDS):
+                assert table[state][region] == round(matrix[ii, jj])
+
+    def test_matrix_matches_distances(self):
+        matrix = state_region_distance_matrix()
+        for ii, state in enumerate(STATES_COORDS):
+            for jj, region in enumerate(REGION_COORDS):
+                assert round(matrix[ii, jj]) == state_region_distance(state, region)
+
+
+class TestCreateFeeds:
+
+    @staticmethod
+    def sample_alerts(n: int) -> list[Alert]:
+        return [
+            Alert(
+                time=datetime(year=2023, month=3, day=13, hour=16, minute=7, second=ii % 60),
+                states=[40 + ii % 3],
+                region=42201,
+                id=f"ALERT{ii}",
+                is_event=ii % 2 == 0,
+            )
+            for ii in range(n)
+        ]
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_renders_all_alerts(self, workers):
+        alerts = self.sample_alerts(25)
+        results = dict(rss.create_feeds(iter(alerts), workers=workers, chunksize=4))
+        assert len(results) == 25
+
+        for alert in alerts:
+            data = BeautifulSoup(results[alert.id], "xml")
+            assert data.feed.entry.alert.identifier.string == "CIRES" + alert.id
+
+    def test_output_matches_create_feed(self):
+        alert = self.sample_alerts(1)[0]
+        [(alert_id, content)] = list(rss.create_feeds([alert], workers=1))
+
+        feed = rss.create_feed(alert)
+        updated = BeautifulSoup(content, "xml").feed.updated.string
+        assert alert_id == alert.id
+        assert content == feed.content.replace(feed.updated_date, updated).encode()
+
+    def test_invalid_renderer(self):
+        with pytest.raises(ValueError, match="Invalid renderer"):
+            list(rss.create_feeds(self.sample_alerts(1), renderer="jinja"))
+
+
+class TestCompactFeeds:
+
+    @staticmethod
+    def sample_alert() -> Alert:
+        return Alert(
+            time=datetime(year=2023, month=3, day=13, hour=16, minute=7, second=5),
+            states=[40, 41],
+            region=42201,
+            id="TEST-ALERT",
+        )
+
+    def test_compact_feed_has_no_whitespace_between_tags(self):
+        feed = rss.create_feed(self.sample_alert(), compact=True)
+        assert "\n" not in feed.content
+        assert "\t" not in feed.content
+        assert feed.content.startswith('<?xml version="1.0" encoding="UTF-8"?><feed ')
+
+        data = BeautifulSoup(feed.content, "xml")
+        assert len(data.find_all("polygon")) == 2
+
+    def test_compact_template_is_identical_to_minidom(self):
+        minidom_feed = rss.RSSFeed(self.sample_alert())
+        template_feed = rss.TemplateRSSFeed(self.sample_alert())
+        template_feed.updated_date = minidom_feed.updated_date
+
+        minidom_feed.build(compact=True)
+        template_feed.build(compact=True)
+        assert template_feed.content == minidom_feed.content
+
+
+class TestWriteFeed:
+
+    def test_write_gzip_copy(self, tmp_path):
+        feed = rss.create_feed(TestCompactFeeds.sample_alert())
+        path = str(tmp_path / "sasmex.xml")
+        rss.write_feed_to_file(path, feed, compress=["gzip"])
+
+        with open(path) as fp:
+            assert fp.read() == feed.content
+        with gzip.open(path + ".gz", "rt") as fp:
+            assert fp.read() == feed.content
+
+    def test_no_compressed_copies_by_default(self, tmp_path):
+        feed = rss.create_feed(TestCompactFeeds.sample_alert())
+        rss.write_feed_to_file(str(tmp_path / "sasmex.xml"), feed)
+        assert [p.name for p in tmp_path.iterdir()] == ["sasmex.xml"]
+
+    def test_write_brotli_copy(self, tmp_path):
+        brotli = pytest.importorskip("brotli")
+        feed = rss.create_feed(TestCompactFeeds.sample_alert())
+        path = str(tmp_path / "sasmex.xml")
+        rss.write_feed_to_file(path, feed, compress=["brotli"])
+
+        with open(path + ".br", "rb") as fp:
+            assert brotli.decompress(fp.read()).decode() == feed.content
+
+    def test_invalid_compression_method(self, tmp_path):
+        feed = rss.create_feed(TestCompactFeeds.sample_alert())
+        with pytest.raises(ValueError, match="Invalid compression method"):
+            rss.write_feed_to_file(str(tmp_path / "sasmex.xml"), feed, compress=["zip"])
+
+
+class TestRollingFeed:
+
+    @staticmethod
+    def sample_alert(ii: int) -> Alert:
+        return Alert(
+            time=datetime(year=2023, month=3, day=13, hour=16, minute=7, second=ii),
+            states=[40 + ii % 3],
+            region=42201,
+            id=f"ALERT{ii}",
+            is_event=ii % 2 == 1,
+        )
+
+    def test_single_entry_is_identical_to_feed(self):
+        alert = self.sample_alert(0)
+        feed = rss.create_feed(alert)
+
+        # Only the self link is different
+        rolling = rss.RollingFeed(size=5, filename="sasmex.xml")
+        rolling.add(alert, feed.updated_date)
+        assert rolling.content == feed.content
+
+        compact = rss.RollingFeed(size=5, compact=True, filename="sasmex.xml")
+        compact.add(alert, feed.updated_date)
+        feed = rss.RSSFeed(alert)
+        feed.updated_date = compact.updated_date
+        feed.build(compact=True)
+        assert compact.content == feed.content
+
+    def test_self_link_is_the_rolling_file(self):
+        rolling = rss.RollingFeed(size=5, filename="test_rolling.xml")
+        rolling.add(self.sample_alert(0))
+        assert rolling.self_href == "https://rss.sasmex.net/test_rolling.xml"
+
+        data = BeautifulSoup(rolling.content, "xml")
+        link = data.feed.find("link", rel="self")
+        assert link["href"] == "https://rss.sasmex.net/test_rolling.xml"
+
+    def test_keeps_last_alerts_newest_first(self):
+        rolling = rss.RollingFeed(size=3)
+        for ii in range(5):
+            rolling.add(self.sample_alert(ii), datetime(2023, 5, 15, 12, 0, ii).isoformat())
+
+        assert len(rolling) == 3
+        data = BeautifulSoup(rolling.content, "xml")
+        ids = [entry.id.string for entry in data.feed.find_all("entry")]
+        assert ids == ["ALERT4", "ALERT3", "ALERT2"]
+        assert data.feed.updated.string == datetime(2023, 5, 15, 12, 0, 4).isoformat()
+        assert data.feed.title.string == "SASMEX-CIRES RSS Feed"
+
+    def test_entries_are_rendered_once(self, monkeypatch):
+        calls = []
+        build_entry = rss.TemplateRSSFeed.build_entry
+
+        def count_calls(feed, *args):
+            calls.append(feed)
+            return build_entry(feed, *args)
+
+        monkeypatch.setattr(rss.TemplateRSSFeed, "build_entry", count_calls)
+        rolling = rss.RollingFeed(size=3)
+        for ii in range(4):
+            rolling.add(self.sample_alert(ii))
+        rolling.content
+        rolling.content
+        assert len(calls) == 4
+
+    def test_write(self, tmp_path):
+        rolling = rss.RollingFeed()
+        rolling.add(self.sample_alert(0))
+        path = tmp_path / "rolling.xml"
+        rolling.write(str(path))
+        assert path.read_text() == rolling.content
+
+    def test_invalid_size(self):
+        with pytest.raises(ValueError):
+            rss.RollingFeed(size=0)
+
+
+class TestFeedBytes:
+
+    @pytest.mark.parametrize("renderer", ["minidom", "template"])
+    def test_data_is_utf8_content(self, renderer):
+        alert = TestCompactFeeds.sample_alert()
+        feed = rss.create_feed(alert, renderer=renderer)
+        assert isinstance(feed.data, bytes)
+        assert feed.data == feed.content.encode()
+        assert feed.buffer.readonly
+        assert feed.buffer.tobytes() == feed.data
+
+    def test_write_is_binary(self, tmp_path):
+        feed = rss.create_feed(TestCompactFeeds.sample_alert())
+        path = tmp_path / "sasmex.xml"
+        rss.write_feed_to_file(str(path), feed)
+        assert path.read_bytes() == feed.data
+
+
+class TestDeterministicFeeds:
+
+    @pytest.mark.parametrize("renderer", ["minidom", "template"])
+    def test_same_alert_produces_same_feed(self, renderer):
+        alert = TestCompactFeeds.sample_alert()
+        feed1 = rss.create_feed(alert, renderer=renderer, deterministic=True)
+        feed2 = rss.create_feed(alert, renderer=renderer, deterministic=True)
+        assert feed1.data == feed2.data
+        assert feed1.digest == feed2.digest
+        assert feed1.updated_date == alert.time.isoformat()
+
+    def test_injected_clock(self):
+        clock = lambda: datetime(2023, 5, 15, 12, 0, 0)
+        feed = rss.create_feed(TestCompactFeeds.sample_alert(), clock=clock)
+        assert feed.updated_date == "2023-05-15T12:00:00"
+
+    def test_deterministic_feed_does_not_use_a_clock(self):
+        with pytest.raises(ValueError):
+            rss.create_feed(TestCompactFeeds.sample_alert(),
+                            clock=datetime.now, deterministic=True)
+
+    @pytest.mark.parametrize("compact", [False, True])
+    def test_digest_of_data(self, compact):
+        alert = TestCompactFeeds.sample_alert()
+        minidom_feed = rss.create_feed(alert, compact=compact, deterministic=True)
+        template_feed = rss.create_feed(
+            alert, renderer="template", compact=compact, deterministic=True)
+        assert minidom_feed.digest == hashlib.sha256(minidom_feed.data).hexdigest()
+        assert template_feed.digest == minidom_feed.digest
+
+    def test_rolling_feed(self):
+        rolling = rss.RollingFeed(size=3, deterministic=True)
+        assert rolling.updated_date == "1970-01-01T00:00:00"
+        alert = TestRollingFeed.sample_alert(1)
+        rolling.add(alert)
+        assert rolling.updated_date == alert.time.isoformat()
+        digest = rolling.digest
+        assert digest == hashlib.sha256(rolling.data).hexdigest()
+        rolling.add(TestRollingFeed.sample_alert(2))
+        assert rolling.digest != digest
+
+    def test_unchanged_feed_is_not_written_again(self, tmp_path):
+        published = rss.PublishedFeeds()
+        path = str(tmp_path / "sasmex.xml")
+        feed = rss.create_feed(TestCompactFeeds.sample_alert(), deterministic=True)
+        assert rss.write_feed_to_file(path, feed, published=published)
+        assert published.digest(path) == feed.digest
+
+        same = rss.create_feed(TestCompactFeeds.sample_alert(), deterministic=True)
+        assert not rss.write_feed_to_file(path, same, published=published)
+
+        other = rss.create_feed(TestRollingFeed.sample_alert(1), deterministic=True)
+        assert rss.write_feed_to_file(path, other, published=published)
+        with open(path, "rb") as fp:
+            assert fp.read() == other.data
+
+    def test_published_feeds_are_bounded(self):
+        published = rss.PublishedFeeds(maxsize=2)
+        for ii in range(3):
+            published.update(f"feed{ii}.xml", str(ii))
+        assert published.digest("feed0.xml") is None
+        assert published.is_unchanged("feed2.xml", "2")
+
+
+class TestReferenceLimit:
+
+    @pytest.mark.parametrize("renderer", ["minidom", "template"])
+    def test_feed_embeds_last_references(self, renderer):
+        date = datetime(year=2023, month=3, day=13, hour=16, minute=7, second=5)
+        refs = [Alert(time=date, states=[40], region=42201, id=f"REF{ii}") for ii in range(20)]
+        alert = Alert(time=date, states=[41], region=42201, id="UPDATE", refs=refs)
+
+        feed = rss.create_feed(alert, renderer=renderer, max_refs=5)
+        data = BeautifulSoup(feed.content, "xml")
+        references = data.find("references").string.split(" ")
+        assert [ref.split(",")[1] for ref in references] == [
+            f"CIRES_REF{ii}" for ii in range(15, 20)
+        ]
+        full = rss.create_feed(alert, renderer=renderer)
+        assert len(full.data) > len(feed.data)
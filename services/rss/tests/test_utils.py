@@ -1,5 +1,7 @@
 import os
+import stat
 import pytest
+from rss.utils.atomic_write import write_atomic
 from rss.utils.env_variable import get_env_variable, MissingEnvVariableError
 
 
@@ -40,3 +42,37 @@ class TestGetEnvVariable:
         name = "MISSING_VAR"
         value = get_env_variable(name, service="cap")
         assert value == ""
+
+
+class TestWriteAtomic:
+
+    @pytest.mark.parametrize("durability", ["none", "fdatasync", "fsync"])
+    def test_replaces_file_contents(self, tmp_path, durability):
+        path = tmp_path / "sasmex.xml"
+        path.write_bytes(b"old feed")
+
+        write_atomic(str(path), b"new feed", durability)
+        assert path.read_bytes() == b"new feed"
+        assert os.listdir(tmp_path) == ["sasmex.xml"]
+
+    def test_file_is_readable_by_others(self, tmp_path):
+        path = tmp_path / "sasmex.xml"
+        umask = os.umask(0o022)
+        try:
+            write_atomic(str(path), b"feed")
+        finally:
+            os.umask(umask)
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+
+    def test_failed_write_keeps_old_file(self, tmp_path):
+        path = tmp_path / "sasmex.xml"
+        path.write_bytes(b"old feed")
+
+        with pytest.raises(TypeError):
+            write_atomic(str(path), "not bytes")
+        assert path.read_bytes() == b"old feed"
+        assert os.listdir(tmp_path) == ["sasmex.xml"]
+
+    def test_invalid_durability(self, tmp_path):
+        with pytest.raises(ValueError, match="Invalid durability policy"):
+            write_atomic(str(tmp_path / "sasmex.xml"), b"feed", "always")
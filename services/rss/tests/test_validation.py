@@ -0,0 +1,157 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import pytest
+
+from rss.cap import rss, validation
+from rss.cap.alert import Alert
+from rss.cap.validation import (
+    FeedValidator,
+    InvalidCAPError,
+    cap_schema,
+    validate_alerts,
+)
+
+
+def sample_alerts() -> list[Alert]:
+    date = datetime(year=2023, month=3, day=13, hour=16, minute=7, second=5)
+    refs = [Alert(time=date, states=[40], region=42201, id="REF")]
+    return [
+        Alert(time=date, states=[40, 41], region=42201, id="ALERT"),
+        Alert(time=date, states=[42], region=42201, id="UPDATE", refs=refs),
+        Alert(time=date, states=[40], region=42201, id="EVENT", is_event=True),
+        Alert(time=date, states=[40], region=42201, id="EVENT_UPDATE",
+              is_event=True, refs=refs),
+    ]
+
+
+@pytest.fixture
+def feed_validator():
+    yield rss.FEED_VALIDATOR
+    rss.FEED_VALIDATOR.configure("off", 100, True)
+    rss.FEED_VALIDATOR.reset()
+
+
+class TestValidateAlerts:
+
+    def test_schema_is_compiled_once(self):
+        assert cap_schema() is cap_schema()
+
+    @pytest.mark.parametrize("alert", sample_alerts(), ids=lambda a: a.id)
+    @pytest.mark.parametrize("renderer", ["minidom", "template"])
+    def test_feeds_are_valid(self, alert, renderer):
+        feed = rss.create_feed(alert, renderer=renderer)
+        assert validate_alerts(feed.data) == []
+
+    def test_invalid_value(self):
+        feed = rss.create_feed(sample_alerts()[0])
+        data = feed.data.replace(b"<status>Actual</status>", b"<status>Real</status>")
+        errors = validate_alerts(data)
+        assert len(errors) == 1
+        assert "status" in errors[0]
+
+    def test_feed_without_alert(self):
+        assert validate_alerts(b"<feed></feed>") == ["The feed has no CAP alert"]
+
+    def test_malformed_feed(self):
+        assert len(validate_alerts(b"<feed>")) == 1
+
+    def test_concurrent_validations(self):
+        # Each validation gets its own errors even though the schema is shared
+        valid = rss.create_feed(sample_alerts()[0]).data
+        invalid = valid.replace(b"<status>Actual</status>", b"<status>Real</status>")
+        feeds = [valid, invalid] * 1000
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(validate_alerts, feeds))
+        for data, errors in zip(feeds, results):
+            if data is valid:
+                assert errors == []
+            else:
+                assert len(errors) == 1
+                assert "status" in errors[0]
+
+
+class TestFeedValidator:
+
+    def test_off_does_not_validate(self):
+        validator = FeedValidator("off")
+        assert validator.check(b"<feed>") is None
+        assert validator.stats().validated == 0
+        assert validator.stats().skipped == 1
+
+    def test_every_validates_all_feeds(self):
+        validator = FeedValidator("every")
+        data = rss.create_feed(sample_alerts()[0]).data
+        for _ in range(3):
+            assert validator.check(data) == []
+        stats = validator.stats()
+        assert stats.validated == 3
+        assert stats.failed == 0
+        assert len(validator.timings()) == 3
+        assert stats.max_time >= stats.mean_time > 0
+
+    def test_sample_validates_one_in_n(self):
+        validator = FeedValidator("sample", sample_rate=4)
+        data = rss.create_feed(sample_alerts()[0]).data
+        results = [validator.check(data) for _ in range(8)]
+        assert results == [[], None, None, None, [], None, None, None]
+        assert validator.stats().skipped == 6
+
+    def test_strict_raises(self):
+        validator = FeedValidator("every")
+        with pytest.raises(InvalidCAPError) as err:
+            validator.check(b"<feed></feed>")
+        assert err.value.errors == ["The feed has no CAP alert"]
+        assert validator.stats().failed == 1
+
+    def test_not_strict_returns_errors(self):
+        validator = FeedValidator("every", strict=False)
+        assert validator.check(b"<feed></feed>") == ["The feed has no CAP alert"]
+
+    def test_invalid_configuration(self):
+        with pytest.raises(ValueError):
+            FeedValidator("always")
+        with pytest.raises(ValueError):
+            FeedValidator("sample", sample_rate=0)
+
+    def test_reset(self):
+        validator = FeedValidator("every", strict=False)
+        validator.check(b"<feed></feed>")
+        validator.reset()
+        assert validator.stats() == (0, 0, 0, 0., 0.)
+        assert validator.timings() == []
+
+
+class TestFeedValidation:
+
+    def test_create_feed_is_not_validated_by_default(self, feed_validator):
+        feed = rss.create_feed(sample_alerts()[0])
+        assert feed.validation_errors is None
+
+    def test_create_feed_validates(self, feed_validator):
+        feed_validator.configure("every")
+        feed = rss.create_feed(sample_alerts()[0], renderer="template")
+        assert feed.validation_errors == []
+        assert feed_validator.stats().validated == 1
+
+    def test_create_feeds_validates(self, feed_validator):
+        feed_validator.configure("every")
+        results = list(rss.create_feeds(sample_alerts(), workers=1))
+        assert len(results) == 4
+        assert feed_validator.stats().validated == 4
+
+    def test_rolling_feed_validates_entries(self, feed_validator):
+        feed_validator.configure("every")
+        rolling = rss.RollingFeed()
+        for alert in sample_alerts():
+            rolling.add(alert)
+            assert rolling.validation_errors == []
+        assert feed_validator.stats().validated == 4
+        assert validate_alerts(rolling.data) == []
+
+    def test_rolling_feed_stores_errors(self, feed_validator, monkeypatch):
+        feed_validator.configure("every", strict=False)
+        monkeypatch.setattr(validation, "validate_alerts", lambda data: ["invalid status"])
+        rolling = rss.RollingFeed()
+        rolling.add(sample_alerts()[0])
+        assert rolling.validation_errors == ["invalid status"]
+        assert feed_validator.stats().failed == 1